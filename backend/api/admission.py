@@ -0,0 +1,94 @@
+"""
+Admission control for CPU-heavy endpoints.
+
+Per-user request rates are limited by DRF's ``ScopedRateThrottle`` (429
+with Retry-After, rates in ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``).
+Its counts live in the shared cache (``CACHES``), so the rates hold across
+all workers; with a per-process cache they would multiply by the worker count.
+On top of that, each heavy pool in ``ADMISSION_LIMITS`` (uploads, report
+builds, ...) has a bounded semaphore per process: a request waits at most
+``ADMISSION_QUEUE_TIMEOUT`` seconds (tens of milliseconds; 0 never waits)
+for a slot and otherwise gets a 503 with Retry-After at once, so cheap
+reads keep a worker instead of queuing behind a report storm. Limits are
+per process; multiply by the worker count for the server-wide figure.
+Requests that do get a slot still share the CPU with reads, so keep the
+limits at or below the cores each process can spare: on a single core,
+``benchmarks/admission.py`` shows summary reads at about 1.5x their idle
+latency with admission on, against 3-4x without it.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .instrumentation import ADMISSION_REJECTIONS
+
+_semaphores = {}
+_lock = threading.Lock()
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, please retry shortly.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF's exception handler turns ``wait`` into the Retry-After header
+        self.wait = wait
+
+
+def _semaphore(pool):
+    with _lock:
+        semaphore = _semaphores.get(pool)
+        if semaphore is None:
+            semaphore = _semaphores[pool] = threading.BoundedSemaphore(settings.ADMISSION_LIMITS[pool])
+        return semaphore
+
+
+def acquire(pool):
+    """Takes a slot in ``pool`` or raises Overloaded; returns the function that gives it back."""
+    semaphore = _semaphore(pool)
+    if not semaphore.acquire(timeout=settings.ADMISSION_QUEUE_TIMEOUT):
+        ADMISSION_REJECTIONS.inc(1, pool)
+        raise Overloaded(settings.ADMISSION_RETRY_AFTER)
+
+    released = threading.Event()
+
+    def release():
+        if not released.is_set():
+            released.set()
+            semaphore.release()
+    return release
+
+
+@contextmanager
+def slot(pool):
+    release = acquire(pool)
+    try:
+        yield
+    finally:
+        release()
+
+
+class HeldWhileStreaming:
+    """
+    Wraps a streaming response body so the slot is held until the response
+    is closed, including when the client disconnects before the first chunk.
+    """
+
+    def __init__(self, iterable, release):
+        self._iterable = iterable
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._release()
@@ -0,0 +1,166 @@
+"""
+Cross-dataset analytics computed inside the database.
+
+Aggregates are produced by a single grouped query and folded into
+per-dataset and per-bucket views in Python. Results are cached under a
+generation number that is bumped whenever a dataset is added, so an upload
+invalidates every cached range at once without tracking keys. The
+generation lives in the shared cache (``CACHES``), so an upload handled by
+one worker invalidates every worker's results; ``ANALYTICS_CACHE_TIMEOUT``
+bounds staleness if the cache is ever per-process.
+"""
+from datetime import datetime, time, timedelta
+from time import time_ns
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import equipment_types
+from .models import Equipment
+
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+BUCKETS = ['day', 'week', 'month', 'year']
+GENERATION_KEY = 'analytics:generation'
+
+
+def _first_generation():
+    # If the key is evicted, restarting from the clock never revisits a generation with results still cached
+    return time_ns() // 1000
+
+
+def invalidate_analytics():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, _first_generation(), None)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _first_generation(), None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+def cached(name, params, compute):
+    key = f"analytics:{name}:{_generation()}:" + ':'.join(str(p) for p in params)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, settings.ANALYTICS_CACHE_TIMEOUT)
+    return result
+
+
+def parse_bound(value, upper=False):
+    """
+    Accepts an ISO date or datetime. A bare date used as an upper bound
+    covers that whole day. Raises ValueError on malformed input.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        if upper:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def default_start():
+    # Midnight-aligned so the default range produces a stable cache key
+    today = timezone.localdate()
+    return timezone.make_aware(datetime.combine(today - timedelta(days=90), time.min))
+
+
+def _empty_stats():
+    stats = {'count': 0}
+    for param in PARAMETERS:
+        stats[f'avg_{param}'] = 0
+        stats[f'min_{param}'] = None
+        stats[f'max_{param}'] = None
+    return stats
+
+
+def _fold(target, group):
+    # Combine one grouped row into a running aggregate (count-weighted means)
+    total = target['count'] + group['count']
+    for param in PARAMETERS:
+        avg_key, min_key, max_key = f'avg_{param}', f'min_{param}', f'max_{param}'
+        target[avg_key] = (target[avg_key] * target['count'] + group[avg_key] * group['count']) / total
+        target[min_key] = group[min_key] if target[min_key] is None else min(target[min_key], group[min_key])
+        target[max_key] = group[max_key] if target[max_key] is None else max(target[max_key], group[max_key])
+    target['count'] = total
+
+
+def compute_trends(start, end, bucket):
+    aggregates = {'count': Count('id')}
+    for param in PARAMETERS:
+        aggregates[f'avg_{param}'] = Avg(param)
+        aggregates[f'min_{param}'] = Min(param)
+        aggregates[f'max_{param}'] = Max(param)
+
+    equipment = Equipment.objects.filter(dataset__upload_date__gte=start, dataset__deleted_at__isnull=True)
+    if end is not None:
+        equipment = equipment.filter(dataset__upload_date__lt=end)
+
+    rows = list(
+        equipment
+        .annotate(bucket=Trunc('dataset__upload_date', bucket))
+        .values('bucket', 'dataset_id', 'dataset__filename', 'dataset__upload_date', 'type_id')
+        .annotate(**aggregates)
+        .order_by('bucket', 'dataset_id', 'type_id')
+    )
+    # Grouped on the small-integer type id; names come from the cached mapping
+    type_names = equipment_types.names({row['type_id'] for row in rows})
+
+    datasets = {}
+    buckets = {}
+    for row in rows:
+        stats = {key: row[key] for key in aggregates}
+
+        dataset = datasets.get(row['dataset_id'])
+        if dataset is None:
+            dataset = datasets[row['dataset_id']] = {
+                'id': row['dataset_id'],
+                'filename': row['dataset__filename'],
+                'upload_date': row['dataset__upload_date'],
+                'bucket': row['bucket'],
+                **_empty_stats(),
+                'types': {},
+            }
+        _fold(dataset, stats)
+        kind = type_names[row['type_id']]
+        dataset['types'][kind] = stats
+
+        period = buckets.get(row['bucket'])
+        if period is None:
+            period = buckets[row['bucket']] = {'bucket': row['bucket'], 'datasets': 0, **_empty_stats(), 'types': {}}
+        _fold(period, stats)
+        period_type = period['types'].setdefault(kind, _empty_stats())
+        _fold(period_type, stats)
+
+    for dataset in datasets.values():
+        buckets[dataset['bucket']]['datasets'] += 1
+    for group in [*datasets.values(), *buckets.values()]:
+        group['types'] = dict(sorted(group['types'].items()))
+
+    return {
+        'start': start,
+        'end': end,
+        'bucket': bucket,
+        'buckets': list(buckets.values()),
+        'datasets': list(datasets.values()),
+    }
+
+
+def get_trends(start, end, bucket):
+    return cached('trends', (start.isoformat(), end.isoformat() if end else '', bucket),
+                  lambda: compute_trends(start, end, bucket))
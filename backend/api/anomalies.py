@@ -0,0 +1,77 @@
+"""
+Out-of-range and outlier detection for uploaded equipment rows.
+
+Every row gets an integer bitmask with one bit per (parameter, check).
+Checks run column-at-a-time on the uploaded DataFrame:
+
+* limits  - fixed per-type bounds from ``settings.EQUIPMENT_LIMITS``
+* zscore  - ``|x - mean| / std`` above the threshold within the row's type
+* iqr     - outside ``[Q1 - k*IQR, Q3 + k*IQR]`` within the row's type
+
+The statistical checks are skipped for types with fewer rows than
+``ANOMALY_MIN_GROUP_SIZE``, where mean/std/quartiles mean little.
+"""
+import numpy as np
+from django.conf import settings
+
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+CHECKS = ['low', 'high', 'zscore', 'iqr']
+COLUMNS = {'flowrate': 'Flowrate', 'pressure': 'Pressure', 'temperature': 'Temperature'}
+
+FLAGS = {}
+for _p_idx, _param in enumerate(PARAMETERS):
+    for _c_idx, _check in enumerate(CHECKS):
+        FLAGS[(_param, _check)] = 1 << (_p_idx * len(CHECKS) + _c_idx)
+
+
+def _limits_for(types, param):
+    limits = settings.EQUIPMENT_LIMITS
+    default_low, default_high = limits['default'][param]
+    lows = {kind: bounds[param][0] for kind, bounds in limits.items() if param in bounds}
+    highs = {kind: bounds[param][1] for kind, bounds in limits.items() if param in bounds}
+    low = types.map(lows).fillna(default_low).to_numpy(dtype=float)
+    high = types.map(highs).fillna(default_high).to_numpy(dtype=float)
+    return low, high
+
+
+def detect_anomalies(df):
+    """
+    Returns an int64 array of anomaly bitmasks aligned with ``df`` rows.
+    ``df`` uses the CSV headers ('Type', 'Flowrate', ...).
+    """
+    flags = np.zeros(len(df), dtype=np.int64)
+    if not len(df):
+        return flags
+
+    types = df['Type']
+    groups = df.groupby('Type', sort=False)
+    group_size = groups['Type'].transform('size').to_numpy()
+    enough = group_size >= settings.ANOMALY_MIN_GROUP_SIZE
+
+    for param in PARAMETERS:
+        column = COLUMNS[param]
+        values = df[column].to_numpy(dtype=float)
+
+        low, high = _limits_for(types, param)
+        flags[values < low] |= FLAGS[(param, 'low')]
+        flags[values > high] |= FLAGS[(param, 'high')]
+
+        by_type = groups[column]
+        mean = by_type.transform('mean').to_numpy(dtype=float)
+        std = by_type.transform('std').to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = np.abs(values - mean) / std
+        flags[enough & (zscore > settings.ANOMALY_ZSCORE_THRESHOLD)] |= FLAGS[(param, 'zscore')]
+
+        q1 = types.map(by_type.quantile(0.25)).to_numpy(dtype=float)
+        q3 = types.map(by_type.quantile(0.75)).to_numpy(dtype=float)
+        fence = settings.ANOMALY_IQR_FACTOR * (q3 - q1)
+        outside = (values < q1 - fence) | (values > q3 + fence)
+        flags[enough & outside] |= FLAGS[(param, 'iqr')]
+
+    return flags
+
+
+def describe_flags(flags):
+    """Expands a bitmask into labels such as ``'pressure:high'``."""
+    return [f'{param}:{check}' for (param, check), bit in FLAGS.items() if flags & bit]
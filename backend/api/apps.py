@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        # Registers the token cache invalidation signal handlers
+        from . import authentication  # noqa: F401
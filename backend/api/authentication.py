@@ -0,0 +1,150 @@
+"""
+Token authentication with a two-level cache.
+
+DRF's ``TokenAuthentication`` joins Token and User on every request.
+``CachedTokenAuthentication`` keeps validated tokens in a small
+per-process LRU (``TOKEN_CACHE_LOCAL_TTL``) backed by the shared Django
+cache (``TOKEN_CACHE_TTL``), and only falls back to the database on a miss.
+Both tiers hold only ``(user_id, is_active, is_staff)`` under a hash of the
+key; the user and token are rebuilt from it with every other user field
+deferred, so the raw key and password hash never reach the cache.
+
+Deleting a token (logout, rotation) or saving its user evicts the entry
+from the shared cache and from this process's LRU. Other processes drop
+their local copy within ``TOKEN_CACHE_LOCAL_TTL`` seconds, so keep it short.
+That bound relies on ``CACHES`` being shared by all workers (see settings);
+with a per-process cache a revoked token would keep working in other
+workers for up to ``TOKEN_CACHE_TTL``.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TTLCache:
+    """Bounded LRU whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = TTLCache(settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_LOCAL_TTL)
+_CACHED_USER_FIELDS = ('id', 'is_active', 'is_staff')
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _cache_key(key):
+    # Never put raw tokens in a shared cache
+    return 'auth:token:' + token_digest(key)
+
+
+def invalidate_token(key):
+    cache_key = _cache_key(key)
+    _local.delete(cache_key)
+    cache.delete(cache_key)
+
+
+def _rebuild(key, entry):
+    # Fields other than the cached ones are deferred and load on first access
+    User = get_user_model()
+    values = dict(zip(_CACHED_USER_FIELDS, entry))
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    user = User.from_db(None, names, [values[name] for name in names])
+    token = Token.from_db(None, ['key', 'user_id'], [key, user.pk])
+    token.user = user
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+
+        entry = _local.get(cache_key)
+        if entry is None:
+            entry = cache.get(cache_key)
+            if entry is None:
+                user = (
+                    get_user_model().objects.filter(auth_token__key=key)
+                    .values_list(*_CACHED_USER_FIELDS).first()
+                )
+                if user is None:
+                    raise exceptions.AuthenticationFailed('Invalid token.')
+                entry = tuple(user)
+                cache.set(cache_key, entry, settings.TOKEN_CACHE_TTL)
+            _local.set(cache_key, entry)
+
+        user, token = _rebuild(key, entry)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        return (user, token)
+
+
+def is_current(user_id, digest):
+    """Whether the token with this ``token_digest`` still belongs to ``user_id`` and the user is active."""
+    entry = cache.get('auth:token:' + digest)
+    if entry is not None:
+        return entry[0] == user_id and entry[1]
+    key = Token.objects.filter(user_id=user_id, user__is_active=True).values_list('key', flat=True).first()
+    return key is not None and hmac.compare_digest(token_digest(key), digest)
+
+
+@receiver(post_delete, sender=Token)
+def _evict_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=Token)
+def _evict_saved_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def _evict_user_tokens(sender, instance, **kwargs):
+    # Deactivation or password changes must not be masked by a cached user
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        invalidate_token(key)
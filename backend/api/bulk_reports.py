@@ -0,0 +1,200 @@
+"""
+Report inputs cache and the bulk (ZIP) report builder.
+
+A report only needs the dataset summary, the first 50 rows and two chart
+images. Datasets only change when their anomaly flags are recomputed, so
+the compact summary and the rendered chart PNGs are cached per dataset and
+shared by the single ``/api/report/<id>/`` view and the bulk export;
+``invalidate()`` drops them when flags change or a dataset is deleted.
+
+``stream_zip`` hands each report to a process pool (``REPORT_WORKERS``
+processes, started once per web process and reused) and writes every PDF
+into the ZIP stream as soon as it finishes, so the download starts with
+the first report instead of after the last. Inputs are gathered only a
+couple of reports per process ahead of the pool, so the first report is
+rendering while the rest are still being read. Pool processes only run
+Matplotlib/ReportLab; all DB access stays in the web process.
+
+Nothing is yielded until one report has succeeded: if every report fails
+``stream_zip`` raises ReportsFailed, and a broken pool (a crashed child)
+raises BrokenProcessPool at once instead of failing each pending report
+in turn. Either way the client never gets a well-formed ZIP of error
+entries; the view turns a failure before the first chunk into an error
+status, and a later one aborts the (then truncated) download.
+"""
+import itertools
+import multiprocessing
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import working_set
+from .serializers import EquipmentSerializer, equipment_records
+
+REPORT_ROWS = 50
+# Reports submitted ahead of the pool per process, so no worker waits for inputs
+SUBMIT_AHEAD = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ReportsFailed(Exception):
+    """Not one report of a bulk request could be built."""
+
+
+def _summary_key(dataset_id):
+    return f'report:summary:{dataset_id}'
+
+
+def _charts_key(dataset_id):
+    return f'report:charts:{dataset_id}'
+
+
+def report_inputs(dataset):
+    """Compact summary for ``build_pdf_report``: no full row list, just the first rows and the count."""
+    summary = cache.get(_summary_key(dataset.pk))
+    if summary is None:
+        from .views import get_dataset_summary
+
+        summary = get_dataset_summary(dataset, include_data=False)
+        columns = working_set.get(dataset)
+        if columns is not None:
+            summary['row_count'] = len(columns)
+            summary['data'] = equipment_records(columns, REPORT_ROWS)
+        else:
+            equipment = dataset.equipment.order_by('id')
+            summary['row_count'] = equipment.count()
+            summary['data'] = EquipmentSerializer(equipment[:REPORT_ROWS], many=True).data
+        cache.set(_summary_key(dataset.pk), summary, settings.REPORT_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate(dataset_ids):
+    cache.delete_many([key for pk in dataset_ids for key in (_summary_key(pk), _charts_key(pk))])
+
+
+def cached_charts(dataset_id):
+    return cache.get(_charts_key(dataset_id))
+
+
+def store_charts(dataset_id, charts):
+    cache.set(_charts_key(dataset_id), charts, settings.REPORT_CACHE_TIMEOUT)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a threaded server process can deadlock the child
+                _pool = ProcessPoolExecutor(settings.REPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _discard_pool(pool):
+    # A crashed child breaks the whole executor; the next request starts a fresh one
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Sink:
+    """Write-only buffer ZipFile streams into; drained after every entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def report_name(dataset):
+    stem = dataset.filename.rsplit('.', 1)[0]
+    return f'report_{dataset.pk}_{stem}.pdf'
+
+
+class Started:
+    """A body generator advanced to its first chunk, so errors before it raise in the view."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._first = next(chunks)
+
+    def __iter__(self):
+        yield self._first
+        yield from self._chunks
+
+    def close(self):
+        self._chunks.close()
+
+
+def stream_zip(datasets):
+    """Yields a ZIP of the reports for ``datasets``, entry by entry, in completion order."""
+    from .reports import render_report
+
+    pool = _get_pool()
+    remaining = iter(datasets)
+    futures = {}
+
+    def submit_more():
+        ahead = settings.REPORT_WORKERS * SUBMIT_AHEAD - len(futures)
+        try:
+            for dataset in itertools.islice(remaining, max(ahead, 0)):
+                # Plain values only; pool processes never load Django models
+                meta = SimpleNamespace(filename=dataset.filename, upload_date=dataset.upload_date)
+                future = pool.submit(render_report, meta, report_inputs(dataset), cached_charts(dataset.pk))
+                futures[future] = dataset
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+
+    submit_more()
+    sink = _Sink()
+    written = 0
+    failed = []
+    # Stored, not deflated: the PDFs are already compressed
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                dataset = futures.pop(future)
+                try:
+                    pdf, charts = future.result()
+                except BrokenProcessPool:
+                    # Every pending report went down with the pool
+                    _discard_pool(pool)
+                    raise
+                except Exception as e:
+                    failed.append((dataset, e))
+                else:
+                    store_charts(dataset.pk, charts)
+                    archive.writestr(report_name(dataset), pdf)
+                    written += 1
+            # Keep the pool busy while this chunk goes out
+            submit_more()
+            if written:
+                for failed_dataset, error in failed:
+                    archive.writestr(report_name(failed_dataset) + '.error.txt', f'Report failed: {error}\n')
+                failed = []
+                yield sink.drain()
+        if not written:
+            dataset, error = failed[0]
+            raise ReportsFailed(f'All {len(failed)} reports failed, e.g. dataset {dataset.pk}: {error}')
+    yield sink.drain()
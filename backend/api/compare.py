@@ -0,0 +1,178 @@
+"""
+Comparison of two datasets, joined on equipment name.
+
+Both datasets' columns come from the working set (api/working_set.py), so
+the join is a sorted merge over NumPy arrays rather than a row-by-row
+Python loop:
+
+* parameters are averaged per name first (``np.bincount`` with weights), so
+  a name listed twice in one upload is compared by its mean;
+* the sorted name vocabularies are merged (``union1d`` + ``searchsorted``)
+  into one item per name, marked ``added`` (only in b), ``removed`` (only
+  in a), ``changed`` (a parameter or the type differs) or ``unchanged``;
+* per-type aggregates (row counts and parameter averages) and their deltas
+  come from the rows themselves. Deltas are always ``b - a``.
+
+Datasets never change after upload, so the merge is cached per (a, b)
+pair, but only in compact form: each item's status, its position in
+either dataset's name vocabulary and one ordering per parameter, a few
+bytes per item. Every page, filter or ordering is selected from that
+index; names, types and values for the page's items are read back from
+the working set, so no request unpickles per-item strings or floats.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import working_set
+
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+STATUSES = ['unchanged', 'changed', 'added', 'removed']
+ORDERS = ['name'] + PARAMETERS
+
+
+def _per_name(columns):
+    names = columns['names']
+    counts = np.bincount(columns.name_codes, minlength=len(names))
+    means = {
+        field: np.bincount(columns.name_codes, weights=columns[field], minlength=len(names)) / np.maximum(counts, 1)
+        for field in PARAMETERS
+    }
+    # Type of the last row with each name
+    type_codes = np.zeros(len(names), dtype=columns.type_codes.dtype)
+    type_codes[columns.name_codes] = columns.type_codes
+    return names, columns['types'][type_codes], means
+
+
+def _locate(vocabulary, names):
+    """Index of each of ``names`` in the sorted ``vocabulary`` and whether it is there."""
+    if not len(vocabulary):
+        return np.zeros(len(names), dtype=np.int64), np.zeros(len(names), dtype=bool)
+    index = np.minimum(np.searchsorted(vocabulary, names), len(vocabulary) - 1)
+    return index, vocabulary[index] == names
+
+
+def _per_type(columns):
+    types = columns['types']
+    counts = np.bincount(columns.type_codes, minlength=len(types))
+    stats = {}
+    for code, kind in enumerate(types.tolist()):
+        if counts[code]:
+            stats[kind] = {'count': int(counts[code])}
+    for field in PARAMETERS:
+        sums = np.bincount(columns.type_codes, weights=columns[field], minlength=len(types))
+        for code, kind in enumerate(types.tolist()):
+            if counts[code]:
+                stats[kind][field] = float(sums[code] / counts[code])
+    return stats
+
+
+def _delta(a, b):
+    return {'a': a, 'b': b, 'delta': b - a if a is not None and b is not None else None}
+
+
+def _by_type(stats_a, stats_b, types, status):
+    rows = []
+    for kind in sorted(set(stats_a) | set(stats_b)):
+        a, b = stats_a.get(kind, {}), stats_b.get(kind, {})
+        in_type = types == kind
+        row = {
+            'type': kind,
+            'count': _delta(a.get('count', 0), b.get('count', 0)),
+            **{name: int(np.count_nonzero(in_type & (status == code))) for code, name in enumerate(STATUSES) if name != 'unchanged'},
+        }
+        for field in PARAMETERS:
+            row[field] = _delta(a.get(field), b.get(field))
+        rows.append(row)
+    return rows
+
+
+def _compute(dataset_a, dataset_b):
+    """The compact comparison index; see the module docstring."""
+    columns_a, columns_b = working_set.load(dataset_a), working_set.load(dataset_b)
+    names_a, types_a, means_a = _per_name(columns_a)
+    names_b, types_b, means_b = _per_name(columns_b)
+
+    names = np.union1d(names_a, names_b)
+    index_a, in_a = _locate(names_a, names)
+    index_b, in_b = _locate(names_b, names)
+
+    values_a = {field: np.where(in_a, means_a[field][index_a] if len(names_a) else np.nan, np.nan) for field in PARAMETERS}
+    values_b = {field: np.where(in_b, means_b[field][index_b] if len(names_b) else np.nan, np.nan) for field in PARAMETERS}
+    item_types_a = types_a[index_a] if len(names_a) else np.full(len(names), '')
+    item_types_b = types_b[index_b] if len(names_b) else np.full(len(names), '')
+
+    differs = item_types_a != item_types_b
+    for field in PARAMETERS:
+        differs |= values_a[field] != values_b[field]
+    status = np.full(len(names), STATUSES.index('unchanged'), dtype=np.int8)
+    status[in_a & in_b & differs] = STATUSES.index('changed')
+    status[~in_a] = STATUSES.index('added')
+    status[~in_b] = STATUSES.index('removed')
+    types = np.where(in_b, item_types_b, item_types_a)
+
+    totals = {'a_rows': len(columns_a), 'b_rows': len(columns_b), 'items': len(names)}
+    totals.update({name: int(np.count_nonzero(status == code)) for code, name in enumerate(STATUSES)})
+    # Largest absolute change first; items missing on one side last
+    orders = {
+        field: np.argsort(-np.nan_to_num(np.abs(values_b[field] - values_a[field]), nan=-1.0), kind='stable').astype(np.int32)
+        for field in PARAMETERS
+    }
+    return {
+        'index_a': np.where(in_a, index_a, -1).astype(np.int32),
+        'index_b': np.where(in_b, index_b, -1).astype(np.int32),
+        'status': status,
+        'orders': orders,
+        'totals': totals,
+        'by_type': _by_type(_per_type(columns_a), _per_type(columns_b), types, status),
+    }
+
+
+def comparison(dataset_a, dataset_b):
+    key = f'compare:index:{dataset_a.pk}:{dataset_b.pk}'
+    result = cache.get(key)
+    if result is None:
+        result = _compute(dataset_a, dataset_b)
+        cache.set(key, result, settings.COMPARE_CACHE_TIMEOUT)
+    return result
+
+
+def _items(dataset_a, dataset_b, result, page):
+    if not len(page):
+        return []
+    # Vocabularies are the sorted unique names, so stored positions hold even if an entry was rebuilt
+    names_a, types_a, means_a = _per_name(working_set.load(dataset_a))
+    names_b, types_b, means_b = _per_name(working_set.load(dataset_b))
+    items = []
+    for idx in page.tolist():
+        ia, ib = int(result['index_a'][idx]), int(result['index_b'][idx])
+        item = {
+            'name': str(names_b[ib] if ib >= 0 else names_a[ia]),
+            'type': str(types_b[ib] if ib >= 0 else types_a[ia]),
+            'status': STATUSES[result['status'][idx]],
+        }
+        for field in PARAMETERS:
+            a = float(means_a[field][ia]) if ia >= 0 else None
+            b = float(means_b[field][ib]) if ib >= 0 else None
+            item[field] = _delta(a, b)
+        items.append(item)
+    return items
+
+
+def compare(dataset_a, dataset_b, statuses=None, order='name', limit=100, offset=0):
+    if limit < 1 or offset < 0:
+        raise ValueError('limit must be positive and offset must not be negative')
+    result = comparison(dataset_a, dataset_b)
+
+    selected = np.arange(len(result['status'])) if order == 'name' else result['orders'][order]
+    if statuses:
+        selected = selected[np.isin(result['status'][selected], [STATUSES.index(name) for name in statuses])]
+    page = selected[offset:offset + limit]
+    items = _items(dataset_a, dataset_b, result, page)
+
+    return {
+        'totals': result['totals'],
+        'by_type': result['by_type'],
+        'count': len(selected),
+        'results': items,
+    }
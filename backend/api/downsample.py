@@ -0,0 +1,102 @@
+"""
+Point-budgeted views of a dataset's parameter columns for charting.
+
+* series  - Largest-Triangle-Three-Buckets over y against the row order
+            (or against another parameter, sorted), keeping the visual shape
+            of a line with at most ``budget`` points.
+* scatter - raw points when they fit the budget, otherwise a 2-D density
+            grid of roughly ``budget`` cells, returned sparsely.
+
+Datasets never change after upload, so results are cached per
+(dataset, kind, x, y, budget) until the cache entry times out.
+"""
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import working_set
+from .models import Equipment
+
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+KINDS = ['series', 'scatter']
+
+
+def load_columns(dataset, fields):
+    columns = working_set.get(dataset)
+    if columns is not None:
+        # Zero-copy views of the shared mapped columns
+        return [columns[field] for field in fields]
+    rows = Equipment.objects.filter(dataset_id=dataset.pk).order_by('id').values_list(*fields)
+    data = np.array(list(rows), dtype=float).reshape(-1, len(fields))
+    return [data[:, idx] for idx in range(len(fields))]
+
+
+def lttb(x, y, threshold):
+    """Indices of the points LTTB keeps; ``x`` must be ascending and ``threshold >= 3``."""
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+
+    # Buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        # Average of the next bucket is the third triangle vertex
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        ax, ay = x[selected], y[selected]
+        area = np.abs((ax - avg_x) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y - ay))
+        selected = start + int(np.argmax(area))
+        keep[bucket + 1] = selected
+    return keep
+
+
+def series(dataset, x_field, y_field, budget):
+    if x_field == 'index':
+        (y,) = load_columns(dataset, [y_field])
+        x = np.arange(len(y), dtype=float)
+    else:
+        x, y = load_columns(dataset, [x_field, y_field])
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+
+    keep = lttb(x, y, budget)
+    return {
+        'kind': 'series',
+        'total_points': len(y),
+        'points': np.column_stack([x[keep], y[keep]]).tolist(),
+    }
+
+
+def scatter(dataset, x_field, y_field, budget):
+    x, y = load_columns(dataset, [x_field, y_field])
+    if len(x) <= budget:
+        return {'kind': 'scatter', 'total_points': len(x), 'points': np.column_stack([x, y]).tolist()}
+
+    side = max(int(math.sqrt(budget)), 1)
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=side)
+    ix, iy = np.nonzero(counts)
+    return {
+        'kind': 'density',
+        'total_points': len(x),
+        'x_edges': x_edges.tolist(),
+        'y_edges': y_edges.tolist(),
+        # Sparse [x_bin, y_bin, count] triples; empty cells are omitted
+        'cells': np.column_stack([ix, iy, counts[ix, iy].astype(np.int64)]).tolist(),
+    }
+
+
+def downsample(dataset, kind, x_field, y_field, budget):
+    key = f'downsample:{dataset.pk}:{kind}:{x_field}:{y_field}:{budget}'
+    result = cache.get(key)
+    if result is None:
+        compute = series if kind == 'series' else scatter
+        result = compute(dataset, x_field, y_field, budget)
+        cache.set(key, result, settings.DOWNSAMPLE_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,76 @@
+"""
+Equipment type lookup: ``Equipment.type`` is a small-integer foreign key to
+``EquipmentType`` instead of the type name repeated on every row.
+
+Types are only ever added (never renamed or deleted), so each process keeps
+the whole ``name <-> id`` mapping in memory and only asks the database
+about names it has not seen. Ingest encodes a dataframe's types with one
+``ids_for`` call; readers turn ids back into names with ``name``/``names``
+without joining ``api_equipmenttype``. The mapping is kept per database,
+and types created inside a transaction are only remembered once it commits;
+ingest creates them before opening its transaction.
+"""
+import threading
+
+from django.db import connection, transaction
+
+from .models import EquipmentType
+
+_mappings = {}
+_lock = threading.Lock()
+
+
+def _mapping():
+    key = connection.settings_dict['NAME']
+    with _lock:
+        mapping = _mappings.get(key)
+        if mapping is None:
+            mapping = _mappings[key] = ({}, {})
+        return mapping
+
+
+def _remember(pairs):
+    by_name, by_id = _mapping()
+    with _lock:
+        for name, type_id in pairs:
+            by_name[name] = type_id
+            by_id[type_id] = name
+
+
+def _fetch(queryset, created=False):
+    pairs = list(queryset.values_list('name', 'id'))
+    if created:
+        # Rows written by an open transaction could still be rolled back
+        transaction.on_commit(lambda: _remember(pairs))
+    else:
+        _remember(pairs)
+    return dict(pairs)
+
+
+def ids_for(names):
+    """``{name: id}`` for ``names``, creating the types that do not exist yet."""
+    ids, _ = _mapping()
+    found = {name: ids[name] for name in set(names) if name in ids}
+    missing = [name for name in set(names) if name not in found]
+    if missing:
+        found.update(_fetch(EquipmentType.objects.filter(name__in=missing)))
+        missing = [name for name in missing if name not in found]
+    if missing:
+        EquipmentType.objects.bulk_create([EquipmentType(name=name) for name in missing], ignore_conflicts=True)
+        found.update(_fetch(EquipmentType.objects.filter(name__in=missing), created=True))
+    return found
+
+
+def names(type_ids):
+    """``{id: name}`` for ``type_ids``."""
+    _, known = _mapping()
+    type_ids = set(type_ids)
+    result = {type_id: known[type_id] for type_id in type_ids if type_id in known}
+    if len(result) < len(type_ids):
+        # The table is small; load all of it
+        result.update({type_id: name for name, type_id in _fetch(EquipmentType.objects.all()).items() if type_id in type_ids})
+    return result
+
+
+def name(type_id):
+    return names([type_id])[type_id]
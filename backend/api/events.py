@@ -0,0 +1,213 @@
+"""
+Server-sent events for dataset activity.
+
+Views call ``publish(type, data, user=None)``; ``event_stream`` holds
+one long-lived ``text/event-stream`` response per client and forwards every
+event addressed to everyone or to that client's user. Event types:
+
+* ``ingest.progress`` - stage and row counts of an upload, sent to the uploader only
+* ``dataset.ready``   - a new dataset and its summary, sent to everyone
+* ``dataset.deleted`` - a dataset was tombstoned, sent to everyone
+
+Clients authenticate with an ``Authorization: Token`` header or, since
+EventSource cannot set headers, with ``?ticket=`` from ``POST
+/api/events/ticket/``: a random, single-use value that expires after
+``EVENTS_TICKET_TTL`` seconds, so the long-lived token never appears in a
+URL or an access log. Open streams re-check every ``EVENTS_AUTH_RECHECK``
+seconds that the token behind them is still current, and end once it has
+been revoked (logout, rotation, deactivation).
+
+Streaming needs the ASGI app (``backend/asgi.py``, e.g. under uvicorn);
+the WSGI app cannot hold the connection open without tying up a worker.
+
+The broadcaster is pluggable via ``EVENTS_BROADCASTER``. The default
+``InProcessBroadcaster`` only reaches clients connected to the same
+process, so with several workers swap in a backend built on a shared bus
+(Redis pub/sub, Postgres LISTEN/NOTIFY) that implements the same three
+methods.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import secrets
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework import exceptions
+
+from . import authentication
+
+
+class Event:
+    def __init__(self, id, type, data, user_id=None):
+        self.id = id
+        self.type = type
+        self.user_id = user_id
+        # Encoded once, however many clients receive it
+        self.message = f'id: {id}\nevent: {type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'.encode()
+
+
+class InProcessBroadcaster:
+    """
+    Fans events out to subscriber queues owned by event loops in this
+    process. ``publish`` is thread-safe, so sync views can call it.
+    Clients too slow to drain ``EVENTS_QUEUE_SIZE`` events are disconnected
+    and resume from their Last-Event-ID on reconnect.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=settings.EVENTS_REPLAY_SIZE)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, type, data, user_id=None):
+        with self._lock:
+            event = Event(next(self._ids), type, data, user_id)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            loop, queue = subscriber
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Loop already closed; the stream is gone
+                self.unsubscribe(subscriber)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """Returns ``(subscription, replay)``; ``replay`` holds events missed since ``last_event_id``."""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(settings.EVENTS_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(subscription)
+            replay = [event for event in self._history if last_event_id is not None and event.id > last_event_id]
+        return subscription, replay
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+def _offer(queue, event):
+    if queue.full():
+        # Sentinel tells the stream to close instead of silently dropping events
+        while not queue.empty():
+            queue.get_nowait()
+        event = None
+    queue.put_nowait(event)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = import_string(settings.EVENTS_BROADCASTER)()
+    return _broadcaster
+
+
+def publish(type, data, user=None):
+    return get_broadcaster().publish(type, data, user.id if user is not None else None)
+
+
+def _ticket_key(ticket):
+    return 'events:ticket:' + hashlib.sha256(ticket.encode()).hexdigest()
+
+
+def issue_ticket(user, token):
+    """A single-use ``?ticket=`` for ``event_stream``, valid for ``EVENTS_TICKET_TTL`` seconds."""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_key(ticket), (user.id, authentication.token_digest(token.key)), settings.EVENTS_TICKET_TTL)
+    return ticket
+
+
+def redeem_ticket(ticket):
+    """Returns ``(user_id, token_digest)`` for a live ticket, or None; a ticket works once."""
+    key = _ticket_key(ticket)
+    entry = cache.get(key)
+    # Only the request whose delete removed the entry may use it
+    if entry is None or not cache.delete(key):
+        return None
+    return entry
+
+
+async def _stream(user_id, last_event_id, digest):
+    broadcaster = get_broadcaster()
+    subscription, replay = broadcaster.subscribe(last_event_id)
+    _, queue = subscription
+    loop = asyncio.get_running_loop()
+    next_check = loop.time() + settings.EVENTS_AUTH_RECHECK
+    try:
+        # Tell EventSource how long to wait before reconnecting
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'.encode()
+        for event in replay:
+            if event.user_id in (None, user_id):
+                yield event.message
+        while True:
+            if loop.time() >= next_check:
+                if not await sync_to_async(authentication.is_current)(user_id, digest):
+                    break
+                next_check = loop.time() + settings.EVENTS_AUTH_RECHECK
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield b': keepalive\n\n'
+                continue
+            if event is None:
+                break
+            if event.user_id in (None, user_id):
+                yield event.message
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+_authenticator = authentication.CachedTokenAuthentication()
+
+
+async def _authenticate(request):
+    ticket = request.GET.get('ticket')
+    if ticket:
+        return await sync_to_async(redeem_ticket)(ticket)
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0].lower() != 'token':
+        return None
+    try:
+        user, _ = await sync_to_async(_authenticator.authenticate_credentials)(header[1])
+    except exceptions.AuthenticationFailed:
+        return None
+    return user.id, authentication.token_digest(header[1])
+
+
+async def event_stream(request):
+    """``GET /api/events/`` with an ``Authorization: Token`` header or a ``?ticket=``."""
+    if not isinstance(request, ASGIRequest):
+        # WSGI would buffer the endless stream and pin a worker thread
+        return HttpResponse('Event stream requires the ASGI server', status=501, content_type='text/plain')
+    credentials = await _authenticate(request)
+    if credentials is None:
+        return HttpResponse(status=401)
+    user_id, digest = credentials
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    response = StreamingHttpResponse(_stream(user_id, last_event_id, digest), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
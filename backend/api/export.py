@@ -0,0 +1,178 @@
+"""
+Dataset export engines.
+
+Every format reads equipment rows in fixed-size batches from the shared
+memory-mapped columns (api.working_set), or through a server-side queryset
+iterator for datasets too big to cache, so memory use stays flat no matter
+how many rows a dataset holds. CSV is generated on the fly; Parquet and XLSX writers need a
+seekable sink, so they spool to a temporary file that is then streamed. That file is
+built inside the request, so those two formats refuse datasets above
+settings.EXPORT_MAX_ROWS (and XLSX above the sheet limit) with ExportTooLarge.
+"""
+import csv
+import tempfile
+import zlib
+
+from django.conf import settings
+
+from . import equipment_types, working_set
+from .models import Equipment
+
+EXPORT_HEADERS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+EXPORT_FIELDS = ['name', 'type_id', 'flowrate', 'pressure', 'temperature']
+EXPORT_BATCH_SIZE = 5000
+# Flush CSV output to the client roughly every 64 KiB
+CSV_FLUSH_BYTES = 64 * 1024
+# An XLSX sheet holds 1,048,576 rows, one of which is the header
+XLSX_MAX_ROWS = 1048575
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class ExportUnavailable(Exception):
+    """Raised when the optional library behind an export format is missing."""
+
+
+class ExportTooLarge(Exception):
+    """Raised when a dataset has too many rows for a spooled (Parquet/XLSX) export."""
+
+
+class _LineBuffer:
+    # csv.writer wants a file; collect what it writes and hand it back
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, value):
+        self.parts.append(value)
+        self.size += len(value)
+
+    def drain(self):
+        data = ''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def row_count(dataset):
+    columns = working_set.get(dataset)
+    if columns is not None:
+        return len(columns)
+    return Equipment.objects.filter(dataset=dataset).count()
+
+
+def check_size(dataset, fmt):
+    limit = settings.EXPORT_MAX_ROWS
+    if fmt == 'xlsx':
+        limit = min(limit, XLSX_MAX_ROWS)
+    count = row_count(dataset)
+    if count > limit:
+        raise ExportTooLarge(
+            f'Dataset has {count} rows; {fmt.upper()} export is limited to {limit}. Use the CSV export instead.'
+        )
+
+
+def iter_rows(dataset):
+    columns = working_set.get(dataset)
+    if columns is not None:
+        return _iter_columns(columns)
+    return _iter_queryset(dataset)
+
+
+def _iter_queryset(dataset):
+    rows = (
+        Equipment.objects.filter(dataset=dataset)
+        .order_by('id')
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_BATCH_SIZE)
+    )
+    type_names = {}
+    for name, type_id, *values in rows:
+        if type_id not in type_names:
+            type_names.update(equipment_types.names([type_id]))
+        yield (name, type_names[type_id], *values)
+
+
+def _iter_columns(columns):
+    for start in range(0, len(columns), EXPORT_BATCH_SIZE):
+        yield from columns.rows(start, start + EXPORT_BATCH_SIZE)
+
+
+def iter_batches(dataset):
+    batch = []
+    for row in iter_rows(dataset):
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(dataset):
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for row in iter_rows(dataset):
+        writer.writerow(row)
+        if buffer.size >= CSV_FLUSH_BYTES:
+            yield buffer.drain().encode('utf-8')
+    yield buffer.drain().encode('utf-8')
+
+
+def gzip_stream(chunks, level=6):
+    # wbits=16+MAX_WBITS makes zlib emit a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_parquet(dataset):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable('Parquet export requires pyarrow')
+    check_size(dataset, 'parquet')
+
+    schema = pa.schema([
+        ('Equipment Name', pa.string()),
+        ('Type', pa.string()),
+        ('Flowrate', pa.float64()),
+        ('Pressure', pa.float64()),
+        ('Temperature', pa.float64()),
+    ])
+    sink = tempfile.TemporaryFile()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in iter_batches(dataset):
+            columns = list(zip(*batch))
+            # Each batch becomes its own row group
+            writer.write_table(pa.Table.from_arrays([pa.array(col) for col in columns], schema=schema))
+    sink.seek(0)
+    return sink
+
+
+def write_xlsx(dataset):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportUnavailable('XLSX export requires openpyxl')
+    check_size(dataset, 'xlsx')
+
+    # write_only workbooks stream rows to disk instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Equipment')
+    sheet.append(EXPORT_HEADERS)
+    for row in iter_rows(dataset):
+        sheet.append(row)
+    sink = tempfile.TemporaryFile()
+    workbook.save(sink)
+    sink.seek(0)
+    return sink
@@ -0,0 +1,230 @@
+"""
+CSV ingest engine.
+
+Holds the pandas-dependent upload path so that api.views (and every worker
+serving only reads) does not pay for importing pandas.
+"""
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from . import analytics, equipment_types
+from .anomalies import detect_anomalies
+from .instrumentation import span
+from .models import Dataset, Equipment, ParameterSketch
+from .sketches import build_sketches
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+TEXT_COLUMNS = ['Equipment Name', 'Type']
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+
+class IngestError(Exception):
+    """The upload is unusable as a whole (e.g. missing columns)."""
+
+
+class ParseResult:
+    """
+    Valid rows plus a per-row error report. ``errors`` holds at most
+    ``UPLOAD_MAX_REPORTED_ERRORS`` entries of ``{'row', 'column', 'reason'}``,
+    where ``row`` is the file line number minus one (the header is line 1,
+    so the first data line is row 1 and blank lines still count) and
+    ``column`` is None for a line with more fields than the header.
+    ``error_count`` and ``rejected`` are the full totals.
+    """
+
+    def __init__(self, df, errors, error_count, rejected):
+        self.df = df
+        self.errors = errors
+        self.error_count = error_count
+        self.rejected = rejected
+
+
+def _read(file_obj, dtype):
+    file_obj.seek(0)
+    return pd.read_csv(file_obj, engine=CSV_ENGINE, usecols=REQUIRED_COLUMNS, dtype=dtype)
+
+
+def _read_lines(file_obj):
+    """
+    Slow path: parses with the csv module, which knows the line each record
+    starts on and lets over-long lines be reported instead of aborting the
+    parse. Returns the required columns as text, each record's row number
+    and ``(row, reason)`` for every line that was dropped.
+    """
+    file_obj.seek(0)
+    stream = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(stream)
+        header = next(reader)
+        width = len(header)
+        positions = [header.index(col) for col in REQUIRED_COLUMNS]
+        records, rows, bad_lines = [], [], []
+        end = reader.line_num
+        for record in reader:
+            # Rows are numbered by the line a record starts on, less the header
+            row, end = end, reader.line_num
+            if not record:
+                continue
+            if len(record) > width:
+                bad_lines.append((row, f'expected {width} fields, got {len(record)}'))
+                continue
+            # Short lines are padded, like pandas does, and reported as missing values
+            record += [''] * (width - len(record))
+            records.append([record[pos] for pos in positions])
+            rows.append(row)
+    finally:
+        stream.detach()
+    raw = pd.DataFrame(records, columns=REQUIRED_COLUMNS, dtype=object)
+    return raw, np.array(rows, dtype=np.int64), bad_lines
+
+
+def read_upload(file_obj):
+    try:
+        # Check the header alone first so a bad file fails before a full parse
+        file_obj.seek(0)
+        header = pd.read_csv(file_obj, nrows=0).columns
+    except pd.errors.EmptyDataError:
+        raise IngestError('File is empty')
+    except UnicodeDecodeError:
+        raise IngestError('File is not UTF-8 encoded')
+    except pd.errors.ParserError as e:
+        raise IngestError(f'Could not parse CSV header: {e}')
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise IngestError(f'Missing columns. Required: {REQUIRED_COLUMNS}')
+
+    with span('read_csv'):
+        dtype = {col: str for col in TEXT_COLUMNS}
+        try:
+            # Fast path: clean files parse straight into float64
+            df = _read(file_obj, {**dtype, **{col: 'float64' for col in NUMERIC_COLUMNS}})
+        except (ValueError, UnicodeDecodeError):
+            df = None
+    if df is not None:
+        with span('validate'):
+            parsed = validate(df)
+        if not parsed.rejected:
+            return parsed
+
+    # Some value is not a number, a line is ragged or a row is rejected: the
+    # pandas index no longer matches the file's lines once blank lines are
+    # skipped, so re-parse as text and number rows by the lines they came from
+    with span('read_csv'):
+        try:
+            raw, rows, bad_lines = _read_lines(file_obj)
+        except UnicodeDecodeError:
+            raise IngestError('File is not UTF-8 encoded')
+        except csv.Error as e:
+            raise IngestError(f'Could not parse CSV: {e}')
+        df = raw.copy()
+        for col in NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(raw[col], errors='coerce')
+
+    with span('validate'):
+        return validate(df, raw, rows, bad_lines)
+
+
+def validate(df, raw=None, rows=None, bad_lines=()):
+    """
+    Splits ``df`` into valid rows and an error report. ``raw`` holds the text
+    values if parsed as text, ``rows`` each row's number (default: 1..n) and
+    ``bad_lines`` the ``(row, reason)`` of lines dropped by the parser.
+    """
+    if rows is None:
+        rows = np.arange(1, len(df) + 1)
+    problems = [(np.array([row for row, r in bad_lines if r == reason], dtype=np.int64), None, reason)
+                for reason in dict.fromkeys(reason for _, reason in bad_lines)]
+    invalid = np.zeros(len(df), dtype=bool)
+
+    for col in TEXT_COLUMNS:
+        values = df[col].str.strip()
+        df[col] = values
+        bad = (values.isna() | (values == '')).to_numpy()
+        problems.append((rows[bad], col, 'missing value'))
+        invalid |= bad
+
+    for col in NUMERIC_COLUMNS:
+        values = df[col].to_numpy(dtype=float)
+        nan = np.isnan(values)
+        if raw is not None:
+            # NaN from coercion of a non-empty cell means the text was not a number
+            text = raw[col].str.strip()
+            blank = (text.isna() | (text == '')).to_numpy()
+            problems.append((rows[nan & blank], col, 'missing value'))
+            problems.append((rows[nan & ~blank], col, 'not a number'))
+        else:
+            problems.append((rows[nan], col, 'missing value'))
+        infinite = np.isinf(values)
+        problems.append((rows[infinite], col, 'not finite'))
+        invalid |= nan | infinite
+
+    limit = settings.UPLOAD_MAX_REPORTED_ERRORS
+    errors = []
+    error_count = 0
+    for bad_rows, col, reason in problems:
+        error_count += len(bad_rows)
+        for row in bad_rows[:max(limit - len(errors), 0)]:
+            errors.append({'row': int(row), 'column': col, 'reason': reason})
+    errors.sort(key=lambda e: (e['row'], -1 if e['column'] is None else REQUIRED_COLUMNS.index(e['column'])))
+
+    valid = df[~invalid].reset_index(drop=True)
+    return ParseResult(valid, errors[:limit], error_count, int(invalid.sum()) + len(bad_lines))
+
+
+def build_equipment(dataset, df, flags, type_ids):
+    # Whole columns as Python lists; far faster than iterrows
+    columns = zip(
+        df['Equipment Name'].tolist(),
+        df['Type'].map(type_ids).tolist(),
+        df['Flowrate'].tolist(),
+        df['Pressure'].tolist(),
+        df['Temperature'].tolist(),
+        flags.tolist(),
+    )
+    return [
+        Equipment(dataset=dataset, name=name, type_id=type_id, flowrate=flowrate,
+                  pressure=pressure, temperature=temperature, anomaly_flags=flag)
+        for name, type_id, flowrate, pressure, temperature, flag in columns
+    ]
+
+
+def ingest_dataframe(filename, df, content_hash=None, owner=None, progress=None):
+    """
+    Stores ``df`` as a new Dataset and returns ``(dataset, anomaly_flags)``.
+    Raises IntegrityError if ``owner`` already has a dataset with ``content_hash``.
+    ``progress(rows_inserted, rows_total)`` is called after each insert batch.
+    """
+    # Flag out-of-range and outlier rows before they hit the DB
+    with span('anomalies'):
+        flags = detect_anomalies(df)
+
+    # New equipment types are committed on their own, before the dataset's transaction
+    type_ids = equipment_types.ids_for(df['Type'].unique().tolist())
+
+    with transaction.atomic():
+        # Create Dataset
+        dataset = Dataset.objects.create(filename=filename, content_hash=content_hash, owner=owner)
+
+        equipment_list = build_equipment(dataset, df, flags, type_ids)
+
+        with span('bulk_create'):
+            batch_size = settings.INGEST_BATCH_SIZE
+            for start in range(0, len(equipment_list), batch_size):
+                Equipment.objects.bulk_create(equipment_list[start:start + batch_size])
+                if progress:
+                    progress(min(start + batch_size, len(equipment_list)), len(equipment_list))
+        with span('sketches'):
+            ParameterSketch.objects.bulk_create(build_sketches(dataset, df))
+    analytics.invalidate_analytics()
+    return dataset, flags
@@ -0,0 +1,256 @@
+"""
+Lightweight request instrumentation.
+
+``InstrumentationMiddleware`` gives every request a timing collector and
+counts the SQL it runs. Code marks hot phases with ``span('name')``; the
+phases, SQL totals and overall duration come back as a ``Server-Timing``
+header and feed in-process latency histograms that ``/api/metrics/``
+renders in the Prometheus text format.
+
+Streamed bodies (CSV export, bulk report ZIPs, events) keep collecting
+while they are iterated: the metrics are recorded when the body is closed,
+so they include the work done after the view returned. The
+``Server-Timing`` header has to be sent first, so for those responses it
+only covers the time to the first byte. Event streams (``text/event-stream``)
+stay open for as long as the client is connected, so their duration is
+not request latency: they are counted, but kept out of the latency
+histogram.
+
+``/api/metrics/`` does not take user tokens; scrapers are let in by
+``Authorization: Bearer <METRICS_TOKEN>`` or by address
+(``METRICS_ALLOWED_IPS``, empty by default: behind a reverse proxy on the
+same host every client would appear to come from loopback).
+
+The cost per request is a few ``perf_counter`` calls and dict updates, so
+it is meant to stay on in production. Metrics live in process memory:
+with several workers, each one reports its own counters and Prometheus
+should scrape every worker (or aggregate by instance).
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import BasePermission
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.spans = {}
+        self.sql_count = 0
+        self.sql_bytes = 0
+        self.sql_seconds = 0.0
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][idx] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for label_values, counts, total in sorted(series):
+            base = _format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {total}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f'{self.name}{{{_format_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+REQUEST_LATENCY = Histogram('api_request_duration_seconds', 'Request latency per view.', ('view', 'method'))
+PHASE_LATENCY = Histogram('api_phase_duration_seconds', 'Time spent in instrumented phases.', ('view', 'phase'))
+SQL_QUERIES = Counter('api_sql_queries_total', 'SQL statements executed per view.', ('view',))
+SQL_BYTES = Counter('api_sql_bytes_total', 'Bytes of SQL statement text sent per view.', ('view',))
+RESPONSES = Counter('api_responses_total', 'Responses per view and status code.', ('view', 'status'))
+ADMISSION_REJECTIONS = Counter('api_admission_rejections_total', 'Requests shed because a heavy pool was full.', ('pool',))
+METRICS = (REQUEST_LATENCY, PHASE_LATENCY, SQL_QUERIES, SQL_BYTES, RESPONSES, ADMISSION_REJECTIONS)
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def span(name):
+    """Times the enclosed block as phase ``name`` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def _count_sql(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql_seconds += time.perf_counter() - start
+        timings.sql_count += 1
+        timings.sql_bytes += len(sql)
+
+
+def _server_timing(timings, total):
+    entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in timings.spans.items()]
+    entries.append(f'db;dur={timings.sql_seconds * 1000:.1f};desc="{timings.sql_count} queries, {timings.sql_bytes} B"')
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+@contextmanager
+def _collecting(timings):
+    token = _current.set(timings)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_count_sql))
+            yield
+    finally:
+        _current.reset(token)
+
+
+class _TimedStream:
+    """Streamed response body that keeps collecting timings for its request until it is closed."""
+
+    def __init__(self, chunks, timings, finish):
+        self._chunks = chunks
+        self._timings = timings
+        self._finish = finish
+        self._iterator = None
+
+    def __iter__(self):
+        self._iterator = iter(self._chunks)
+        return self
+
+    def __next__(self):
+        with _collecting(self._timings):
+            return next(self._iterator)
+
+    def __aiter__(self):
+        self._iterator = aiter(self._chunks)
+        return self
+
+    async def __anext__(self):
+        with _collecting(self._timings):
+            return await anext(self._iterator)
+
+    def close(self):
+        self._finish()
+
+
+def _record(request, response, timings, total):
+    match = getattr(request, 'resolver_match', None)
+    view = match.url_name if match and match.url_name else 'unmatched'
+    if not response.get('Content-Type', '').startswith('text/event-stream'):
+        REQUEST_LATENCY.observe(total, view, request.method)
+    for name, seconds in timings.spans.items():
+        PHASE_LATENCY.observe(seconds, view, name)
+    SQL_QUERIES.inc(timings.sql_count, view)
+    SQL_BYTES.inc(timings.sql_bytes, view)
+    RESPONSES.inc(1, view, str(response.status_code))
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        start = time.perf_counter()
+        with _collecting(timings):
+            response = self.get_response(request)
+
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = _server_timing(timings, time.perf_counter() - start)
+
+        if not response.streaming:
+            _record(request, response, timings, time.perf_counter() - start)
+            return response
+
+        recorded = []
+
+        def finish():
+            if not recorded:
+                recorded.append(True)
+                _record(request, response, timings, time.perf_counter() - start)
+
+        # Django closes the body once it has been sent or the client went away
+        response.streaming_content = _TimedStream(response.streaming_content, timings, finish)
+        return response
+
+
+class MetricsPermission(BasePermission):
+    """Scrapers from ``METRICS_ALLOWED_IPS``, or with the ``METRICS_TOKEN`` bearer token."""
+
+    def has_permission(self, request, view):
+        if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+            return True
+        token = settings.METRICS_TOKEN
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        return bool(token) and len(header) == 2 and header[0].lower() == 'bearer' \
+            and hmac.compare_digest(header[1].encode(), token.encode())
@@ -0,0 +1,179 @@
+"""
+Background ingest jobs.
+
+``POST /api/upload/?async=1`` spools the file to ``INGEST_SPOOL_DIR``,
+records a queued IngestJob and answers 202 with its id; the client polls
+``/api/ingest/jobs/<id>/`` (or listens for ``ingest.progress`` events).
+
+``INGEST_ASYNC_BACKEND`` picks where jobs run:
+
+* ``'thread'`` - a pool of ``INGEST_WORKERS`` threads in the web process,
+  handed each job once its row is committed. The pool only knows about
+  jobs handed to it since the process started: jobs still queued or
+  running when it restarts stay that way until an ``ingest_worker`` runs
+  (``--once`` is enough to drain them).
+* ``'worker'`` - only ``manage.py ingest_worker`` processes, which poll
+  the job table. Any number may run; a conditional UPDATE hands each job
+  to exactly one of them. The worker also picks up jobs a restarted web
+  process left queued or running.
+
+Rows inserted so far are kept in the cache while a job runs (the job row
+itself only changes outside the insert transaction); with several
+processes, use a shared cache backend to see them from every worker.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from . import events
+from .models import Dataset, IngestJob
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def spool(file_obj):
+    """Copies an upload to the spool directory; returns ``(path, sha256 hex digest)``."""
+    spool_dir = Path(settings.INGEST_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    path = spool_dir / f'{uuid.uuid4().hex}.csv'
+    digest = hashlib.sha256()
+    with open(path, 'wb') as out:
+        for chunk in file_obj.chunks():
+            digest.update(chunk)
+            out.write(chunk)
+    return str(path), digest.hexdigest()
+
+
+def enqueue(job):
+    """Schedules ``job`` on the in-process pool once the surrounding transaction commits."""
+    if settings.INGEST_ASYNC_BACKEND == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(settings.INGEST_WORKERS, thread_name_prefix='ingest')
+    return _executor
+
+
+def _run_in_thread(job_id):
+    try:
+        job = claim(job_id)
+        if job is not None:
+            run(job)
+    finally:
+        # Pool threads outlive the job; don't leave their connections open
+        connection.close()
+
+
+def claim(job_id=None):
+    """Marks a queued job (``job_id``, or the oldest) running and returns it; None if there is none."""
+    queued = IngestJob.objects.filter(status=IngestJob.QUEUED)
+    candidates = [job_id] if job_id is not None else queued.order_by('created_at').values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        if queued.filter(pk=pk).update(status=IngestJob.RUNNING, started_at=timezone.now()):
+            return IngestJob.objects.select_related('owner').get(pk=pk)
+    return None
+
+
+def requeue_stale():
+    """Puts jobs running for longer than ``INGEST_JOB_TIMEOUT`` (e.g. a killed worker) back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=settings.INGEST_JOB_TIMEOUT)
+    return IngestJob.objects.filter(status=IngestJob.RUNNING, started_at__lt=cutoff).update(status=IngestJob.QUEUED)
+
+
+def _progress_key(job_id):
+    return f'ingest:job:{job_id}:rows'
+
+
+def rows_processed(job):
+    if job.status == IngestJob.RUNNING:
+        return cache.get(_progress_key(job.pk), job.rows_processed)
+    return job.rows_processed
+
+
+def _finish(job, status, **fields):
+    fields.update(status=status, finished_at=timezone.now())
+    IngestJob.objects.filter(pk=job.pk).update(**fields)
+    cache.delete(_progress_key(job.pk))
+
+
+def run(job):
+    """Parses and stores a claimed job's file, recording the outcome on the job."""
+    from . import ingest
+    from .views import publish_dataset_ready
+
+    def progress(stage, **counts):
+        events.publish('ingest.progress', {'job_id': job.pk, 'upload_id': job.upload_id, 'filename': job.filename,
+                                           'stage': stage, **counts}, user=job.owner)
+
+    def inserted(done, total):
+        cache.set(_progress_key(job.pk), done, settings.INGEST_JOB_TIMEOUT)
+        progress('inserting', rows_inserted=done, rows_total=total)
+
+    try:
+        progress('parsing')
+        with open(job.path, 'rb') as f:
+            parsed = ingest.read_upload(f)
+        IngestJob.objects.filter(pk=job.pk).update(
+            rows_total=len(parsed.df), rows_rejected=parsed.rejected,
+            error_count=parsed.error_count, errors=parsed.errors)
+        if not len(parsed.df):
+            raise ingest.IngestError('No valid rows in file')
+        progress('parsed', rows_valid=len(parsed.df), rows_rejected=parsed.rejected)
+
+        try:
+            dataset, _ = ingest.ingest_dataframe(job.filename, parsed.df, content_hash=job.content_hash,
+                                                 owner=job.owner, progress=inserted)
+        except IntegrityError:
+            # The same file was imported while this job waited
+            existing = Dataset.objects.filter(owner=job.owner, content_hash=job.content_hash).first()
+            if existing is None:
+                raise ingest.IngestError('Upload conflicted with a concurrent change, please retry')
+            _finish(job, IngestJob.DUPLICATE, dataset=existing)
+            progress('done', dataset_id=existing.pk, duplicate=True)
+            return
+
+        _finish(job, IngestJob.DONE, dataset=dataset, rows_processed=len(parsed.df))
+        progress('done', dataset_id=dataset.pk)
+        publish_dataset_ready(dataset, len(parsed.df))
+    except Exception as e:
+        _finish(job, IngestJob.FAILED, error=str(e))
+        progress('failed', error=str(e))
+    finally:
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+
+
+def serialize_job(job):
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'filename': job.filename,
+        'upload_id': job.upload_id,
+        'rows_total': job.rows_total,
+        'rows_processed': rows_processed(job),
+        'rows_rejected': job.rows_rejected,
+        'error_count': job.error_count,
+        'errors': job.errors,
+        'error': job.error,
+        'dataset_id': job.dataset_id,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
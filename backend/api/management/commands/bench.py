@@ -0,0 +1,115 @@
+import json
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+
+def consume(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time upload, summary, history, report and export end to end on synthetic data '
+        'in a throwaway database, optionally comparing against a stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000', help='Comma-separated dataset sizes (default: 1000,10000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the median is reported')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results as JSON to this path')
+        parser.add_argument('--baseline', help='Compare against a results JSON written earlier')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown vs. baseline before a case counts as a regression (default: 0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        # Imported here so the command only configures the test database when it runs
+        from benchmarks.common import api_client, describe, throwaway_database, timer, unthrottled
+        from benchmarks.synthetic import write_csv
+
+        sizes = [int(size) for size in options['rows'].split(',') if size]
+        repeat = options['repeat']
+        samples = {}
+
+        # Time steady-state requests, not the first request's lazy engine imports
+        from api.preload import preload
+        preload()
+
+        # --repeat runs would otherwise run into the per-user upload/report/export rates
+        with throwaway_database(), unthrottled(), tempfile.TemporaryDirectory() as tmp:
+            client = api_client()
+            for rows in sizes:
+                self.stdout.write(f'Benchmarking {rows} rows...')
+
+                dataset_id = None
+                for run in range(repeat):
+                    # A fresh file per run; identical content would hit upload deduplication
+                    path = write_csv(Path(tmp) / f'bench_{rows}_{run}.csv', rows, seed=options['seed'] + run)
+                    with open(path, 'rb') as f, timer(samples, f'upload@{rows}'):
+                        response = client.post('/api/upload/', {'file': f})
+                    if response.status_code != 201:
+                        raise CommandError(f'Upload failed: {response.status_code} {response.content[:200]}')
+                    dataset_id = response.json()['id']
+
+                cases = {
+                    'summary': '/api/summary/',
+                    'history': '/api/history/',
+                    'report': f'/api/report/{dataset_id}/',
+                    'export_csv': f'/api/datasets/{dataset_id}/export.csv',
+                }
+                for name, url in cases.items():
+                    for _ in range(repeat):
+                        with timer(samples, f'{name}@{rows}'):
+                            response = client.get(url)
+                            consume(response)
+                        if response.status_code != 200:
+                            raise CommandError(f'{url} failed: {response.status_code}')
+
+        results = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': sys.version.split()[0],
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'rows': sizes,
+                'repeat': repeat,
+            },
+            'results': {key: describe(values) for key, values in samples.items()},
+        }
+
+        for key, stats in results['results'].items():
+            self.stdout.write(f"{key:<24} median {stats['median_s'] * 1000:10.1f} ms")
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            self.compare(results, json.loads(Path(options['baseline']).read_text()), options['tolerance'])
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        self.stdout.write(f"\nCompared with baseline from {baseline['meta']['timestamp']}:")
+        for key, stats in results['results'].items():
+            previous = baseline['results'].get(key)
+            if previous is None:
+                self.stdout.write(f'{key:<24} (no baseline)')
+                continue
+            ratio = stats['median_s'] / previous['median_s']
+            line = f'{key:<24} {ratio:6.2f}x'
+            if ratio > 1 + tolerance:
+                regressions.append(key)
+                self.stdout.write(self.style.ERROR(f'{line}  REGRESSION'))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} case(s) slower than baseline by more than {tolerance:.0%}: {', '.join(regressions)}")
@@ -0,0 +1,30 @@
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import analytics, equipment_types
+from api.models import Dataset, ParameterSketch
+from api.sketches import build_sketches
+
+
+class Command(BaseCommand):
+    help = 'Rebuild distribution sketches for existing datasets, e.g. after changing HISTOGRAM_BINS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('datasets', nargs='*', type=int, help='Dataset ids (default: all)')
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.order_by('id')
+        if options['datasets']:
+            datasets = datasets.filter(pk__in=options['datasets'])
+
+        for dataset in datasets:
+            rows = dataset.equipment.values_list('type_id', 'flowrate', 'pressure', 'temperature')
+            df = pd.DataFrame(list(rows), columns=['Type', 'Flowrate', 'Pressure', 'Temperature'])
+            df['Type'] = df['Type'].map(equipment_types.names(df['Type'].unique().tolist()))
+            with transaction.atomic():
+                ParameterSketch.objects.filter(dataset=dataset).delete()
+                sketches = ParameterSketch.objects.bulk_create(build_sketches(dataset, df))
+            self.stdout.write(f"{dataset}: {len(sketches)} sketches")
+
+        analytics.invalidate_analytics()
@@ -0,0 +1,37 @@
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from api import bulk_reports, equipment_types, working_set
+from api.anomalies import detect_anomalies
+from api.models import Dataset, Equipment
+
+
+class Command(BaseCommand):
+    help = 'Recompute anomaly flags for existing datasets, e.g. after changing EQUIPMENT_LIMITS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('datasets', nargs='*', type=int, help='Dataset ids (default: all)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.order_by('id')
+        if options['datasets']:
+            datasets = datasets.filter(pk__in=options['datasets'])
+
+        for dataset in datasets:
+            rows = list(dataset.equipment.order_by('id').values_list('id', 'type_id', 'flowrate', 'pressure', 'temperature', 'anomaly_flags'))
+            df = pd.DataFrame(rows, columns=['id', 'Type', 'Flowrate', 'Pressure', 'Temperature', 'old_flags'])
+            df['Type'] = df['Type'].map(equipment_types.names(df['Type'].unique().tolist()))
+            df['flags'] = detect_anomalies(df)
+
+            changed = df[df['flags'] != df['old_flags']]
+            Equipment.objects.bulk_update(
+                [Equipment(id=int(pk), anomaly_flags=int(flags)) for pk, flags in zip(changed['id'], changed['flags'])],
+                ['anomaly_flags'],
+                batch_size=options['batch_size'],
+            )
+            if len(changed):
+                working_set.evict([dataset.pk])
+                bulk_reports.invalidate([dataset.pk])
+            flagged = int((df['flags'] > 0).sum())
+            self.stdout.write(f"{dataset}: {flagged} anomalies, {len(changed)} rows updated")
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued asynchronous uploads (IngestJob rows). Safe to run several at once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            requeued = jobs.requeue_stale()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+            job = jobs.claim()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+
+            started = time.perf_counter()
+            jobs.run(job)
+            job.refresh_from_db()
+            self.stdout.write(f'Job {job.pk} ({job.filename}): {job.status} in {time.perf_counter() - started:.1f}s')
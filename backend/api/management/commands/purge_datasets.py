@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import retention
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply the dataset retention policy, then delete tombstoned datasets in small batches '
+        'and refresh table statistics. Use --loop to keep running as a background worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Equipment rows deleted per transaction (default: RETENTION_PURGE_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches so other writers get the lock')
+        parser.add_argument('--no-policy', action='store_true', help='Only purge datasets that are already tombstoned')
+        parser.add_argument('--vacuum', action='store_true', help='VACUUM after purging to return space to the OS (locks the database)')
+        parser.add_argument('--loop', type=float, metavar='SECONDS', help='Repeat every SECONDS instead of exiting')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options)
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+    def run_once(self, options):
+        if not options['no_policy']:
+            expired = retention.apply_policy()
+            if expired:
+                self.stdout.write(f'Tombstoned {expired} dataset(s) past the retention policy')
+
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        datasets, rows = retention.purge(options['batch_size'], options['pause'], log=log)
+        if not datasets:
+            return
+
+        retention.compact(vacuum=options['vacuum'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {datasets} dataset(s), {rows} equipment rows'))
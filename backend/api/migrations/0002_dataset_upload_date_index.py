@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='upload_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
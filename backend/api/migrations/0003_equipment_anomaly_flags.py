@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_dataset_upload_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='anomaly_flags',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(condition=models.Q(('anomaly_flags__gt', 0)), fields=['dataset', 'anomaly_flags'], name='equipment_anomaly_idx'),
+        ),
+    ]
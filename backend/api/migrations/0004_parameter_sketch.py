@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_equipment_anomaly_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParameterSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(blank=True, max_length=100)),
+                ('parameter', models.CharField(max_length=20)),
+                ('low', models.FloatField()),
+                ('high', models.FloatField()),
+                ('count', models.PositiveIntegerField()),
+                ('total', models.FloatField()),
+                ('minimum', models.FloatField()),
+                ('maximum', models.FloatField()),
+                ('bins', models.JSONField()),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sketches', to='api.dataset')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='parametersketch',
+            constraint=models.UniqueConstraint(fields=('dataset', 'type', 'parameter'), name='unique_parameter_sketch'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_parameter_sketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
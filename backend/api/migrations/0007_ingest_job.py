@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0006_dataset_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('path', models.CharField(max_length=500)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('upload_id', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('done', 'done'), ('duplicate', 'duplicate'), ('failed', 'failed')], default='queued', max_length=10)),
+                ('rows_total', models.PositiveIntegerField(blank=True, null=True)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('rows_rejected', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('dataset', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.dataset')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingest_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='ingest_job_queue_idx')],
+            },
+        ),
+    ]
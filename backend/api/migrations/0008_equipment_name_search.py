@@ -0,0 +1,67 @@
+from django.db import migrations, models
+
+# Substring search index for Equipment.name (see api/search.py). SQLite gets an
+# external-content FTS5 table with the trigram tokenizer (SQLite >= 3.34), kept
+# in sync by triggers; PostgreSQL gets a pg_trgm GIN index. Other backends, or
+# SQLite builds without trigram support, fall back to a LIKE scan.
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_equipment_name_fts USING fts5("
+    "name, content='api_equipment', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER api_equipment_name_fts_ai AFTER INSERT ON api_equipment BEGIN "
+    "INSERT INTO api_equipment_name_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER api_equipment_name_fts_ad AFTER DELETE ON api_equipment BEGIN "
+    "INSERT INTO api_equipment_name_fts(api_equipment_name_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER api_equipment_name_fts_au AFTER UPDATE OF name ON api_equipment BEGIN "
+    "INSERT INTO api_equipment_name_fts(api_equipment_name_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO api_equipment_name_fts(rowid, name) VALUES (new.id, new.name); END",
+    "INSERT INTO api_equipment_name_fts(api_equipment_name_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_equipment_name_fts_ai",
+    "DROP TRIGGER IF EXISTS api_equipment_name_fts_ad",
+    "DROP TRIGGER IF EXISTS api_equipment_name_fts_au",
+    "DROP TABLE IF EXISTS api_equipment_name_fts",
+]
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS equipment_name_trgm_idx ON api_equipment USING gin (name gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS equipment_name_trgm_idx",
+]
+
+
+def sqlite_has_trigram(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT sqlite_version()')
+        version = tuple(int(part) for part in cursor.fetchone()[0].split('.')[:2])
+    return version >= (3, 34)
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor == 'sqlite' and not sqlite_has_trigram(connection):
+            return
+        for statement in statements_by_vendor.get(connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_ingest_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['name', 'dataset'], name='equipment_name_idx'),
+        ),
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
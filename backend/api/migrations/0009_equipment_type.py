@@ -0,0 +1,98 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Moves Equipment.type from a CharField to a small-integer FK on EquipmentType.
+# The distinct names are copied into EquipmentType and every row is re-pointed
+# with one UPDATE. On SQLite, dropping and altering columns rebuilds
+# api_equipment, which drops the FTS5 name-search triggers from 0008; they are
+# recreated at the end (and again after the rebuilds when migrating backwards).
+# Row ids and names are copied unchanged, so the FTS index itself stays valid.
+
+FTS_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS api_equipment_name_fts_ai",
+    "DROP TRIGGER IF EXISTS api_equipment_name_fts_ad",
+    "DROP TRIGGER IF EXISTS api_equipment_name_fts_au",
+    "CREATE TRIGGER api_equipment_name_fts_ai AFTER INSERT ON api_equipment BEGIN "
+    "INSERT INTO api_equipment_name_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER api_equipment_name_fts_ad AFTER DELETE ON api_equipment BEGIN "
+    "INSERT INTO api_equipment_name_fts(api_equipment_name_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER api_equipment_name_fts_au AFTER UPDATE OF name ON api_equipment BEGIN "
+    "INSERT INTO api_equipment_name_fts(api_equipment_name_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO api_equipment_name_fts(rowid, name) VALUES (new.id, new.name); END",
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or 'api_equipment_name_fts' not in connection.introspection.table_names():
+        return
+    for statement in FTS_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+def encode_types(apps, schema_editor):
+    Equipment = apps.get_model('api', 'Equipment')
+    EquipmentType = apps.get_model('api', 'EquipmentType')
+    names = Equipment.objects.order_by().values_list('type', flat=True).distinct()
+    EquipmentType.objects.bulk_create([EquipmentType(name=name) for name in sorted(names)])
+    schema_editor.execute(
+        "UPDATE api_equipment SET type_ref_id = "
+        "(SELECT id FROM api_equipmenttype WHERE api_equipmenttype.name = api_equipment.type)"
+    )
+
+
+def decode_types(apps, schema_editor):
+    schema_editor.execute(
+        "UPDATE api_equipment SET type = "
+        "(SELECT name FROM api_equipmenttype WHERE api_equipmenttype.id = api_equipment.type_ref_id)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_equipment_name_search'),
+    ]
+
+    operations = [
+        # Backwards, this runs last: after the rebuilds below
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.CreateModel(
+            name='EquipmentType',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='type_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='+', to='api.equipmenttype'),
+        ),
+        migrations.RunPython(encode_types, decode_types),
+        # State only: lets the column be re-added (then filled in) when migrating backwards
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='equipment',
+                name='type',
+                field=models.CharField(default='', max_length=100),
+            ),
+        ]),
+        migrations.RemoveField(
+            model_name='equipment',
+            name='type',
+        ),
+        migrations.RenameField(
+            model_name='equipment',
+            old_name='type_ref',
+            new_name='type',
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='+', to='api.equipmenttype'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_equipment_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='dataset',
+            constraint=models.UniqueConstraint(fields=('owner', 'content_hash'), name='unique_owner_content_hash'),
+        ),
+    ]
@@ -1,19 +1,126 @@
+from django.conf import settings
 from django.db import models
 
+class LiveDatasetManager(models.Manager):
+    """Hides tombstoned datasets; ``Dataset.all_objects`` still sees them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Dataset(models.Model):
-    upload_date = models.DateTimeField(auto_now_add=True)
+    upload_date = models.DateTimeField(auto_now_add=True, db_index=True)
     filename = models.CharField(max_length=255)
+    # SHA-256 of the uploaded file; NULL for datasets uploaded before deduplication.
+    # Unique per owner, so one user's upload never resolves to another user's dataset
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    # Uploader, for per-user retention; NULL for datasets uploaded before retention
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='datasets')
+    # Set when the dataset is deleted; rows are removed later in batches (api/retention.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = LiveDatasetManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'content_hash'], name='unique_owner_content_hash'),
+        ]
 
     def __str__(self):
         return f"{self.filename} ({self.upload_date})"
 
+class EquipmentType(models.Model):
+    """Equipment type names, stored once; rows are never renamed or deleted (see api/equipment_types.py)."""
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
 class Equipment(models.Model):
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='equipment')
     name = models.CharField(max_length=255)
-    type = models.CharField(max_length=100)
+    # Small-integer id instead of the type name on every row; no index, lookups go through the dataset
+    type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='+', db_index=False)
     flowrate = models.FloatField()
     pressure = models.FloatField()
     temperature = models.FloatField()
+    # Bitmask of failed checks, see api.anomalies.FLAGS; 0 means normal
+    anomaly_flags = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Partial index: holds only flagged rows, so anomaly lookups never scan normal ones
+            models.Index(fields=['dataset', 'anomaly_flags'], name='equipment_anomaly_idx',
+                         condition=models.Q(anomaly_flags__gt=0)),
+            # Exact and prefix name search (api/search.py); substring search uses FTS5/trigram
+            models.Index(fields=['name', 'dataset'], name='equipment_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.type}"
+
+class ParameterSketch(models.Model):
+    """
+    Fixed-bin histogram of one parameter for one dataset, either for a
+    single equipment type or for all types (``type=''``). See api/sketches.py.
+    """
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='sketches')
+    type = models.CharField(max_length=100, blank=True)
+    parameter = models.CharField(max_length=20)
+    low = models.FloatField()
+    high = models.FloatField()
+    count = models.PositiveIntegerField()
+    total = models.FloatField()
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+    # Bin counts with underflow first and overflow last
+    bins = models.JSONField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'type', 'parameter'], name='unique_parameter_sketch'),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset_id} {self.type or 'all'} {self.parameter}"
+
+class IngestJob(models.Model):
+    """
+    An upload accepted with 202 and processed in the background; see api/jobs.py.
+    The spooled CSV at ``path`` is removed once the job finishes.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    DUPLICATE = 'duplicate'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, DONE, DUPLICATE, FAILED)]
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ingest_jobs')
+    filename = models.CharField(max_length=255)
+    path = models.CharField(max_length=500)
+    content_hash = models.CharField(max_length=64)
+    # Client-chosen id echoed in ingest.progress events
+    upload_id = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='ingest_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
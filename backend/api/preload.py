@@ -0,0 +1,26 @@
+"""
+Optional warm-up of the heavy, lazily imported engines.
+
+api.views imports pandas (ingest), Matplotlib/ReportLab (reports) and the
+export writers on first use, so workers that only serve reads never load
+them. Workers that will build reports or parse uploads anyway can import
+them up front instead, e.g. from the gunicorn hook in gunicorn.conf.py.
+"""
+import time
+from importlib import import_module
+
+ENGINES = {
+    'ingest': 'api.ingest',
+    'reports': 'api.reports',
+    'export': 'api.export',
+}
+
+
+def preload(names=None):
+    """Imports the named engines (all by default); returns seconds spent per engine."""
+    timings = {}
+    for name in names or ENGINES:
+        start = time.perf_counter()
+        import_module(ENGINES[name])
+        timings[name] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,256 @@
+"""
+PDF report engine.
+
+Kept out of api.views so that ReportLab and Matplotlib are only imported by
+workers that actually build a report (see api/preload.py to warm them up).
+"""
+import io
+
+import matplotlib
+# Non-interactive backend for server use; must be chosen before pyplot loads
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+
+from .instrumentation import span
+
+def create_pie_chart(data):
+    """
+    Creates a pie chart for equipment type distribution.
+    Returns a BytesIO object containing the chart image.
+    """
+    labels = list(data.keys())
+    sizes = list(data.values())
+    
+    # Lyna palette
+    colors = ['#076653', '#E3EF26', '#0C342C', '#E2FBCE', '#2E8B57', '#9ACD32']
+    
+    fig, ax = plt.subplots(figsize=(6, 4))
+    # Set cream background
+    fig.patch.set_facecolor('#FFFDEE')
+    ax.set_facecolor('#FFFDEE')
+    
+    wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%',
+                                      startangle=90, colors=colors[:len(labels)],
+                                      textprops={'color': "#06231D", 'fontsize': 10})
+    
+    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+    plt.title("Equipment Type Distribution", color="#076653", fontsize=12, fontweight='bold', pad=12)
+    
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='#FFFDEE')
+    plt.close(fig)
+    buf.seek(0)
+    return buf
+
+def create_bar_chart(avg_flow, avg_press, avg_temp):
+    """
+    Creates a bar chart for average parameters.
+    Returns a BytesIO object containing the chart image.
+    """
+    # Create figure with custom layout and cream background
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(8, 4), gridspec_kw={'width_ratios': [2, 1]})
+    plt.subplots_adjust(wspace=0.4)
+    fig.patch.set_facecolor('#FFFDEE')
+    ax1.set_facecolor('#FFFDEE')
+    ax2.set_facecolor('#FFFDEE')
+
+    # Subplot 1: Flowrate & Temperature
+    params1 = ['Flowrate\n(L/min)', 'Temperature\n(°C)']
+    values1 = [avg_flow, avg_temp]
+    bars1 = ax1.bar(params1, values1, color='#076653', alpha=0.9, width=0.6)
+    
+    ax1.set_title('Flow & Temp Averages', color="#076653", fontsize=10, fontweight='bold', pad=12)
+    ax1.grid(axis='y', linestyle='--', alpha=0.3)
+    ax1.tick_params(axis='x', rotation=0, colors='#0C342C', labelsize=8)
+    ax1.tick_params(axis='y', colors='#0C342C', labelsize=8)
+    
+    # Add values on top
+    for bar in bars1:
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.1f}',
+                ha='center', va='bottom', fontsize=8, color='#06231D', fontweight='bold')
+
+    # Subplot 2: Pressure (separate scale)
+    params2 = ['Pressure\n(Bar)']
+    values2 = [avg_press]
+    bars2 = ax2.bar(params2, values2, color='#E3EF26', alpha=0.9, width=0.6)
+    
+    ax2.set_title('Avg Pressure', color="#076653", fontsize=10, fontweight='bold', pad=12)
+    ax2.grid(axis='y', linestyle='--', alpha=0.3)
+    ax2.tick_params(axis='x', colors='#0C342C', labelsize=8)
+    ax2.tick_params(axis='y', colors='#0C342C', labelsize=8)
+
+    for bar in bars2:
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.1f}',
+                ha='center', va='bottom', fontsize=8, color='#06231D', fontweight='bold')
+
+    # Global styling
+    for ax in [ax1, ax2]:
+        for spine in ax.spines.values():
+            spine.set_edgecolor('#E2FBCE')
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='#FFFDEE')
+    plt.close(fig)
+    buf.seek(0)
+    return buf
+
+def render_charts(summary):
+    """PNG bytes of both report charts, keyed 'pie' and 'bar'."""
+    with span('charts'):
+        return {
+            'pie': create_pie_chart(summary['type_distribution']).getvalue(),
+            'bar': create_bar_chart(summary['avg_flowrate'], summary['avg_pressure'], summary['avg_temperature']).getvalue(),
+        }
+
+def build_pdf_report(dataset, summary, output, charts=None):
+    """
+    Writes the PDF report for ``dataset`` to the file-like ``output``.
+    Pass ``charts`` (from a previous call) to skip re-rendering them; the
+    charts used are returned. ``summary['data']`` only needs the first 50
+    rows if ``summary['row_count']`` holds the total.
+    """
+    doc = SimpleDocTemplate(output, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    styles = getSampleStyleSheet()
+
+    # Custom Styles - Lyna Palette
+    primary_green = colors.HexColor('#076653') # Deep Green
+    secondary_green = colors.HexColor('#0C342C') # Forest Green
+    accent_lime = colors.HexColor('#E3EF26') # Lime
+    bg_cream = colors.HexColor('#FFFDEE') # Cream
+    bg_pale = colors.HexColor('#E2FBCE') # Pale Green
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=primary_green,
+        spaceAfter=12,
+        fontName='Helvetica-Bold'
+    )
+
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Normal'],
+        fontSize=12,
+        textColor=secondary_green,
+        spaceAfter=24
+    )
+
+    section_header_style = ParagraphStyle(
+        'SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=secondary_green,
+        spaceBefore=12,
+        spaceAfter=12,
+        borderPadding=5,
+        borderColor=primary_green,
+        borderWidth=0,
+        borderBottomWidth=1
+    )
+
+    elements = []
+
+    # 1. Header
+    elements.append(Paragraph("Chemical Equipment Visualizer", subtitle_style))
+    elements.append(Paragraph(f"Analysis Report: {dataset.filename}", title_style))
+    elements.append(Paragraph(f"Generated on: {dataset.upload_date.strftime('%Y-%m-%d %H:%M')}", subtitle_style))
+    elements.append(Spacer(1, 12))
+
+    # 2. Charts Section
+    elements.append(Paragraph("Visual Analysis", section_header_style))
+
+    # Generate Charts
+    if charts is None:
+        charts = render_charts(summary)
+
+    # Add Charts to PDF (Side by Side if possible, or stacked)
+    # Stacked is safer for layout
+    img_pie = RLImage(io.BytesIO(charts['pie']), width=4*inch, height=2.6*inch)
+    img_bar = RLImage(io.BytesIO(charts['bar']), width=5.5*inch, height=2.75*inch)
+
+    # Table for visual layout of charts
+    chart_table = Table([[img_pie], [img_bar]], colWidths=[6*inch])
+    chart_table.setStyle(TableStyle([
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 12),
+    ]))
+    elements.append(chart_table)
+    elements.append(Spacer(1, 12))
+
+    # 3. Summary Statistics Table
+    elements.append(Paragraph("Key Metrics", section_header_style))
+    stats_data = [
+        ['Metric', 'Value'],
+        ['Total Equipment Count', f"{summary.get('row_count', len(summary['data']))}"],
+        ['Avg Flowrate', f"{summary['avg_flowrate']:.2f}"],
+        ['Avg Pressure', f"{summary['avg_pressure']:.2f}"],
+        ['Avg Temperature', f"{summary['avg_temperature']:.2f}"]
+    ]
+
+    t_stats = Table(stats_data, colWidths=[3*inch, 2*inch])
+    t_stats.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), primary_green),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('TOPPADDING', (0, 0), (-1, 0), 10),
+        ('BACKGROUND', (0, 1), (-1, -1), bg_cream),
+        ('GRID', (0, 0), (-1, -1), 1, colors.white),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [bg_cream, bg_pale])
+    ]))
+    elements.append(t_stats)
+    elements.append(Spacer(1, 24))
+
+    # 4. Detailed Data Table (Top 50)
+    elements.append(Paragraph("Detailed Equipment Data (Top 50)", section_header_style))
+
+    table_header = ['Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+    table_data = [table_header]
+
+    for item in summary['data'][:50]:
+         table_data.append([
+             item['Equipment Name'][:25] + '...' if len(item['Equipment Name']) > 25 else item['Equipment Name'], 
+             item['Type'], 
+             f"{item['Flowrate']:.1f}", 
+             f"{item['Pressure']:.1f}", 
+             f"{item['Temperature']:.1f}"
+         ])
+
+    t_data = Table(table_data, colWidths=[2.5*inch, 1.2*inch, 0.9*inch, 0.9*inch, 1*inch], repeatRows=1)
+    t_data.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), primary_green),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('TOPPADDING', (0, 0), (-1, 0), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, bg_pale),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [bg_cream, bg_pale]),
+        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'), # Align numbers to right
+    ]))
+    elements.append(t_data)
+
+    # Build PDF
+    with span('pdf_build'):
+        doc.build(elements)
+    return charts
+
+def render_report(dataset, summary, charts=None):
+    """Process-pool entry point (see api/bulk_reports.py); returns ``(pdf bytes, charts)``."""
+    output = io.BytesIO()
+    charts = build_pdf_report(dataset, summary, output, charts)
+    return output.getvalue(), charts
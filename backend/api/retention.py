@@ -0,0 +1,108 @@
+"""
+Dataset retention and deferred deletion.
+
+Deleting a Dataset through the ORM cascades to every Equipment row in one
+statement-per-collector pass, holding SQLite's write lock for the whole
+time. Instead, deletion is split in two:
+
+* ``tombstone()`` marks datasets deleted (``deleted_at``) in a single
+  UPDATE. ``Dataset.objects`` stops returning them immediately and their
+  ``content_hash`` is released so the same file can be uploaded again.
+* ``purge()`` removes tombstoned rows in bounded batches, each in its own
+  short transaction, so readers and uploads interleave with it. It runs
+  from ``manage.py purge_datasets``, optionally as a long-lived worker.
+
+``apply_policy()`` tombstones datasets older than
+``DATASET_RETENTION_DAYS`` and, per owner, everything beyond the newest
+``DATASET_RETENTION_MAX_PER_USER``. Either setting may be ``None``.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import analytics, bulk_reports, working_set
+from .models import Dataset, Equipment, ParameterSketch
+
+
+def tombstone(datasets):
+    """Marks a Dataset queryset deleted; returns how many were live."""
+    ids = list(datasets.filter(deleted_at__isnull=True).values_list('id', flat=True))
+    if not ids:
+        return 0
+    count = Dataset.all_objects.filter(pk__in=ids, deleted_at__isnull=True).update(deleted_at=timezone.now(), content_hash=None)
+    analytics.invalidate_analytics()
+    bulk_reports.invalidate(ids)
+    working_set.evict(ids)
+    return count
+
+
+def expired_datasets(now=None):
+    """Ids of live datasets that fall outside the retention policy."""
+    now = now or timezone.now()
+    expired = set()
+
+    if settings.DATASET_RETENTION_DAYS is not None:
+        cutoff = now - timedelta(days=settings.DATASET_RETENTION_DAYS)
+        expired.update(Dataset.objects.filter(upload_date__lt=cutoff).values_list('id', flat=True))
+
+    limit = settings.DATASET_RETENTION_MAX_PER_USER
+    if limit is not None:
+        owners = Dataset.objects.exclude(owner=None).values_list('owner_id', flat=True).distinct()
+        for owner_id in owners:
+            surplus = Dataset.objects.filter(owner_id=owner_id).order_by('-upload_date', '-id')[limit:]
+            expired.update(surplus.values_list('id', flat=True))
+
+    return sorted(expired)
+
+
+def apply_policy(now=None):
+    ids = expired_datasets(now)
+    return tombstone(Dataset.objects.filter(pk__in=ids)) if ids else 0
+
+
+def purge(batch_size=None, pause=0.0, log=None):
+    """
+    Physically deletes tombstoned datasets, ``batch_size`` Equipment rows
+    per transaction, sleeping ``pause`` seconds between batches.
+    Returns ``(datasets, equipment_rows)`` removed.
+    """
+    batch_size = batch_size or settings.RETENTION_PURGE_BATCH_SIZE
+    datasets = rows = 0
+
+    for dataset_id in Dataset.all_objects.filter(deleted_at__isnull=False).order_by('id').values_list('id', flat=True):
+        while True:
+            ids = list(Equipment.objects.filter(dataset_id=dataset_id).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            # No dependents or signal receivers, so this is a single DELETE ... WHERE id IN (...)
+            deleted, _ = Equipment.objects.filter(id__in=ids).delete()
+            rows += deleted
+            if log:
+                log(f'dataset {dataset_id}: deleted {deleted} rows')
+            if pause:
+                time.sleep(pause)
+
+        ParameterSketch.objects.filter(dataset_id=dataset_id).delete()
+        Dataset.all_objects.filter(pk=dataset_id).delete()
+        datasets += 1
+
+    return datasets, rows
+
+
+def compact(vacuum=False):
+    """Refreshes planner statistics after a purge and optionally reclaims space."""
+    tables = [Equipment._meta.db_table, ParameterSketch._meta.db_table, Dataset._meta.db_table]
+    if connection.vendor == 'sqlite':
+        # VACUUM rewrites the whole file and blocks writers; run it off-peak
+        statements = (['VACUUM'] if vacuum else []) + ['ANALYZE']
+    elif connection.vendor == 'postgresql':
+        statements = [f'{"VACUUM ANALYZE" if vacuum else "ANALYZE"} {table}' for table in tables]
+    else:
+        statements = [f'ANALYZE TABLE {table}' for table in tables]
+
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
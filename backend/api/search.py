@@ -0,0 +1,86 @@
+"""
+Equipment name search across all datasets.
+
+* ``exact`` / ``prefix`` use the B-tree on ``(name, dataset)``. Prefixes are
+  matched as a range (``name >= q AND name < q + U+10FFFF``) because
+  SQLite never uses an index for ``LIKE ... ESCAPE``, which is what
+  ``startswith`` compiles to; both modes are case-sensitive.
+* ``contains`` is case-insensitive and uses the trigram index created by
+  migration 0008: the FTS5 table on SQLite, pg_trgm on PostgreSQL. It
+  needs at least 3 characters; without the index it falls back to a scan.
+
+Results are grouped by dataset (newest first) and paged by dataset; each
+group carries its match count and at most ``rows`` matching rows.
+"""
+from django.db import connection
+from django.db.models import Avg, Count, F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from .models import Dataset, Equipment
+from .serializers import EquipmentSerializer
+
+MODES = ['prefix', 'exact', 'contains']
+MIN_CONTAINS_LENGTH = 3
+FTS_TABLE = 'api_equipment_name_fts'
+
+_has_fts = None
+
+
+def has_fts():
+    global _has_fts
+    if _has_fts is None:
+        _has_fts = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _has_fts
+
+
+def matching(query, mode):
+    equipment = Equipment.objects.filter(dataset__deleted_at__isnull=True)
+    if mode == 'exact':
+        return equipment.filter(name=query)
+    if mode == 'prefix':
+        return equipment.filter(name__gte=query, name__lt=query + '\U0010ffff')
+    if has_fts():
+        # LIKE on the FTS5 trigram table is answered from the trigram index, but
+        # only without an ESCAPE clause; wildcards in the query over-match, so
+        # the candidates are re-checked with an exact icontains
+        ids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE name LIKE %s', [f'%{query}%'])
+        return equipment.filter(id__in=ids, name__icontains=query)
+    return equipment.filter(name__icontains=query)
+
+
+def search(query, mode='prefix', limit=20, offset=0, rows=100):
+    matches = matching(query, mode)
+
+    groups = (
+        matches.values('dataset_id')
+        .annotate(match_count=Count('id'), avg_flowrate=Avg('flowrate'), avg_pressure=Avg('pressure'),
+                  avg_temperature=Avg('temperature'))
+        .order_by('-dataset_id')
+    )
+    total = groups.count()
+    page = list(groups[offset:offset + limit])
+    dataset_ids = [group['dataset_id'] for group in page]
+
+    datasets = Dataset.objects.in_bulk(dataset_ids)
+    # First ``rows`` matches per dataset in one query
+    ranked = (
+        matches.filter(dataset_id__in=dataset_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F('dataset_id'), order_by=[F('name').asc(), F('id').asc()]))
+        .filter(rank__lte=rows)
+        .order_by('dataset_id', 'rank')
+    )
+    rows_by_dataset = {}
+    for item in ranked:
+        rows_by_dataset.setdefault(item.dataset_id, []).append(EquipmentSerializer(item).data)
+
+    results = []
+    for group in page:
+        dataset = datasets[group['dataset_id']]
+        results.append({
+            'dataset': {'id': dataset.id, 'filename': dataset.filename, 'upload_date': dataset.upload_date},
+            **{key: group[key] for key in ('match_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature')},
+            'rows': rows_by_dataset.get(dataset.id, []),
+        })
+
+    return {'count': total, 'results': results}
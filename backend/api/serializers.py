@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from . import equipment_types
 from .models import Dataset, Equipment
 
 class EquipmentSerializer(serializers.ModelSerializer):
@@ -22,12 +23,17 @@ class EquipmentSerializer(serializers.ModelSerializer):
         # Custom representation to match frontend exact keys
         return {
             "Equipment Name": instance.name,
-            "Type": instance.type,
+            "Type": equipment_types.name(instance.type_id),
             "Flowrate": instance.flowrate,
             "Pressure": instance.pressure,
             "Temperature": instance.temperature
         }
 
+def equipment_records(columns, limit=None):
+    # Same representation as EquipmentSerializer, straight from api.working_set columns
+    keys = ("Equipment Name", "Type", "Flowrate", "Pressure", "Temperature")
+    return [dict(zip(keys, row)) for row in columns.rows(0, limit)]
+
 class DatasetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dataset
@@ -0,0 +1,186 @@
+"""
+Mergeable distribution sketches for equipment parameters.
+
+Each sketch is a fixed-bin histogram (plus underflow/overflow bins) with
+count, sum, min and max. Because the bin edges come from settings and are
+shared by every dataset, sketches merge exactly by adding counts, so
+cross-dataset distributions never touch Equipment rows. Quantiles are
+interpolated inside the bin that holds the requested rank and clamped to
+the observed min/max, so their error is at most one bin width. Bins are
+half-open except the last, which also holds values equal to ``high``.
+
+After ``HISTOGRAM_BINS`` changes, sketches built with the old layout no
+longer merge with new ones; cross-dataset merges leave them out and list
+their datasets until ``manage.py build_sketches`` rebuilds them.
+"""
+import numpy as np
+from django.conf import settings
+
+from .models import ParameterSketch
+
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+COLUMNS = {'flowrate': 'Flowrate', 'pressure': 'Pressure', 'temperature': 'Temperature'}
+QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+# Stored in ParameterSketch.type for the sketch covering every type
+ALL_TYPES = ''
+
+
+class Sketch:
+    def __init__(self, low, high, counts, count=0, total=0.0, minimum=None, maximum=None):
+        self.low = low
+        self.high = high
+        # counts[0] is underflow, counts[-1] is overflow
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def from_model(cls, row):
+        return cls(row.low, row.high, row.bins, row.count, row.total, row.minimum, row.maximum)
+
+    @property
+    def edges(self):
+        return np.linspace(self.low, self.high, len(self.counts) - 1)
+
+    def merge(self, other):
+        if (self.low, self.high, len(self.counts)) != (other.low, other.high, len(other.counts)):
+            raise ValueError('Cannot merge sketches with different bin layouts')
+        self.counts = self.counts + other.counts
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        return self
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = np.cumsum(self.counts)
+        idx = int(np.searchsorted(cumulative, rank, side='left'))
+        idx = min(idx, len(self.counts) - 1)
+
+        edges = self.edges
+        # Underflow/overflow bins are bounded by the observed extremes
+        lo = self.minimum if idx == 0 else edges[idx - 1]
+        hi = self.maximum if idx == len(self.counts) - 1 else edges[idx]
+        before = cumulative[idx - 1] if idx else 0
+        in_bin = self.counts[idx]
+        fraction = (rank - before) / in_bin if in_bin else 0.0
+        value = lo + (hi - lo) * fraction
+        return float(min(max(value, self.minimum), self.maximum))
+
+    def to_dict(self, histogram=True):
+        data = {
+            'count': int(self.count),
+            'mean': self.total / self.count if self.count else None,
+            'min': self.minimum,
+            'max': self.maximum,
+        }
+        for name, q in QUANTILES.items():
+            data[name] = self.quantile(q)
+        if histogram:
+            data['histogram'] = {
+                'edges': self.edges.tolist(),
+                'counts': self.counts[1:-1].tolist(),
+                'underflow': int(self.counts[0]),
+                'overflow': int(self.counts[-1]),
+            }
+        return data
+
+
+def build_sketches(dataset, df):
+    """
+    Builds unsaved ParameterSketch rows for ``df`` (CSV headers), one per
+    (type, parameter) plus an all-types row per parameter. Each column is
+    binned once and counted per type with a single bincount.
+    """
+    if not len(df):
+        return []
+
+    type_codes, type_names = df['Type'].factorize(sort=True)
+    num_types = len(type_names)
+    sketches = []
+
+    for param in PARAMETERS:
+        low, high, bins = settings.HISTOGRAM_BINS[param]
+        values = df[COLUMNS[param]].to_numpy(dtype=float)
+        # Missing values and types are left out of the sketch
+        keep = np.isfinite(values) & (type_codes >= 0)
+        values, codes = values[keep], type_codes[keep]
+        if not len(values):
+            continue
+
+        # Bin 0 is underflow, bins + 1 is overflow; ``high`` itself goes in the last bin
+        scaled = np.floor((values - low) / (high - low) * bins)
+        scaled[values == high] = bins - 1
+        bin_idx = np.clip(scaled, -1, bins).astype(np.int64) + 1
+        width = bins + 2
+        counts = np.bincount(codes * width + bin_idx, minlength=num_types * width).reshape(num_types, width)
+
+        totals = np.bincount(codes, weights=values, minlength=num_types)
+        sizes = np.bincount(codes, minlength=num_types)
+        minimums = np.full(num_types, np.inf)
+        maximums = np.full(num_types, -np.inf)
+        np.minimum.at(minimums, codes, values)
+        np.maximum.at(maximums, codes, values)
+
+        for code, name in enumerate(type_names):
+            if not sizes[code]:
+                continue
+            sketches.append(ParameterSketch(
+                dataset=dataset, type=str(name), parameter=param, low=low, high=high,
+                count=int(sizes[code]), total=float(totals[code]),
+                minimum=float(minimums[code]), maximum=float(maximums[code]),
+                bins=counts[code].tolist(),
+            ))
+        sketches.append(ParameterSketch(
+            dataset=dataset, type=ALL_TYPES, parameter=param, low=low, high=high,
+            count=len(values), total=float(totals.sum()),
+            minimum=float(values.min()), maximum=float(values.max()),
+            bins=counts.sum(axis=0).tolist(),
+        ))
+    return sketches
+
+
+def _current_layouts():
+    return {param: (low, high, bins + 2) for param, (low, high, bins) in settings.HISTOGRAM_BINS.items()}
+
+
+def merge_distribution(rows, histogram=True, across_datasets=False):
+    """
+    Merges ParameterSketch rows into
+    ``{'all': {param: stats}, 'types': {type: {param: stats}}}``.
+    With ``across_datasets``, sketches whose bin layout is not the current
+    ``HISTOGRAM_BINS`` are skipped and their dataset ids listed under
+    ``stale_datasets``.
+    """
+    layouts = _current_layouts() if across_datasets else None
+    stale = set()
+    merged = {}
+    for row in rows:
+        key = (row.type, row.parameter)
+        sketch = Sketch.from_model(row)
+        if layouts is not None and (sketch.low, sketch.high, len(sketch.counts)) != layouts.get(row.parameter):
+            stale.add(row.dataset_id)
+            continue
+        if key in merged:
+            merged[key].merge(sketch)
+        else:
+            merged[key] = sketch
+
+    result = {'all': {}, 'types': {}}
+    for (kind, param), sketch in sorted(merged.items()):
+        target = result['all'] if kind == ALL_TYPES else result['types'].setdefault(kind, {})
+        target[param] = sketch.to_dict(histogram=histogram)
+    if across_datasets:
+        result['stale_datasets'] = sorted(stale)
+    return result
+
+
+def dataset_percentiles(dataset):
+    rows = ParameterSketch.objects.filter(dataset=dataset, type=ALL_TYPES)
+    return merge_distribution(rows, histogram=False)['all']
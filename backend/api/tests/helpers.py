@@ -0,0 +1,62 @@
+"""Shared fixtures for the api tests."""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import equipment_types
+
+HEADER = 'Equipment Name,Type,Flowrate,Pressure,Temperature'
+ROWS = [
+    ('Pump-101', 'Pump', 150.5, 2.3, 45.2),
+    ('Reactor-201', 'Reactor', 1200.0, 15.5, 180.5),
+    ('HeatExchanger-301', 'Heat Exchanger', 350.2, 5.1, 85.0),
+    ('Valve-401', 'Valve', 0.0, 2.1, 42.0),
+    ('Pump-102', 'Pump', 148.2, 2.4, 46.1),
+    ('Reactor-202', 'Reactor', 1150.5, 14.8, 178.2),
+    ('Tank-501', 'Storage Tank', 0.0, 1.0, 25.0),
+]
+
+
+def csv_text(rows=ROWS, header=HEADER):
+    return '\n'.join([header] + [','.join(str(value) for value in row) for row in rows]) + '\n'
+
+
+def csv_file(rows=ROWS, name='equipment.csv', content=None):
+    if content is None:
+        content = csv_text(rows)
+    if isinstance(content, str):
+        content = content.encode()
+    return SimpleUploadedFile(name, content, content_type='text/csv')
+
+
+def make_user(username='alice', **extra):
+    return User.objects.create_user(username, f'{username}@example.com', 'test-password', **extra)
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+    return client
+
+
+def make_dataset(rows=ROWS, filename='equipment.csv', owner=None, content_hash=None):
+    """Runs ``rows`` through the upload pipeline (parse, validate, ingest) and returns the dataset."""
+    from api import ingest
+
+    parsed = ingest.read_upload(csv_file(rows, filename))
+    dataset, _ = ingest.ingest_dataframe(filename, parsed.df, content_hash=content_hash, owner=owner)
+    return dataset
+
+
+class BackendTestCase(TestCase):
+    """Resets the per-process caches that would otherwise outlive each test's rolled-back rows."""
+
+    def setUp(self):
+        from api import authentication
+
+        cache.clear()
+        authentication._local.clear()
+        equipment_types._mappings.clear()
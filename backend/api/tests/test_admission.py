@@ -0,0 +1,90 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import override_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+from api import admission
+from benchmarks.common import unthrottled
+from api.instrumentation import ADMISSION_REJECTIONS
+
+from .helpers import BackendTestCase, client_for, make_user
+
+
+@override_settings(ADMISSION_LIMITS={'upload': 1, 'report': 1, 'bulk_report': 1, 'export': 1},
+                   ADMISSION_QUEUE_TIMEOUT=0, ADMISSION_RETRY_AFTER=7)
+class AdmissionTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        admission._semaphores.clear()
+        self.addCleanup(admission._semaphores.clear)
+        self.client = client_for(make_user())
+
+    def test_full_pool_answers_503_with_retry_after(self):
+        rejections = ADMISSION_REJECTIONS._values.get(('report',), 0)
+        release = admission.acquire('report')
+        try:
+            response = self.client.get('/api/report/999/')
+        finally:
+            release()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(ADMISSION_REJECTIONS._values[('report',)], rejections + 1)
+        # Admitted again once the slot is free (the dataset does not exist)
+        self.assertEqual(self.client.get('/api/report/999/').status_code, 404)
+
+    def test_pools_are_independent(self):
+        with admission.slot('report'):
+            response = self.client.get('/api/datasets/999/export.csv')
+        self.assertEqual(response.status_code, 404)
+
+    def test_release_is_idempotent(self):
+        release = admission.acquire('upload')
+        release()
+        release()
+        admission.acquire('upload')()
+
+    def test_streaming_body_holds_slot_until_closed(self):
+        release = admission.acquire('bulk_report')
+        body = admission.HeldWhileStreaming(iter([b'chunk']), release)
+        with self.assertRaises(admission.Overloaded):
+            admission.acquire('bulk_report')
+        body.close()
+        admission.acquire('bulk_report')()
+
+
+class ShedTimingTests(BackendTestCase):
+    def test_full_pool_is_shed_within_tens_of_milliseconds(self):
+        self.addCleanup(admission._semaphores.clear)
+        releases = [admission.acquire('export') for _ in range(settings.ADMISSION_LIMITS['export'])]
+        start = time.perf_counter()
+        with self.assertRaises(admission.Overloaded):
+            admission.acquire('export')
+        self.assertLess(time.perf_counter() - start, 0.25)
+        for release in releases:
+            release()
+
+
+class ThrottleTests(BackendTestCase):
+    def test_rate_is_counted_in_shared_cache(self):
+        user = make_user()
+        client = client_for(user)
+        with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', {'reports': '1/hour'}):
+            self.assertEqual(client.get('/api/report/999/').status_code, 404)
+            response = client.get('/api/report/999/')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        other_worker = FileBasedCache(settings.CACHES['default']['LOCATION'], {})
+        self.assertEqual(len(other_worker.get(f'throttle_reports_{user.pk}')), 1)
+
+    def test_benchmarks_are_not_throttled(self):
+        client = client_for(make_user())
+        with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', {'reports': '1/hour'}):
+            client.get('/api/report/999/')
+            self.assertEqual(client.get('/api/report/999/').status_code, 429)
+            with unthrottled():
+                self.assertEqual(client.get('/api/report/999/').status_code, 404)
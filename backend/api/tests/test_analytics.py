@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+
+from api import analytics
+
+from .helpers import ROWS, BackendTestCase, client_for, make_dataset, make_user
+
+
+class TrendsTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+
+    def test_aggregates_per_dataset_and_type(self):
+        dataset = make_dataset()
+        response = self.client.get('/api/analytics/trends/', {'bucket': 'month'})
+
+        self.assertEqual(response.status_code, 200)
+        [row] = response.data['datasets']
+        self.assertEqual(row['id'], dataset.id)
+        self.assertEqual(row['count'], len(ROWS))
+        self.assertAlmostEqual(row['avg_flowrate'], sum(r[2] for r in ROWS) / len(ROWS))
+        self.assertEqual(row['types']['Pump']['count'], 2)
+        self.assertEqual(row['types']['Pump']['max_temperature'], 46.1)
+        [bucket] = response.data['buckets']
+        self.assertEqual(bucket['datasets'], 1)
+        self.assertEqual(bucket['count'], len(ROWS))
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/analytics/trends/', {'bucket': 'hour'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics/trends/', {'start': 'yesterday'}).status_code, 400)
+
+    def test_upload_invalidates_cached_results(self):
+        make_dataset(filename='first.csv')
+        self.assertEqual(len(self.client.get('/api/analytics/trends/').data['datasets']), 1)
+        make_dataset(filename='second.csv')
+        self.assertEqual(len(self.client.get('/api/analytics/trends/').data['datasets']), 2)
+
+    def test_generation_is_shared_between_processes(self):
+        # A second handle on the same cache directory stands in for another worker
+        other_worker = FileBasedCache(settings.CACHES['default']['LOCATION'], {})
+        before = analytics._generation()
+        analytics.invalidate_analytics()
+        self.assertNotEqual(other_worker.get(analytics.GENERATION_KEY), before)
+
+    def test_lost_generation_does_not_revive_old_results(self):
+        before = analytics._generation()
+        cache.delete(analytics.GENERATION_KEY)
+        self.assertNotEqual(analytics._generation(), before)
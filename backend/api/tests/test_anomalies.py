@@ -0,0 +1,70 @@
+from io import StringIO
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.anomalies import FLAGS, describe_flags, detect_anomalies
+from api.models import Equipment
+
+from .helpers import ROWS, BackendTestCase, client_for, make_dataset, make_user
+
+PUMPS = [(f'Pump-{idx}', 'Pump', 100.0 + idx, 2.0, 40.0 + idx % 3) for idx in range(10)]
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+
+
+class DetectAnomaliesTests(BackendTestCase):
+    def test_normal_rows_are_not_flagged(self):
+        self.assertEqual(detect_anomalies(frame(ROWS)).tolist(), [0] * len(ROWS))
+
+    def test_per_type_limits(self):
+        # 30 bar is fine for the default limits but above the Pump limit of 20
+        flags = detect_anomalies(frame([('P', 'Pump', 100.0, 30.0, 40.0), ('X', 'Mixer', 100.0, 30.0, 40.0)]))
+        self.assertEqual(describe_flags(int(flags[0])), ['pressure:high'])
+        self.assertEqual(flags[1], 0)
+
+    def test_statistical_outlier_within_type(self):
+        flags = detect_anomalies(frame(PUMPS + [('Pump-99', 'Pump', 900.0, 2.0, 41.0)]))
+        self.assertEqual(flags[:-1].tolist(), [0] * len(PUMPS))
+        self.assertTrue(flags[-1] & FLAGS[('flowrate', 'iqr')])
+
+    @override_settings(ANOMALY_MIN_GROUP_SIZE=20)
+    def test_small_groups_skip_statistical_checks(self):
+        flags = detect_anomalies(frame(PUMPS + [('Pump-99', 'Pump', 900.0, 2.0, 41.0)]))
+        self.assertEqual(flags.tolist(), [0] * (len(PUMPS) + 1))
+
+    def test_empty_frame(self):
+        self.assertEqual(len(detect_anomalies(frame([]))), 0)
+
+
+class AnomalyEndpointTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+        self.dataset = make_dataset(PUMPS + [('Pump-99', 'Pump', 100.0, 35.0, 41.0)])
+
+    def test_flags_are_stored_and_listed(self):
+        response = self.client.get(f'/api/datasets/{self.dataset.pk}/anomalies/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        [row] = response.data['results']
+        self.assertEqual(row['Equipment Name'], 'Pump-99')
+        self.assertIn('pressure:high', row['Anomalies'])
+        self.assertEqual(self.client.get('/api/datasets/999/anomalies/').status_code, 404)
+
+    def test_invalid_paging(self):
+        for params in ({'limit': 'ten'}, {'limit': 0}, {'limit': -1}, {'offset': -1}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/anomalies/', params).status_code, 400)
+
+    def test_detect_anomalies_command_applies_new_limits(self):
+        limits = {'default': {'flowrate': (0, 5000), 'pressure': (0, 100), 'temperature': (-50, 500)}}
+        with override_settings(EQUIPMENT_LIMITS=limits):
+            call_command('detect_anomalies', stdout=StringIO())
+        flags = Equipment.objects.get(dataset=self.dataset, name='Pump-99').anomaly_flags
+        # Still a statistical outlier among the pumps, but no longer over a limit
+        self.assertNotIn('pressure:high', describe_flags(flags))
+        self.assertIn('pressure:iqr', describe_flags(flags))
@@ -0,0 +1,90 @@
+import time
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from rest_framework.authtoken.models import Token
+
+from api import authentication
+from api.authentication import CachedTokenAuthentication, TTLCache
+
+from .helpers import BackendTestCase, client_for, make_user
+
+
+class CachedTokenAuthenticationTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client = client_for(self.user)
+        self.key = Token.objects.get(user=self.user).key
+
+    def test_cached_token_skips_database(self):
+        auth = CachedTokenAuthentication()
+        user, _ = auth.authenticate_credentials(self.key)
+        self.assertEqual(user, self.user)
+        with self.assertNumQueries(0):
+            auth.authenticate_credentials(self.key)
+
+    def test_shared_cache_serves_other_workers(self):
+        CachedTokenAuthentication().authenticate_credentials(self.key)
+        # Another worker starts with an empty per-process tier
+        authentication._local.clear()
+        with self.assertNumQueries(0):
+            CachedTokenAuthentication().authenticate_credentials(self.key)
+
+    def test_shared_cache_holds_no_secrets(self):
+        CachedTokenAuthentication().authenticate_credentials(self.key)
+        other_worker = FileBasedCache(settings.CACHES['default']['LOCATION'], {})
+        entry = other_worker.get(authentication._cache_key(self.key))
+        self.assertEqual(entry, (self.user.pk, True, False))
+        with open(other_worker._key_to_file(authentication._cache_key(self.key)), 'rb') as f:
+            stored = f.read()
+        self.assertNotIn(self.key.encode(), stored)
+        self.assertNotIn(self.user.password.encode(), stored)
+
+    def test_rebuilt_user_loads_other_fields_on_access(self):
+        CachedTokenAuthentication().authenticate_credentials(self.key)
+        with self.assertNumQueries(0):
+            user, token = CachedTokenAuthentication().authenticate_credentials(self.key)
+            self.assertEqual((user.pk, user.is_staff, token.key, token.user_id), (self.user.pk, False, self.key, self.user.pk))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, self.user.username)
+
+    def test_logout_revokes_token_for_every_worker(self):
+        self.assertEqual(self.client.get('/api/history/').status_code, 200)
+        other_worker = FileBasedCache(settings.CACHES['default']['LOCATION'], {})
+        self.assertIsNotNone(other_worker.get(authentication._cache_key(self.key)))
+
+        self.assertEqual(self.client.post('/api/logout/').status_code, 204)
+        self.assertIsNone(other_worker.get(authentication._cache_key(self.key)))
+        self.assertEqual(self.client.get('/api/history/').status_code, 401)
+
+    def test_rotate_replaces_token(self):
+        response = self.client.post('/api/token/rotate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/history/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        self.assertEqual(self.client.get('/api/history/').status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get('/api/history/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/history/').status_code, 401)
+
+
+class TTLCacheTests(BackendTestCase):
+    def test_entries_expire(self):
+        local = TTLCache(max_size=10, ttl=0.01)
+        local.set('key', 'value')
+        self.assertEqual(local.get('key'), 'value')
+        time.sleep(0.02)
+        self.assertIsNone(local.get('key'))
+
+    def test_least_recently_used_entry_is_dropped(self):
+        local = TTLCache(max_size=2, ttl=60)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('a'), 1)
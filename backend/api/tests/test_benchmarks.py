@@ -0,0 +1,80 @@
+"""
+Smoke tests: every benchmark runs end to end on a tiny dataset. Each one
+runs in its own interpreter because the benchmarks set up their own
+throwaway database.
+"""
+import csv
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from benchmarks.synthetic import HEADERS, write_csv
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+BENCHMARKS = {
+    'admission': ['--rows', '200', '--storm', '2', '--duration', '0.5'],
+    'auth_throughput': ['--requests', '20'],
+    'csv_parsing': ['--rows', '500', '--repeat', '1'],
+    'equipment_types': ['--rows', '400', '--datasets', '2', '--repeat', '1'],
+    'export_throughput': ['--rows', '200', '--repeat', '1'],
+    'name_search': ['--rows', '400', '--datasets', '2', '--repeat', '1'],
+    'startup': ['--runs', '1'],
+    'working_set': ['--rows', '500', '--repeat', '1'],
+}
+
+
+def run(*args):
+    return subprocess.run([sys.executable, *args], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=600)
+
+
+class BenchmarkSmokeTests(SimpleTestCase):
+    def test_benchmarks_run(self):
+        for name, args in BENCHMARKS.items():
+            with self.subTest(benchmark=name):
+                result = run('-m', f'benchmarks.{name}', *args)
+                self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+                self.assertTrue(result.stdout.strip())
+
+    def test_bench_command_gates_on_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'bench.json'
+            bench = ['manage.py', 'bench', '--rows', '50', '--repeat', '1']
+
+            result = run(*bench, '--output', str(output))
+            self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+            results = json.loads(output.read_text())
+            self.assertIn('upload@50', results['results'])
+
+            result = run(*bench, '--baseline', str(output), '--tolerance', '1000')
+            self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+
+            # A baseline far faster than anything achievable must fail the gate
+            for stats in results['results'].values():
+                stats['median_s'] /= 10 ** 6
+            output.write_text(json.dumps(results))
+            result = run(*bench, '--baseline', str(output))
+            self.assertNotEqual(result.returncode, 0)
+            self.assertIn('REGRESSION', result.stdout)
+
+
+class SyntheticDataTests(SimpleTestCase):
+    def test_generated_csv_matches_upload_schema(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_csv(Path(tmp) / 'synthetic.csv', 100, seed=1)
+            with open(path, newline='') as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows[0], HEADERS)
+        self.assertEqual(len(rows), 101)
+        for row in rows[1:]:
+            [float(value) for value in row[2:]]
+
+    def test_generation_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = write_csv(Path(tmp) / 'a.csv', 50, seed=3).read_text()
+            second = write_csv(Path(tmp) / 'b.csv', 50, seed=3).read_text()
+        self.assertEqual(first, second)
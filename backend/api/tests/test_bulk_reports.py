@@ -0,0 +1,138 @@
+import io
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+
+from api import admission, bulk_reports, retention
+from api.models import Dataset
+
+from .helpers import BackendTestCase, client_for, make_dataset, make_user
+
+
+class FakePool:
+    """Stands in for the process pool; each submit resolves to the next outcome (None: left pending)."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = iter(outcomes)
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        outcome = next(self.outcomes)
+        if isinstance(outcome, BaseException):
+            future.set_exception(outcome)
+        elif outcome is not None:
+            future.set_result(outcome)
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class BulkReportTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+        self.datasets = [make_dataset(filename=f'plant{idx}.csv') for idx in range(3)]
+        self.url = '/api/reports/bulk/?ids=' + ','.join(str(d.pk) for d in self.datasets)
+        self.addCleanup(setattr, bulk_reports, '_pool', None)
+        self.addCleanup(admission._semaphores.clear)
+
+    def read_zip(self, response):
+        self.assertEqual(response.status_code, 200)
+        try:
+            return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        finally:
+            response.close()
+
+    def use_pool(self, *outcomes):
+        bulk_reports._pool = FakePool(*outcomes)
+        return bulk_reports._pool
+
+    def test_failed_reports_become_error_entries(self):
+        self.use_pool((b'%PDF-1', {}), RuntimeError('no fonts'), (b'%PDF-3', {}))
+        archive = self.read_zip(self.client.get(self.url))
+        names = archive.namelist()
+        self.assertEqual(len(names), 3)
+        [error] = [name for name in names if name.endswith('.error.txt')]
+        self.assertIn('plant1', error)
+        self.assertIn('no fonts', archive.read(error).decode())
+
+    def test_all_failed_is_an_error_not_a_zip(self):
+        self.use_pool(*[RuntimeError('no fonts')] * 3)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('All 3 reports failed', response.data['error'])
+        # The admission slot was given back
+        admission.acquire('bulk_report')()
+
+    def test_broken_pool_fails_fast_and_is_replaced(self):
+        # A dead child fails every pending report with the same error
+        pool = self.use_pool(*[BrokenProcessPool('child died')] * 3)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(pool.shut_down)
+        self.assertIsNone(bulk_reports._pool)
+
+    def test_stream_aborts_when_pool_breaks_midway(self):
+        pool = self.use_pool((b'%PDF-1', {}), None, None)
+        chunks = bulk_reports.stream_zip(self.datasets)
+        self.assertTrue(next(chunks))
+        for future in pool.futures[1:]:
+            future.set_exception(BrokenProcessPool('child died'))
+        with self.assertRaises(BrokenProcessPool):
+            list(chunks)
+
+    @override_settings(REPORT_WORKERS=1)
+    def test_first_report_streams_before_all_inputs_are_read(self):
+        datasets = self.datasets + [make_dataset(filename=f'extra{idx}.csv') for idx in range(2)]
+        self.use_pool((b'%PDF-1', {}), None, None, None, None)
+        with mock.patch.object(bulk_reports, 'report_inputs', wraps=bulk_reports.report_inputs) as inputs:
+            chunks = bulk_reports.stream_zip(datasets)
+            self.assertTrue(next(chunks))
+        # Two reports ahead of the single worker, topped up after the first finished
+        self.assertEqual(inputs.call_count, 3)
+        chunks.close()
+
+    def test_real_pool_builds_pdfs(self):
+        archive = self.read_zip(self.client.get(self.url))
+        self.assertEqual(len(archive.namelist()), 3)
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b'%PDF'), name)
+        bulk_reports._pool.shutdown()
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/reports/bulk/').status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/bulk/?ids=a,b').status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/bulk/?ids=999').status_code, 404)
+
+
+class ReportCacheTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dataset = make_dataset([(f'Pump-{idx}', 'Pump', 100.0, 2.0, 40.0) for idx in range(10)])
+        bulk_reports.report_inputs(self.dataset)
+        bulk_reports.store_charts(self.dataset.pk, {'type': b'png'})
+
+    def cached(self):
+        return cache.get(bulk_reports._summary_key(self.dataset.pk)), bulk_reports.cached_charts(self.dataset.pk)
+
+    def test_delete_drops_cached_inputs(self):
+        retention.tombstone(Dataset.objects.filter(pk=self.dataset.pk))
+        self.assertEqual(self.cached(), (None, None))
+
+    def test_anomaly_recompute_drops_cached_inputs(self):
+        self.assertEqual(self.cached()[0]['anomaly_count'], 0)
+        limits = {'default': {'flowrate': (0, 50), 'pressure': (0, 100), 'temperature': (-50, 500)}}
+        with override_settings(EQUIPMENT_LIMITS=limits):
+            call_command('detect_anomalies', stdout=StringIO())
+        self.assertEqual(self.cached(), (None, None))
+        self.assertEqual(bulk_reports.report_inputs(self.dataset)['anomaly_count'], 10)
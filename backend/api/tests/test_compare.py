@@ -0,0 +1,105 @@
+from django.core.cache import cache
+
+from api import compare
+
+from .helpers import BackendTestCase, client_for, make_dataset, make_user
+
+BEFORE = [
+    ('P-1', 'Pump', 100.0, 2.0, 40.0),
+    ('P-2', 'Pump', 110.0, 2.0, 40.0),
+    ('R-1', 'Reactor', 1000.0, 15.0, 180.0),
+    ('V-1', 'Valve', 0.0, 1.0, 20.0),
+]
+AFTER = [
+    ('P-1', 'Pump', 100.0, 2.0, 40.0),
+    ('P-2', 'Pump', 130.0, 2.5, 40.0),
+    ('P-2', 'Pump', 110.0, 2.5, 40.0),
+    ('R-1', 'Reactor', 1000.0, 18.0, 180.0),
+    ('T-1', 'Storage Tank', 0.0, 1.0, 25.0),
+]
+
+
+class CompareTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = make_dataset(BEFORE, filename='before.csv')
+        self.b = make_dataset(AFTER, filename='after.csv')
+
+    def items(self, **kwargs):
+        return {item['name']: item for item in compare.compare(self.a, self.b, **kwargs)['results']}
+
+    def test_statuses_and_deltas(self):
+        items = self.items()
+        self.assertEqual({name: item['status'] for name, item in items.items()}, {
+            'P-1': 'unchanged', 'P-2': 'changed', 'R-1': 'changed', 'T-1': 'added', 'V-1': 'removed',
+        })
+        # Duplicated names are compared by their mean
+        self.assertEqual(items['P-2']['flowrate'], {'a': 110.0, 'b': 120.0, 'delta': 10.0})
+        self.assertEqual(items['R-1']['pressure']['delta'], 3.0)
+        self.assertEqual(items['T-1']['flowrate'], {'a': None, 'b': 0.0, 'delta': None})
+        self.assertEqual(items['V-1']['type'], 'Valve')
+
+    def test_totals_and_by_type(self):
+        result = compare.compare(self.a, self.b)
+        self.assertEqual(result['totals'], {'a_rows': 4, 'b_rows': 5, 'items': 5,
+                                            'unchanged': 1, 'changed': 2, 'added': 1, 'removed': 1})
+        pumps = next(row for row in result['by_type'] if row['type'] == 'Pump')
+        self.assertEqual(pumps['count'], {'a': 2, 'b': 3, 'delta': 1})
+        self.assertEqual(pumps['changed'], 1)
+        self.assertAlmostEqual(pumps['flowrate']['delta'], 340.0 / 3 - 105.0)
+        valves = next(row for row in result['by_type'] if row['type'] == 'Valve')
+        self.assertEqual((valves['count']['b'], valves['removed'], valves['flowrate']['b']), (0, 1, None))
+
+    def test_filter_order_and_paging(self):
+        self.assertEqual(list(self.items(statuses=['added', 'removed'])), ['T-1', 'V-1'])
+        # Largest change first, one-sided items last
+        ordered = list(self.items(order='flowrate'))
+        self.assertEqual(ordered[0], 'P-2')
+        self.assertEqual(set(ordered[-2:]), {'T-1', 'V-1'})
+        page = compare.compare(self.a, self.b, limit=2, offset=1)
+        self.assertEqual((page['count'], [item['name'] for item in page['results']]), (5, ['P-2', 'R-1']))
+
+    def test_cache_holds_only_the_compact_index(self):
+        compare.compare(self.a, self.b)
+        cached = cache.get(f'compare:index:{self.a.pk}:{self.b.pk}')
+        arrays = [cached['index_a'], cached['index_b'], cached['status'], *cached['orders'].values()]
+        self.assertTrue(all(array.dtype.kind == 'i' and array.itemsize <= 4 for array in arrays))
+        self.assertEqual(set(cached), {'index_a', 'index_b', 'status', 'orders', 'totals', 'by_type'})
+
+    def test_invalid_paging(self):
+        for kwargs in ({'limit': 0}, {'offset': -1}):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                compare.compare(self.a, self.b, **kwargs)
+
+    def test_reversed_pair(self):
+        items = {item['name']: item for item in compare.compare(self.b, self.a)['results']}
+        self.assertEqual((items['T-1']['status'], items['V-1']['status']), ('removed', 'added'))
+        self.assertEqual(items['P-2']['flowrate']['delta'], -10.0)
+
+    def test_empty_side(self):
+        empty = make_dataset([], filename='empty.csv')
+        result = compare.compare(empty, self.a)
+        self.assertEqual(result['totals']['added'], 4)
+        self.assertEqual(result['totals']['a_rows'], 0)
+
+
+class CompareEndpointTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+        self.a = make_dataset(BEFORE, filename='before.csv')
+        self.b = make_dataset(AFTER, filename='after.csv')
+        self.url = f'/api/datasets/{self.a.pk}/compare/{self.b.pk}/'
+
+    def test_compare(self):
+        response = self.client.get(self.url, {'status': 'changed', 'order': 'pressure'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['a']['id'], response.data['b']['id']), (self.a.pk, self.b.pk))
+        self.assertEqual([item['name'] for item in response.data['results']], ['R-1', 'P-2'])
+
+    def test_invalid_requests(self):
+        for params in ({'status': 'gone'}, {'order': 'name,pressure'}, {'limit': 'all'}, {'limit': 0},
+                       {'limit': -2}, {'offset': -1}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+        self.assertEqual(self.client.get(f'/api/datasets/{self.a.pk}/compare/999/').status_code, 404)
@@ -0,0 +1,93 @@
+import hashlib
+from unittest import mock
+
+from django.db import IntegrityError
+
+from api import ingest, jobs, retention
+from api.models import Dataset, IngestJob
+
+from .helpers import BackendTestCase, client_for, csv_file, csv_text, make_dataset, make_user
+
+DIGEST = hashlib.sha256(csv_text().encode()).hexdigest()
+
+
+class UploadDedupTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user('alice')
+        self.client = client_for(self.alice)
+
+    def upload(self, client=None, **params):
+        return (client or self.client).post('/api/upload/', {'file': csv_file(), **params}, format='multipart')
+
+    def test_reupload_returns_existing_dataset(self):
+        first = self.upload()
+        self.assertEqual(first.status_code, 201)
+        second = self.upload()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual((second.data['id'], second.data['duplicate']), (first.data['id'], True))
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    def test_dedup_is_per_owner(self):
+        mine = self.upload().data['id']
+        bob = client_for(make_user('bob'))
+        response = self.upload(bob)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.data['id'], mine)
+        self.assertEqual(Dataset.objects.get(pk=response.data['id']).owner.username, 'bob')
+        # Each owner can delete their own copy
+        self.assertEqual(bob.delete(f"/api/datasets/{response.data['id']}/").status_code, 202)
+        self.assertTrue(Dataset.objects.filter(pk=mine).exists())
+
+    def test_deleted_dataset_releases_its_hash(self):
+        first = self.upload().data['id']
+        retention.tombstone(Dataset.objects.filter(pk=first))
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.data['id'], first)
+
+    def test_race_resolves_to_the_winner(self):
+        real = ingest.ingest_dataframe
+
+        def lose_race(filename, df, content_hash=None, owner=None, progress=None):
+            # Another request from the same user stores the file first
+            lose_race.winner = Dataset.objects.create(filename=filename, owner=owner, content_hash=content_hash)
+            return real(filename, df, content_hash=content_hash, owner=owner, progress=progress)
+
+        with mock.patch.object(ingest, 'ingest_dataframe', lose_race):
+            response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['id'], response.data['duplicate']), (lose_race.winner.pk, True))
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    def test_race_with_vanished_winner_is_a_conflict(self):
+        with mock.patch.object(ingest, 'ingest_dataframe', side_effect=IntegrityError):
+            response = self.upload()
+        self.assertEqual(response.status_code, 409)
+
+
+class AsyncDedupTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user('alice')
+        self.client = client_for(self.alice)
+
+    def upload(self, client=None):
+        with mock.patch.object(jobs, 'enqueue'):
+            return (client or self.client).post('/api/upload/?async=1', {'file': csv_file()}, format='multipart')
+
+    def test_duplicate_answered_before_queueing(self):
+        dataset = make_dataset(owner=self.alice, content_hash=DIGEST)
+        response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], dataset.pk)
+        self.assertFalse(IngestJob.objects.exists())
+        # Another user's copy is not theirs to reuse
+        self.assertEqual(self.upload(client_for(make_user('bob'))).status_code, 202)
+
+    def test_job_losing_race_is_marked_duplicate(self):
+        job = IngestJob.objects.get(pk=self.upload().data['job_id'])
+        winner = make_dataset(owner=self.alice, content_hash=job.content_hash)
+        jobs.run(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.dataset_id), (IngestJob.DUPLICATE, winner.pk))
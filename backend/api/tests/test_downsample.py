@@ -0,0 +1,67 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.downsample import lttb
+
+from .helpers import ROWS, BackendTestCase, client_for, make_dataset, make_user
+
+WAVE = [(f'P-{idx}', 'Pump', float(idx), float(idx % 7), 40.0 + (500.0 if idx == 321 else idx % 5))
+        for idx in range(1000)]
+
+
+class LttbTests(SimpleTestCase):
+    def test_keeps_budget_endpoints_and_order(self):
+        x = np.arange(1000, dtype=float)
+        y = np.sin(x / 20)
+        keep = lttb(x, y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+    def test_keeps_a_spike(self):
+        x = np.arange(500, dtype=float)
+        y = np.zeros(500)
+        y[257] = 100.0
+        self.assertIn(257, lttb(x, y, 20))
+
+    def test_small_input_is_returned_whole(self):
+        x = np.arange(5, dtype=float)
+        self.assertEqual(lttb(x, x, 10).tolist(), [0, 1, 2, 3, 4])
+
+
+class DownsampleEndpointTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+        self.dataset = make_dataset(WAVE)
+        self.url = f'/api/datasets/{self.dataset.pk}/downsample/'
+
+    def test_series_against_row_order(self):
+        data = self.client.get(self.url, {'kind': 'series', 'y': 'temperature', 'budget': 100}).data
+        self.assertEqual((data['kind'], data['total_points'], len(data['points'])), ('series', 1000, 100))
+        self.assertEqual(data['points'][0], [0.0, 40.0])
+        self.assertIn([321.0, 540.0], data['points'])
+
+    def test_series_against_a_parameter_is_sorted(self):
+        data = self.client.get(self.url, {'kind': 'series', 'x': 'pressure', 'y': 'flowrate', 'budget': 50}).data
+        xs = [x for x, _ in data['points']]
+        self.assertEqual(xs, sorted(xs))
+
+    def test_scatter_within_budget_is_raw(self):
+        small = make_dataset(ROWS, filename='small.csv')
+        data = self.client.get(f'/api/datasets/{small.pk}/downsample/', {'x': 'pressure', 'y': 'temperature'}).data
+        self.assertEqual(data['kind'], 'scatter')
+        self.assertEqual(sorted(data['points']), sorted([row[3], row[4]] for row in ROWS))
+
+    def test_scatter_over_budget_is_density(self):
+        data = self.client.get(self.url, {'kind': 'scatter', 'budget': 100}).data
+        self.assertEqual(data['kind'], 'density')
+        self.assertEqual(len(data['x_edges']), 11)
+        self.assertEqual(sum(count for _, _, count in data['cells']), 1000)
+
+    def test_invalid_parameters(self):
+        for params in ({'kind': 'pie'}, {'kind': 'scatter', 'x': 'index'}, {'y': 'name'},
+                       {'budget': 'many'}, {'budget': 2}, {'budget': 10 ** 9}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+        self.assertEqual(self.client.get('/api/datasets/999/downsample/').status_code, 404)
@@ -0,0 +1,104 @@
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from api import equipment_types, search
+from api.models import EquipmentType
+
+from .helpers import BackendTestCase, client_for, make_dataset, make_user
+
+BEFORE = [('api', '0008_equipment_name_search')]
+AFTER = [('api', '0009_equipment_type')]
+TRIGGERS = {'api_equipment_name_fts_ai', 'api_equipment_name_fts_ad', 'api_equipment_name_fts_au'}
+
+
+class LookupTests(BackendTestCase):
+    def test_ids_for_creates_missing_types_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = equipment_types.ids_for(['Pump', 'Valve', 'Pump'])
+        self.assertEqual(set(ids), {'Pump', 'Valve'})
+        self.assertEqual(EquipmentType.objects.count(), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(equipment_types.ids_for(['Valve', 'Pump']), ids)
+            self.assertEqual(equipment_types.names(ids.values()), {v: k for k, v in ids.items()})
+        # Only the unknown name goes to the database: look up, insert, read back
+        with self.assertNumQueries(3):
+            new = equipment_types.ids_for(['Pump', 'Mixer'])
+        self.assertEqual(new['Pump'], ids['Pump'])
+
+    def test_types_from_a_rolled_back_transaction_are_not_remembered(self):
+        with transaction.atomic():
+            sid = transaction.savepoint()
+            equipment_types.ids_for(['Ghost'])
+            transaction.savepoint_rollback(sid)
+        self.assertFalse(EquipmentType.objects.filter(name='Ghost').exists())
+        # Not cached, so it is created again rather than returning a dead id
+        with self.captureOnCommitCallbacks(execute=True):
+            type_id = equipment_types.ids_for(['Ghost'])['Ghost']
+        self.assertEqual(EquipmentType.objects.get(name='Ghost').pk, type_id)
+
+    def test_names_loads_unknown_ids(self):
+        type_id = EquipmentType.objects.create(name='Mixer').pk
+        self.assertEqual(equipment_types.name(type_id), 'Mixer')
+
+    def test_readers_show_type_names(self):
+        make_dataset()
+        summary = client_for(make_user()).get('/api/summary/').data
+        self.assertEqual(summary['type_distribution']['Pump'], 2)
+        self.assertEqual(summary['data'][0]['Type'], 'Pump')
+
+
+class MigrationTests(TransactionTestCase):
+    """Migrates 0008 -> 0009 -> 0008 with rows in place, then back to the latest state."""
+
+    def setUp(self):
+        equipment_types._mappings.clear()
+        self.addCleanup(equipment_types._mappings.clear)
+        self.addCleanup(self.migrate, None)
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        targets = targets or executor.loader.graph.leaf_nodes()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            return {row[0] for row in cursor.fetchall()} & TRIGGERS
+
+    def contains(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {search.FTS_TABLE} WHERE name LIKE %s', [f'%{query}%'])
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_round_trip(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS triggers are SQLite only')
+        apps = self.migrate(BEFORE)
+        Dataset, Equipment = apps.get_model('api', 'Dataset'), apps.get_model('api', 'Equipment')
+        dataset = Dataset.objects.create(filename='old.csv')
+        rows = [Equipment.objects.create(dataset=dataset, name=name, type=kind, flowrate=1, pressure=1, temperature=1)
+                for name, kind in [('Pump-1', 'Pump'), ('Pump-2', 'Pump'), ('Valve-1', 'Valve')]]
+
+        apps = self.migrate(AFTER)
+        Equipment, EquipmentType = apps.get_model('api', 'Equipment'), apps.get_model('api', 'EquipmentType')
+        self.assertEqual(sorted(EquipmentType.objects.values_list('name', flat=True)), ['Pump', 'Valve'])
+        self.assertEqual({e.pk: e.type.name for e in Equipment.objects.select_related('type')},
+                         {rows[0].pk: 'Pump', rows[1].pk: 'Pump', rows[2].pk: 'Valve'})
+        self.assertEqual(self.triggers(), TRIGGERS)
+        # The rebuilt table still feeds the name index
+        added = Equipment.objects.create(dataset_id=dataset.pk, name='Mixer-9', flowrate=1, pressure=1, temperature=1,
+                                         type=EquipmentType.objects.get(name='Pump'))
+        self.assertEqual(self.contains('xer-9'), {added.pk})
+        self.assertEqual(self.contains('pump'), {rows[0].pk, rows[1].pk})
+
+        apps = self.migrate(BEFORE)
+        Equipment = apps.get_model('api', 'Equipment')
+        self.assertEqual(dict(Equipment.objects.values_list('name', 'type')),
+                         {'Pump-1': 'Pump', 'Pump-2': 'Pump', 'Valve-1': 'Valve', 'Mixer-9': 'Pump'})
+        self.assertEqual(self.triggers(), TRIGGERS)
+        Equipment.objects.filter(name='Mixer-9').delete()
+        self.assertEqual(self.contains('xer-9'), set())
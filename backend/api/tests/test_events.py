@@ -0,0 +1,148 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+from api import events
+from api.events import InProcessBroadcaster
+
+from .helpers import BackendTestCase, client_for, csv_file, make_dataset, make_user
+
+
+class EventsTestCase(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        # A fresh broadcaster per test, built from the current settings
+        events._broadcaster = None
+        self.addCleanup(setattr, events, '_broadcaster', None)
+
+
+class BroadcasterTests(EventsTestCase):
+    def test_subscribers_receive_and_replay(self):
+        async def scenario():
+            broadcaster = InProcessBroadcaster()
+            first = broadcaster.publish('dataset.ready', {'id': 1})
+            subscription, replay = broadcaster.subscribe(last_event_id=0)
+            broadcaster.publish('dataset.deleted', {'id': 1}, user_id=7)
+            event = await asyncio.wait_for(subscription[1].get(), 1)
+            broadcaster.unsubscribe(subscription)
+            return first, replay, event
+
+        first, replay, event = asyncio.run(scenario())
+        self.assertEqual([e.id for e in replay], [first.id])
+        self.assertEqual((event.type, event.user_id), ('dataset.deleted', 7))
+        self.assertIn(b'event: dataset.deleted\ndata: {"id": 1}', event.message)
+
+    def test_no_replay_without_last_event_id(self):
+        async def scenario():
+            broadcaster = InProcessBroadcaster()
+            broadcaster.publish('dataset.ready', {'id': 1})
+            return broadcaster.subscribe()[1]
+
+        self.assertEqual(asyncio.run(scenario()), [])
+
+    @override_settings(EVENTS_QUEUE_SIZE=2)
+    def test_slow_subscriber_is_disconnected(self):
+        async def scenario():
+            broadcaster = InProcessBroadcaster()
+            (_, queue), _ = broadcaster.subscribe()
+            for idx in range(3):
+                broadcaster.publish('dataset.ready', {'id': idx})
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        self.assertEqual(asyncio.run(scenario()), [None])
+
+
+class PublishTests(EventsTestCase):
+    def test_upload_publishes_progress_to_uploader_and_ready_to_all(self):
+        alice = make_user('alice')
+        client_for(alice).post('/api/upload/', {'file': csv_file(), 'upload_id': 'u1'}, format='multipart')
+        history = list(events.get_broadcaster()._history)
+        progress = [e for e in history if e.type == 'ingest.progress']
+        self.assertEqual({e.user_id for e in progress}, {alice.pk})
+        self.assertIn(b'"stage": "done"', progress[-1].message)
+        [ready] = [e for e in history if e.type == 'dataset.ready']
+        self.assertIsNone(ready.user_id)
+
+    def test_delete_publishes(self):
+        alice = make_user('alice')
+        dataset = make_dataset(owner=alice)
+        client_for(alice).delete(f'/api/datasets/{dataset.pk}/')
+        [event] = [e for e in events.get_broadcaster()._history if e.type == 'dataset.deleted']
+        self.assertIn(f'"id": {dataset.pk}'.encode(), event.message)
+
+
+class EventStreamTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.token_obj = Token.objects.create(user=self.alice)
+        self.token = self.token_obj.key
+
+    def test_wsgi_is_not_supported(self):
+        self.assertEqual(self.client.get('/api/events/', HTTP_AUTHORIZATION=f'Token {self.token}').status_code, 501)
+
+    async def test_needs_a_valid_token(self):
+        self.assertEqual((await self.async_client.get('/api/events/')).status_code, 401)
+        self.assertEqual((await self.async_client.get('/api/events/', headers={'Authorization': 'Token nope'})).status_code, 401)
+        # The long-lived token is not accepted in the URL
+        self.assertEqual((await self.async_client.get('/api/events/', {'token': self.token})).status_code, 401)
+
+    def test_ticket_endpoint(self):
+        self.assertEqual(self.client.post('/api/events/ticket/').status_code, 401)
+        response = client_for(self.bob).post('/api/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['expires_in'], 30)
+        self.assertNotIn(Token.objects.get(user=self.bob).key, response.data['ticket'])
+
+    async def test_ticket_is_single_use(self):
+        ticket = events.issue_ticket(self.alice, self.token_obj)
+        response = await self.async_client.get('/api/events/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        await aiter(response.streaming_content).aclose()
+        self.assertEqual((await self.async_client.get('/api/events/', {'ticket': ticket})).status_code, 401)
+        self.assertEqual((await self.async_client.get('/api/events/', {'ticket': 'made-up'})).status_code, 401)
+
+    @override_settings(EVENTS_TICKET_TTL=0)
+    async def test_expired_ticket(self):
+        ticket = events.issue_ticket(self.alice, self.token_obj)
+        self.assertEqual((await self.async_client.get('/api/events/', {'ticket': ticket})).status_code, 401)
+
+    @override_settings(EVENTS_AUTH_RECHECK=0, EVENTS_KEEPALIVE=0.05)
+    async def test_stream_ends_when_token_is_revoked(self):
+        response = await self.async_client.get('/api/events/', {'ticket': events.issue_ticket(self.alice, self.token_obj)})
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        self.assertEqual(await asyncio.wait_for(anext(stream), 1), b': keepalive\n\n')
+
+        await sync_to_async(Token.objects.filter(user=self.alice).delete)()
+        with self.assertRaises(StopAsyncIteration):
+            while True:
+                await asyncio.wait_for(anext(stream), 1)
+
+    async def test_stream_forwards_events_for_the_user(self):
+        response = await self.async_client.get('/api/events/', headers={'Authorization': f'Token {self.token}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry: '))
+
+        events.publish('ingest.progress', {'stage': 'parsing'}, user=self.bob)
+        events.publish('ingest.progress', {'stage': 'done'}, user=self.alice)
+        events.publish('dataset.deleted', {'id': 1})
+        received = [await asyncio.wait_for(anext(stream), 1) for _ in range(2)]
+        self.assertIn(b'"stage": "done"', received[0])
+        self.assertIn(b'event: dataset.deleted', received[1])
+        await stream.aclose()
+
+    async def test_reconnect_replays_missed_events(self):
+        first = events.publish('dataset.ready', {'id': 1})
+        events.publish('dataset.deleted', {'id': 1})
+        response = await self.async_client.get('/api/events/', headers={'Authorization': f'Token {self.token}',
+                                                                         'Last-Event-ID': str(first.id)})
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        self.assertIn(b'event: dataset.deleted', await anext(stream))
+        await stream.aclose()
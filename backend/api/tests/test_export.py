@@ -0,0 +1,101 @@
+import csv
+import gzip
+import importlib.util
+import io
+from unittest import mock
+
+from django.test import override_settings
+
+from api import export
+
+from .helpers import ROWS, BackendTestCase, client_for, make_dataset, make_user
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+HAS_OPENPYXL = importlib.util.find_spec('openpyxl') is not None
+EXPECTED = [list(export.EXPORT_HEADERS)] + [[name, kind, *map(str, values)] for name, kind, *values in ROWS]
+
+
+def body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.getvalue()
+
+
+class DatasetExportTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+        self.dataset = make_dataset(filename='plant.csv')
+
+    def url(self, fmt):
+        return f'/api/datasets/{self.dataset.pk}/export.{fmt}'
+
+    def test_csv(self):
+        response = self.client.get(self.url('csv'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="plant.csv"')
+        self.assertEqual(list(csv.reader(io.StringIO(body(response).decode()))), EXPECTED)
+
+    def test_csv_without_working_set(self):
+        with override_settings(WORKING_SET_BUDGET=0):
+            response = self.client.get(self.url('csv'))
+        self.assertEqual(list(csv.reader(io.StringIO(body(response).decode()))), EXPECTED)
+
+    def test_csv_gzip(self):
+        response = self.client.get(self.url('csv'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        text = gzip.decompress(body(response)).decode()
+        self.assertEqual(list(csv.reader(io.StringIO(text))), EXPECTED)
+
+    def test_batches_cover_every_row(self):
+        with mock.patch.object(export, 'EXPORT_BATCH_SIZE', 3):
+            batches = list(export.iter_batches(self.dataset))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+
+    @mock.patch.object(export, 'EXPORT_BATCH_SIZE', 3)
+    def test_parquet(self):
+        if not HAS_PYARROW:
+            self.skipTest('pyarrow is not installed')
+        import pyarrow.parquet as pq
+
+        response = self.client.get(self.url('parquet'))
+        self.assertEqual(response.status_code, 200)
+        parquet = pq.ParquetFile(io.BytesIO(body(response)))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.column_names, export.EXPORT_HEADERS)
+        self.assertEqual([tuple(row.values()) for row in table.to_pylist()], ROWS)
+
+    def test_xlsx(self):
+        if not HAS_OPENPYXL:
+            self.skipTest('openpyxl is not installed')
+        from openpyxl import load_workbook
+
+        response = self.client.get(self.url('xlsx'))
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(body(response)), read_only=True)['Equipment']
+        self.assertEqual([row for row in sheet.iter_rows(values_only=True)], [tuple(export.EXPORT_HEADERS)] + ROWS)
+
+    def test_xlsx_sheet_limit_answers_413(self):
+        if not HAS_OPENPYXL:
+            self.skipTest('openpyxl is not installed')
+        with mock.patch.object(export, 'XLSX_MAX_ROWS', len(ROWS) - 1):
+            response = self.client.get(self.url('xlsx'))
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('CSV', response.data['error'])
+
+    def test_row_cap_applies_to_spooled_formats_only(self):
+        with override_settings(EXPORT_MAX_ROWS=len(ROWS) - 1):
+            if HAS_PYARROW:
+                self.assertEqual(self.client.get(self.url('parquet')).status_code, 413)
+            with override_settings(WORKING_SET_BUDGET=0):
+                self.assertRaises(export.ExportTooLarge, export.check_size, self.dataset, 'parquet')
+            self.assertEqual(self.client.get(self.url('csv')).status_code, 200)
+        export.check_size(self.dataset, 'xlsx')
+
+    def test_missing_library_answers_501(self):
+        with mock.patch.object(export, 'write_xlsx', side_effect=export.ExportUnavailable('XLSX export requires openpyxl')):
+            response = self.client.get(self.url('xlsx'))
+        self.assertEqual(response.status_code, 501)
+
+    def test_unknown_format_and_dataset(self):
+        self.assertEqual(self.client.get(self.url('json')).status_code, 400)
+        self.assertEqual(self.client.get('/api/datasets/999/export.csv').status_code, 404)
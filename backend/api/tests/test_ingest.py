@@ -0,0 +1,80 @@
+from django.test import override_settings
+
+from api import ingest
+
+from .helpers import HEADER, ROWS, BackendTestCase, client_for, csv_file, csv_text, make_user
+
+
+def parse(content):
+    return ingest.read_upload(csv_file(content=content))
+
+
+class ReadUploadTests(BackendTestCase):
+    def test_clean_file(self):
+        parsed = parse(csv_text())
+        self.assertEqual(len(parsed.df), len(ROWS))
+        self.assertEqual((parsed.rejected, parsed.error_count, parsed.errors), (0, 0, []))
+        self.assertEqual(parsed.df['Flowrate'].dtype, 'float64')
+
+    def test_invalid_values_are_reported_per_row(self):
+        parsed = parse(f'{HEADER}\nP1,Pump,1,2,3\nP2,Pump,n/a,2,3\n,Pump,1,2,3\nP4,Pump,1,inf,3\n')
+        self.assertEqual(parsed.df['Equipment Name'].tolist(), ['P1'])
+        self.assertEqual(parsed.rejected, 3)
+        self.assertEqual(parsed.errors, [
+            {'row': 2, 'column': 'Flowrate', 'reason': 'not a number'},
+            {'row': 3, 'column': 'Equipment Name', 'reason': 'missing value'},
+            {'row': 4, 'column': 'Pressure', 'reason': 'not finite'},
+        ])
+
+    def test_ragged_lines_are_rejected_not_fatal(self):
+        parsed = parse(f'{HEADER}\nP1,Pump,1,2,3\nP2,Pump,1,2,3,extra\nP3,Pump,1,2\n')
+        self.assertEqual(parsed.df['Equipment Name'].tolist(), ['P1'])
+        self.assertEqual(parsed.rejected, 2)
+        self.assertEqual(parsed.errors, [
+            {'row': 2, 'column': None, 'reason': 'expected 5 fields, got 6'},
+            {'row': 3, 'column': 'Temperature', 'reason': 'missing value'},
+        ])
+
+    def test_rows_follow_file_lines_across_blank_lines(self):
+        parsed = parse(f'{HEADER}\nP1,Pump,1,2,3\n\n\nP2,Pump,,2,3\n"P\n3",Pump,1,2,3\nP4,Pump,x,2,3\n')
+        self.assertEqual([e['row'] for e in parsed.errors], [4, 7])
+        self.assertEqual(len(parsed.df), 2)
+
+    @override_settings(UPLOAD_MAX_REPORTED_ERRORS=2)
+    def test_report_is_capped_but_counts_are_not(self):
+        parsed = parse(f'{HEADER}\n' + 'P,Pump,x,2,3\n' * 5)
+        self.assertEqual(len(parsed.errors), 2)
+        self.assertEqual((parsed.error_count, parsed.rejected), (5, 5))
+
+    def test_unusable_files(self):
+        cases = {
+            '': 'File is empty',
+            '\n\n': 'File is empty',
+            'Name,Type\nP1,Pump\n': 'Missing columns',
+            f'{HEADER}\nP1,P\xf6mp,1,2,3\n'.encode('latin-1'): 'not UTF-8',
+        }
+        for content, message in cases.items():
+            with self.subTest(content=content):
+                with self.assertRaisesMessage(ingest.IngestError, message):
+                    parse(content)
+
+
+class UploadErrorTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+
+    def upload(self, content):
+        return self.client.post('/api/upload/', {'file': csv_file(content=content)}, format='multipart')
+
+    def test_unreadable_files_are_client_errors(self):
+        self.assertEqual(self.upload('').status_code, 400)
+        response = self.upload(f'{HEADER}\nP1,P\xf6mp,1,2,3\n'.encode('latin-1'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('UTF-8', response.data['error'])
+
+    def test_ragged_file_imports_valid_rows(self):
+        response = self.upload(f'{HEADER}\nP1,Pump,1,2,3\nP2,Pump,1,2,3,4\n')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['rows_imported'], response.data['rows_rejected']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
@@ -0,0 +1,110 @@
+import asyncio
+
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+
+from api.instrumentation import (
+    PHASE_LATENCY, REQUEST_LATENCY, RESPONSES, SQL_QUERIES, InstrumentationMiddleware, span,
+)
+from api.models import Dataset
+
+from .helpers import BackendTestCase, client_for, make_dataset, make_user
+
+
+def observations(view, method='GET'):
+    series = REQUEST_LATENCY._series.get((view, method))
+    return sum(series[0]) if series else 0
+
+
+class ServerTimingTests(BackendTestCase):
+    def test_header_lists_phases_and_sql(self):
+        make_dataset()
+        response = client_for(make_user()).get('/api/summary/')
+        timing = response['Server-Timing']
+        self.assertIn('summary_aggregates;dur=', timing)
+        self.assertIn('db;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+
+class StreamingTests(BackendTestCase):
+    @override_settings(WORKING_SET_BUDGET=0)
+    def test_streamed_body_is_measured_until_closed(self):
+        dataset = make_dataset()
+        client = client_for(make_user())
+        requests = observations('dataset-export')
+        queries = SQL_QUERIES._values.get(('dataset-export',), 0)
+
+        response = client.get(f'/api/datasets/{dataset.pk}/export.csv')
+        # Nothing recorded until the body has been sent
+        self.assertEqual(observations('dataset-export'), requests)
+        b''.join(response.streaming_content)
+
+        self.assertEqual(observations('dataset-export'), requests + 1)
+        # The rows are read while streaming, after the view returned
+        self.assertGreater(SQL_QUERIES._values[('dataset-export',)], queries)
+
+    def test_queries_and_spans_during_iteration_are_counted(self):
+        def chunks():
+            with span('stream_phase'):
+                yield str(Dataset.objects.count()).encode()
+
+        queries = SQL_QUERIES._values.get(('unmatched',), 0)
+        phases = PHASE_LATENCY._series.get(('unmatched', 'stream_phase'), [[0]])
+        phases = sum(phases[0])
+        middleware = InstrumentationMiddleware(lambda request: StreamingHttpResponse(chunks()))
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(b''.join(response), b'0')
+        response.close()
+
+        self.assertEqual(SQL_QUERIES._values[('unmatched',)], queries + 1)
+        self.assertEqual(sum(PHASE_LATENCY._series[('unmatched', 'stream_phase')][0]), phases + 1)
+
+    def test_async_stream(self):
+        async def chunks():
+            yield b'a'
+            yield b'b'
+
+        before = observations('unmatched')
+        middleware = InstrumentationMiddleware(lambda request: StreamingHttpResponse(chunks()))
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(observations('unmatched'), before)
+
+        async def consume():
+            return b''.join([part async for part in response])
+        self.assertEqual(asyncio.run(consume()), b'ab')
+        response.close()
+        self.assertEqual(observations('unmatched'), before + 1)
+
+    def test_event_streams_stay_out_of_latency(self):
+        before = observations('unmatched')
+        responses = RESPONSES._values.get(('unmatched', '200'), 0)
+        middleware = InstrumentationMiddleware(
+            lambda request: StreamingHttpResponse(iter([b'data: {}\n\n']), content_type='text/event-stream'))
+        response = middleware(RequestFactory().get('/'))
+        b''.join(response)
+        response.close()
+        self.assertEqual(observations('unmatched'), before)
+        self.assertEqual(RESPONSES._values[('unmatched', '200')], responses + 1)
+
+
+class MetricsPermissionTests(BackendTestCase):
+    def test_closed_by_default(self):
+        self.assertEqual(self.client.get('/api/metrics/', REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_allowed_address_needs_no_token(self):
+        response = self.client.get('/api/metrics/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('api_request_duration_seconds', response.content.decode())
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='scrape-secret')
+    def test_other_addresses_need_scrape_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+        # A user token is not enough
+        self.assertEqual(client_for(make_user()).get('/api/metrics/').status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN=None)
+    def test_no_token_configured(self):
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
@@ -0,0 +1,108 @@
+import os
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from api import jobs
+from api.models import Dataset, IngestJob
+
+from .helpers import HEADER, ROWS, BackendTestCase, client_for, csv_file, make_user
+
+
+@override_settings(INGEST_ASYNC_BACKEND='worker')
+class AsyncUploadTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user('alice')
+        self.client = client_for(self.alice)
+
+    def upload(self, file=None):
+        response = self.client.post('/api/upload/?async=1', {'file': file or csv_file()}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        return IngestJob.objects.get(pk=response.data['job_id'])
+
+    def test_job_is_queued_then_run_by_worker(self):
+        job = self.upload()
+        self.assertEqual(job.status, IngestJob.QUEUED)
+        self.assertTrue(os.path.exists(job.path))
+
+        out = StringIO()
+        call_command('ingest_worker', once=True, stdout=out)
+        self.assertIn(f'Job {job.pk} (equipment.csv): done', out.getvalue())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_total, job.rows_processed), (IngestJob.DONE, len(ROWS), len(ROWS)))
+        self.assertEqual(job.dataset.owner, self.alice)
+        self.assertFalse(os.path.exists(job.path))
+
+        data = self.client.get(f'/api/ingest/jobs/{job.pk}/').data
+        self.assertEqual((data['status'], data['dataset_id']), ('done', job.dataset_id))
+
+    def test_row_errors_are_recorded(self):
+        job = self.upload(csv_file(content=f'{HEADER}\nP1,Pump,1,2,3\nP2,Pump,x,2,3\n'))
+        jobs.run(jobs.claim(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_rejected), (IngestJob.DONE, 1))
+        self.assertEqual(job.errors, [{'row': 2, 'column': 'Flowrate', 'reason': 'not a number'}])
+
+    def test_unusable_file_fails_the_job(self):
+        job = self.upload(csv_file(content='Name,Type\nP1,Pump\n'))
+        jobs.run(jobs.claim(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.FAILED)
+        self.assertIn('Missing columns', job.error)
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(os.path.exists(job.path))
+
+    def test_async_flag_must_be_true(self):
+        cases = [('/api/upload/?async=0', {}, 201), ('/api/upload/', {'async': 'false'}, 201),
+                 ('/api/upload/', {'async': 'yes'}, 202)]
+        for idx, (url, data, expected) in enumerate(cases):
+            with self.subTest(url=url, data=data):
+                upload = csv_file(content=f'{HEADER}\nP{idx},Pump,1,2,3\n')
+                self.assertEqual(self.client.post(url, {'file': upload, **data}, format='multipart').status_code, expected)
+
+    def test_spool_file_is_removed_when_the_job_cannot_be_created(self):
+        os.makedirs(settings.INGEST_SPOOL_DIR, exist_ok=True)
+        before = set(os.listdir(settings.INGEST_SPOOL_DIR))
+        with mock.patch.object(IngestJob.objects, 'create', side_effect=RuntimeError('database is locked')):
+            with self.assertRaises(RuntimeError):
+                self.client.post('/api/upload/?async=1', {'file': csv_file()}, format='multipart')
+        self.assertEqual(set(os.listdir(settings.INGEST_SPOOL_DIR)), before)
+
+    def test_jobs_are_private(self):
+        job = self.upload()
+        self.assertEqual(client_for(make_user('bob')).get(f'/api/ingest/jobs/{job.pk}/').status_code, 404)
+        self.assertEqual(client_for(make_user('admin', is_staff=True)).get(f'/api/ingest/jobs/{job.pk}/').status_code, 200)
+        self.assertEqual(self.client.get('/api/ingest/jobs/999/').status_code, 404)
+
+    def test_claim_hands_out_each_job_once(self):
+        job = self.upload()
+        self.assertEqual(jobs.claim().pk, job.pk)
+        self.assertIsNone(jobs.claim())
+        self.assertIsNone(jobs.claim(job.pk))
+
+    @override_settings(INGEST_JOB_TIMEOUT=60)
+    def test_stale_running_jobs_are_requeued(self):
+        job = self.upload()
+        jobs.claim(job.pk)
+        self.assertEqual(jobs.requeue_stale(), 0)
+        IngestJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim().pk, job.pk)
+
+
+class ThreadBackendTests(BackendTestCase):
+    @override_settings(INGEST_ASYNC_BACKEND='thread')
+    def test_job_is_handed_to_the_pool_on_commit(self):
+        client = client_for(make_user())
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post('/api/upload/?async=1', {'file': csv_file()}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        os.remove(IngestJob.objects.get().path)
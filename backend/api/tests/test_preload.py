@@ -0,0 +1,19 @@
+from django.test import SimpleTestCase
+
+from api.preload import ENGINES, preload
+from benchmarks.startup import measure
+
+
+class LazyImportTests(SimpleTestCase):
+    def test_app_loads_without_heavy_engines(self):
+        # A fresh interpreter loading the WSGI app and URLconf, like a gunicorn worker
+        self.assertEqual(measure('')['heavy'], [])
+
+    def test_preload_imports_only_named_engines(self):
+        heavy = measure('ingest')['heavy']
+        self.assertIn('pandas', heavy)
+        self.assertNotIn('reportlab', heavy)
+        self.assertIn('reportlab', measure('reports')['heavy'])
+
+    def test_preload_reports_timings(self):
+        self.assertEqual(set(preload()), set(ENGINES))
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from api import retention
+from api.models import Dataset, Equipment, ParameterSketch
+
+from .helpers import ROWS, BackendTestCase, client_for, make_dataset, make_user
+
+
+class DeleteViewTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user('alice')
+        self.staff = make_user('admin', is_staff=True)
+
+    def delete(self, user, dataset):
+        return client_for(user).delete(f'/api/datasets/{dataset.pk}/')
+
+    def test_owner_can_delete(self):
+        dataset = make_dataset(owner=self.alice)
+        self.assertEqual(self.delete(self.alice, dataset).status_code, 202)
+        self.assertFalse(Dataset.objects.filter(pk=dataset.pk).exists())
+        self.assertTrue(Dataset.all_objects.filter(pk=dataset.pk).exists())
+
+    def test_other_users_cannot_delete(self):
+        dataset = make_dataset(owner=self.alice)
+        self.assertEqual(self.delete(make_user('bob'), dataset).status_code, 403)
+        self.assertTrue(Dataset.objects.filter(pk=dataset.pk).exists())
+
+    def test_unowned_datasets_are_staff_only(self):
+        dataset = make_dataset(owner=None)
+        self.assertEqual(self.delete(self.alice, dataset).status_code, 403)
+        self.assertTrue(Dataset.objects.filter(pk=dataset.pk).exists())
+        self.assertEqual(self.delete(self.staff, dataset).status_code, 202)
+
+    def test_staff_can_delete_any(self):
+        dataset = make_dataset(owner=self.alice)
+        self.assertEqual(self.delete(self.staff, dataset).status_code, 202)
+        self.assertEqual(self.delete(self.staff, dataset).status_code, 404)
+
+
+class RetentionTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user('alice')
+
+    def test_tombstone_hides_and_releases_hash(self):
+        dataset = make_dataset(owner=self.alice, content_hash='a' * 64)
+        self.assertEqual(retention.tombstone(Dataset.objects.filter(pk=dataset.pk)), 1)
+        self.assertEqual(retention.tombstone(Dataset.all_objects.filter(pk=dataset.pk)), 0)
+        dataset = Dataset.all_objects.get(pk=dataset.pk)
+        self.assertIsNone(dataset.content_hash)
+        self.assertIsNotNone(dataset.deleted_at)
+        self.assertEqual(client_for(self.alice).get('/api/history/').data, [])
+
+    def test_purge_removes_rows_in_batches(self):
+        dead = make_dataset(owner=self.alice)
+        live = make_dataset(owner=self.alice, filename='live.csv')
+        retention.tombstone(Dataset.objects.filter(pk=dead.pk))
+
+        self.assertEqual(retention.purge(batch_size=3), (1, len(ROWS)))
+        self.assertFalse(Dataset.all_objects.filter(pk=dead.pk).exists())
+        self.assertFalse(Equipment.objects.filter(dataset_id=dead.pk).exists())
+        self.assertFalse(ParameterSketch.objects.filter(dataset_id=dead.pk).exists())
+        self.assertEqual(Equipment.objects.filter(dataset=live).count(), len(ROWS))
+
+    @override_settings(DATASET_RETENTION_MAX_PER_USER=1)
+    def test_policy_keeps_newest_per_owner(self):
+        old = make_dataset(owner=self.alice, filename='old.csv')
+        new = make_dataset(owner=self.alice, filename='new.csv')
+        other = make_dataset(owner=make_user('bob'), filename='other.csv')
+        self.assertEqual(retention.expired_datasets(), [old.pk])
+        self.assertEqual(retention.apply_policy(), 1)
+        self.assertEqual(set(Dataset.objects.values_list('id', flat=True)), {new.pk, other.pk})
+
+    @override_settings(DATASET_RETENTION_DAYS=30)
+    def test_policy_expires_by_age(self):
+        old = make_dataset(owner=self.alice, filename='old.csv')
+        make_dataset(owner=self.alice, filename='new.csv')
+        Dataset.objects.filter(pk=old.pk).update(upload_date=timezone.now() - timedelta(days=31))
+        self.assertEqual(retention.expired_datasets(), [old.pk])
+
+    @override_settings(DATASET_RETENTION_DAYS=30)
+    def test_purge_command(self):
+        old = make_dataset(owner=self.alice)
+        Dataset.objects.filter(pk=old.pk).update(upload_date=timezone.now() - timedelta(days=31))
+        out = StringIO()
+        call_command('purge_datasets', pause=0, stdout=out)
+        self.assertIn('Tombstoned 1 dataset(s)', out.getvalue())
+        self.assertIn(f'Purged 1 dataset(s), {len(ROWS)} equipment rows', out.getvalue())
+        self.assertFalse(Dataset.all_objects.exists())
@@ -0,0 +1,84 @@
+from api import retention, search
+from api.models import Dataset, Equipment
+
+from .helpers import BackendTestCase, client_for, make_dataset, make_user
+
+PLANT_A = [
+    ('Pump-101', 'Pump', 150.0, 2.0, 45.0),
+    ('Pump-102', 'Pump', 140.0, 2.0, 46.0),
+    ('Feed-Pump-7', 'Pump', 120.0, 3.0, 40.0),
+    ('Reactor_1', 'Reactor', 1200.0, 15.0, 180.0),
+]
+PLANT_B = [
+    ('Pump-101', 'Pump', 160.0, 2.5, 47.0),
+    ('pump-201', 'Pump', 100.0, 1.5, 40.0),
+    ('Reactor-1', 'Reactor', 1100.0, 14.0, 170.0),
+]
+
+
+def names(result):
+    return {group['dataset']['filename']: [row['Equipment Name'] for row in group['rows']] for group in result['results']}
+
+
+class SearchTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = make_dataset(PLANT_A, filename='a.csv')
+        self.b = make_dataset(PLANT_B, filename='b.csv')
+
+    def test_prefix_is_case_sensitive_and_grouped_newest_first(self):
+        result = search.search('Pump-1', 'prefix')
+        self.assertEqual(result['count'], 2)
+        self.assertEqual([group['dataset']['id'] for group in result['results']], [self.b.pk, self.a.pk])
+        self.assertEqual(names(result), {'a.csv': ['Pump-101', 'Pump-102'], 'b.csv': ['Pump-101']})
+        self.assertEqual(result['results'][1]['match_count'], 2)
+        self.assertEqual(result['results'][1]['avg_flowrate'], 145.0)
+
+    def test_exact(self):
+        self.assertEqual(names(search.search('Pump-102', 'exact')), {'a.csv': ['Pump-102']})
+        self.assertEqual(search.search('Pump-10', 'exact')['count'], 0)
+
+    def test_contains_is_case_insensitive(self):
+        self.assertTrue(search.has_fts())
+        result = search.search('pump', 'contains')
+        self.assertEqual(names(result), {
+            'a.csv': ['Feed-Pump-7', 'Pump-101', 'Pump-102'],
+            'b.csv': ['Pump-101', 'pump-201'],
+        })
+
+    def test_contains_treats_wildcards_literally(self):
+        self.assertEqual(names(search.search('or_1', 'contains')), {'a.csv': ['Reactor_1']})
+        self.assertEqual(search.search('p%1', 'contains')['count'], 0)
+
+    def test_index_follows_deletes(self):
+        Equipment.objects.filter(dataset=self.a, name='Feed-Pump-7').delete()
+        self.assertNotIn('Feed-Pump-7', names(search.search('feed', 'contains')).get('a.csv', []))
+
+    def test_deleted_datasets_are_hidden(self):
+        retention.tombstone(Dataset.objects.filter(pk=self.b.pk))
+        self.assertEqual(list(names(search.search('Pump', 'prefix'))), ['a.csv'])
+
+    def test_paging_and_row_cap(self):
+        result = search.search('Pump', 'prefix', limit=1, offset=1, rows=1)
+        self.assertEqual(result['count'], 2)
+        self.assertEqual(names(result), {'a.csv': ['Pump-101']})
+        self.assertEqual(result['results'][0]['match_count'], 2)
+
+
+class SearchEndpointTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+        make_dataset(PLANT_A)
+
+    def test_search(self):
+        response = self.client.get('/api/equipment/search/', {'q': ' Pump-1 '})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['query'], response.data['mode'], response.data['count']), ('Pump-1', 'prefix', 1))
+
+    def test_invalid_requests(self):
+        for params in ({}, {'q': ' '}, {'q': 'Pump', 'mode': 'fuzzy'}, {'q': 'Pu', 'mode': 'contains'},
+                       {'q': 'Pump', 'limit': 'ten'}, {'q': 'Pump', 'limit': 0}, {'q': 'Pump', 'limit': -5},
+                       {'q': 'Pump', 'offset': -1}, {'q': 'Pump', 'rows': -1}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/equipment/search/', params).status_code, 400)
@@ -0,0 +1,82 @@
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.sketches import Sketch, build_sketches
+
+from .helpers import ROWS, BackendTestCase, client_for, make_dataset, make_user
+
+BINS = {'flowrate': (0, 100, 10), 'pressure': (0, 100, 10), 'temperature': (0, 100, 10)}
+
+
+def frame(values):
+    return pd.DataFrame({
+        'Type': ['Pump'] * len(values), 'Flowrate': values, 'Pressure': values, 'Temperature': values,
+    })
+
+
+def all_types_sketch(values, parameter='flowrate'):
+    rows = build_sketches(None, frame(values))
+    [row] = [row for row in rows if row.type == '' and row.parameter == parameter]
+    return row
+
+
+@override_settings(HISTOGRAM_BINS=BINS)
+class SketchTests(BackendTestCase):
+    def test_high_goes_in_last_bin(self):
+        row = all_types_sketch([0.0, 99.9, 100.0, 100.1, -0.1])
+        self.assertEqual(row.bins[0], 1)
+        self.assertEqual(row.bins[1], 1)
+        self.assertEqual(row.bins[-2], 2)
+        self.assertEqual(row.bins[-1], 1)
+
+    def test_quantiles_within_one_bin(self):
+        values = np.random.default_rng(0).uniform(0, 100, 1000)
+        sketch = Sketch.from_model(all_types_sketch(values.tolist()))
+        for q in (0.5, 0.9, 0.99):
+            self.assertLessEqual(abs(sketch.quantile(q) - np.quantile(values, q)), 10)
+
+    def test_merge_equals_sketch_of_union(self):
+        first, second = [1.0, 15.0, 55.0], [60.0, 99.0, 120.0]
+        merged = Sketch.from_model(all_types_sketch(first)).merge(Sketch.from_model(all_types_sketch(second)))
+        union = Sketch.from_model(all_types_sketch(first + second))
+        self.assertEqual(merged.counts.tolist(), union.counts.tolist())
+        self.assertEqual((merged.count, merged.minimum, merged.maximum), (union.count, union.minimum, union.maximum))
+
+    def test_mismatched_layouts_do_not_merge(self):
+        with self.assertRaises(ValueError):
+            Sketch(0, 100, [0] * 12).merge(Sketch(0, 100, [0] * 22))
+
+
+class DistributionEndpointTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user())
+
+    def test_stale_layout_is_reported_not_merged(self):
+        with override_settings(HISTOGRAM_BINS={**BINS, 'flowrate': (0, 5000, 100)}):
+            old = make_dataset(filename='old.csv')
+        with override_settings(HISTOGRAM_BINS=BINS):
+            new = make_dataset(filename='new.csv')
+            response = self.client.get('/api/analytics/distribution/', {'ids': f'{old.pk},{new.pk}'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['stale_datasets'], [old.pk])
+            self.assertEqual(response.data['all']['flowrate']['count'], len(ROWS))
+
+            # A single dataset still reports its own layout
+            self.assertEqual(self.client.get(f'/api/datasets/{old.pk}/distribution/').status_code, 200)
+
+            call_command('build_sketches', stdout=StringIO())
+            response = self.client.get('/api/analytics/distribution/', {'ids': f'{old.pk},{new.pk}'})
+            self.assertEqual(response.data['stale_datasets'], [])
+            self.assertEqual(response.data['all']['flowrate']['count'], 2 * len(ROWS))
+
+    def test_summary_percentiles(self):
+        dataset = make_dataset()
+        summary = self.client.get('/api/summary/').data
+        self.assertEqual(summary['id'], dataset.pk)
+        p50 = summary['percentiles']['temperature']['p50']
+        self.assertLessEqual(abs(p50 - 46.1), 2)
@@ -0,0 +1,114 @@
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.test import override_settings
+
+from api import retention, working_set
+from api.models import Dataset
+from api.views import get_dataset_summary
+from backend.test_runner import scratch_storage
+
+from .helpers import ROWS, BackendTestCase, client_for, csv_file, make_dataset, make_user
+
+
+def entry_path(dataset):
+    return os.path.join(working_set._root(), working_set._entry_name(dataset))
+
+
+class WorkingSetTests(BackendTestCase):
+    def test_runs_in_scratch_directory(self):
+        self.assertTrue(Path(settings.WORKING_SET_DIR).parent.name.startswith('equipment-scratch-'))
+
+    def test_columns_match_rows(self):
+        dataset = make_dataset()
+        columns = working_set.get(dataset)
+
+        self.assertTrue(os.path.isdir(entry_path(dataset)))
+        self.assertEqual(len(columns), len(ROWS))
+        self.assertEqual(list(columns.rows()), [tuple(row) for row in ROWS])
+        self.assertEqual(columns.type_counts(), {'Heat Exchanger': 1, 'Pump': 2, 'Reactor': 2, 'Storage Tank': 1, 'Valve': 1})
+        # Zero-copy views of the mapped files
+        self.assertIsInstance(columns.flowrate, np.memmap)
+        self.assertIs(working_set.get(dataset), columns)
+
+    def test_summary_matches_database_fallback(self):
+        dataset = make_dataset()
+        cached = get_dataset_summary(dataset)
+        with override_settings(WORKING_SET_BUDGET=0):
+            fallback = get_dataset_summary(dataset)
+
+        self.assertEqual(cached['type_distribution'], fallback['type_distribution'])
+        self.assertEqual(cached['data'], fallback['data'])
+        self.assertAlmostEqual(cached['avg_flowrate'], fallback['avg_flowrate'])
+
+    def test_oversized_dataset_is_not_cached(self):
+        dataset = make_dataset()
+        with override_settings(WORKING_SET_BUDGET=16):
+            self.assertIsNone(working_set.get(dataset))
+            self.assertEqual(len(working_set.load(dataset)), len(ROWS))
+        self.assertFalse(os.path.exists(entry_path(dataset)))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        first = make_dataset(filename='first.csv')
+        second = make_dataset(filename='second.csv')
+        working_set.get(first)
+        size = working_set._entry_size(entry_path(first))
+        # Make the first entry clearly the older one
+        os.utime(entry_path(first), (1, 1))
+
+        with override_settings(WORKING_SET_BUDGET=size + size // 2):
+            working_set.get(second)
+
+        self.assertFalse(os.path.exists(entry_path(first)))
+        self.assertTrue(os.path.isdir(entry_path(second)))
+
+    def test_evict(self):
+        dataset = make_dataset()
+        working_set.get(dataset)
+        working_set.evict([dataset.pk])
+        self.assertFalse(os.path.exists(entry_path(dataset)))
+
+    def test_process_bookkeeping_follows_entries(self):
+        dataset = make_dataset(filename='a.csv')
+        path = entry_path(dataset)
+        working_set.get(dataset)
+        self.assertIn(path, working_set._open)
+        self.assertIn(path, working_set._touched)
+        # Removed by another worker: dropped on this worker's next load
+        shutil.rmtree(path)
+        working_set.get(make_dataset(filename='b.csv'))
+        self.assertNotIn(path, working_set._open)
+        self.assertNotIn(path, working_set._touched)
+
+    def test_deleting_a_dataset_forgets_it(self):
+        dataset = make_dataset()
+        with override_settings(WORKING_SET_BUDGET=16):
+            self.assertIsNone(working_set.get(dataset))
+        self.assertIn(entry_path(dataset), working_set._oversized)
+        retention.tombstone(Dataset.objects.filter(pk=dataset.pk))
+        self.assertNotIn(entry_path(dataset), working_set._oversized)
+
+    def test_upload_leaves_the_entry_to_the_first_read(self):
+        client = client_for(make_user())
+        response = client.post('/api/upload/', {'file': csv_file()}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertIsNone(working_set.get(dataset, build=False))
+        self.assertFalse(os.path.exists(entry_path(dataset)))
+
+        self.assertEqual(len(client.get('/api/summary/').data['data']), len(ROWS))
+        self.assertTrue(os.path.isdir(entry_path(dataset)))
+
+
+class ScratchStorageTests(BackendTestCase):
+    def test_scratch_directory_is_removed(self):
+        outer = settings.WORKING_SET_DIR
+        with scratch_storage() as scratch:
+            self.assertEqual(Path(settings.WORKING_SET_DIR), scratch / 'working_set')
+            working_set.get(make_dataset())
+            self.assertTrue(any(scratch.iterdir()))
+        self.assertFalse(scratch.exists())
+        self.assertEqual(settings.WORKING_SET_DIR, outer)
@@ -1,12 +1,30 @@
 from django.urls import path
-from .views import UploadView, SummaryView, HistoryView, RegisterView, PDFReportView
+from .views import UploadView, SummaryView, HistoryView, RegisterView, PDFReportView, DatasetExportView, TrendsView, AnomalyListView, DatasetDistributionView, DistributionView, MetricsView, LogoutView, TokenRotateView, DatasetDownsampleView, DatasetDetailView, IngestJobView, BulkReportView, EquipmentSearchView, DatasetCompareView, EventTicketView
 from rest_framework.authtoken import views
+from .events import event_stream
 
 urlpatterns = [
     path('upload/', UploadView.as_view(), name='upload'),
+    path('ingest/jobs/<int:pk>/', IngestJobView.as_view(), name='ingest-job'),
     path('summary/', SummaryView.as_view(), name='summary'),
     path('history/', HistoryView.as_view(), name='history'),
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', views.obtain_auth_token, name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('token/rotate/', TokenRotateView.as_view(), name='token-rotate'),
     path('report/<int:pk>/', PDFReportView.as_view(), name='report'),
+    path('events/', event_stream, name='events'),
+    path('events/ticket/', EventTicketView.as_view(), name='events-ticket'),
+    path('reports/bulk/', BulkReportView.as_view(), name='reports-bulk'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('analytics/trends/', TrendsView.as_view(), name='analytics-trends'),
+    path('analytics/distribution/', DistributionView.as_view(), name='analytics-distribution'),
+    path('datasets/<int:pk>/', DatasetDetailView.as_view(), name='dataset-detail'),
+    path('datasets/<int:pk>/compare/<int:other_pk>/', DatasetCompareView.as_view(), name='dataset-compare'),
+    path('datasets/<int:pk>/distribution/', DatasetDistributionView.as_view(), name='dataset-distribution'),
+    path('equipment/search/', EquipmentSearchView.as_view(), name='equipment-search'),
+    path('anomalies/', AnomalyListView.as_view(), name='anomalies'),
+    path('datasets/<int:pk>/anomalies/', AnomalyListView.as_view(), name='dataset-anomalies'),
+    path('datasets/<int:pk>/downsample/', DatasetDownsampleView.as_view(), name='dataset-downsample'),
+    path('datasets/<int:pk>/export.<str:fmt>', DatasetExportView.as_view(), name='dataset-export'),
 ]
@@ -2,14 +2,37 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
 from rest_framework import status
+from rest_framework.throttling import ScopedRateThrottle
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import Avg, Count
-from .models import Dataset, Equipment
-from .serializers import DatasetSerializer, EquipmentSerializer
-import pandas as pd
-import io
+from django.http import StreamingHttpResponse, FileResponse, HttpResponse
+from .models import Dataset, Equipment, IngestJob, ParameterSketch
+from .serializers import DatasetSerializer, EquipmentSerializer, equipment_records
+from . import admission, analytics, bulk_reports, compare, downsample, equipment_types, events, jobs, retention, search, working_set
+from .anomalies import describe_flags
+from .sketches import dataset_percentiles, merge_distribution
+from .instrumentation import MetricsPermission, render_metrics, span
+import hashlib
+import os
+import numpy as np
+
+def upload_digest(file_obj):
+    digest = hashlib.sha256()
+    for chunk in file_obj.chunks():
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+def wants_async(request):
+    # '?async=0' or 'async=false' mean a normal upload, not "any value"
+    value = request.query_params.get('async') or request.data.get('async') or ''
+    return str(value).strip().lower() in ('1', 'true', 'yes')
 
 class UploadView(APIView):
     parser_classes = [MultiPartParser]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'uploads'
 
     def post(self, request, format=None):
         if 'file' not in request.data:
@@ -20,52 +43,137 @@ class UploadView(APIView):
         if not file_obj.name.endswith('.csv'):
             return Response({'error': 'File must be a CSV'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            # Read CSV
-            df = pd.read_csv(file_obj)
-            
-            # Simple validation of headers
-            required_cols = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-            if not all(col in df.columns for col in required_cols):
-                 return Response({'error': f'Missing columns. Required: {required_cols}'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Create Dataset
-            dataset = Dataset.objects.create(filename=file_obj.name)
-
-            # Bulk create equipment
-            equipment_list = []
-            for _, row in df.iterrows():
-                equipment_list.append(Equipment(
-                    dataset=dataset,
-                    name=row['Equipment Name'],
-                    type=row['Type'],
-                    flowrate=row['Flowrate'],
-                    pressure=row['Pressure'],
-                    temperature=row['Temperature']
-                ))
-            
-            Equipment.objects.bulk_create(equipment_list)
+        if wants_async(request):
+            return self.post_async(request, file_obj)
+
+        # Identical re-uploads resolve to the existing dataset without parsing
+        with span('hash'):
+            digest = upload_digest(file_obj)
+        existing = Dataset.objects.filter(owner=request.user, content_hash=digest).first()
+        if existing:
+            return Response({'message': 'Duplicate upload', 'id': existing.id, 'duplicate': True}, status=status.HTTP_200_OK)
+
+        # Lets the uploader match ingest.progress events to this request
+        upload_id = request.data.get('upload_id')
 
-            return Response({'message': 'Upload successful', 'id': dataset.id}, status=status.HTTP_201_CREATED)
+        def progress(stage, **counts):
+            events.publish('ingest.progress', {'upload_id': upload_id, 'filename': file_obj.name, 'stage': stage, **counts}, user=request.user)
+
+        release = admission.acquire('upload')
+        try:
+            with span('ingest_engine'):
+                from . import ingest
+
+            progress('parsing')
+            try:
+                parsed = ingest.read_upload(file_obj)
+            except ingest.IngestError as e:
+                progress('failed', error=str(e))
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            report = {
+                'rows_imported': len(parsed.df),
+                'rows_rejected': parsed.rejected,
+                'error_count': parsed.error_count,
+                'errors': parsed.errors,
+            }
+            if not len(parsed.df):
+                progress('failed', error='No valid rows in file')
+                return Response({'error': 'No valid rows in file', **report}, status=status.HTTP_400_BAD_REQUEST)
+
+            progress('parsed', rows_valid=len(parsed.df), rows_rejected=parsed.rejected)
+            try:
+                dataset, flags = ingest.ingest_dataframe(
+                    file_obj.name, parsed.df, content_hash=digest, owner=request.user,
+                    progress=lambda done, total: progress('inserting', rows_inserted=done, rows_total=total))
+            except IntegrityError:
+                # A concurrent upload of the same file won the race
+                existing = Dataset.objects.filter(owner=request.user, content_hash=digest).first()
+                if existing is None:
+                    # ...and was deleted again before we could look it up
+                    return Response({'error': 'Upload conflicted with a concurrent change, please retry'},
+                                    status=status.HTTP_409_CONFLICT)
+                return Response({'message': 'Duplicate upload', 'id': existing.id, 'duplicate': True}, status=status.HTTP_200_OK)
+
+            progress('done', dataset_id=dataset.id)
+            with span('publish'):
+                publish_dataset_ready(dataset, len(parsed.df))
+            return Response({'message': 'Upload successful', 'id': dataset.id, 'anomaly_count': int((flags > 0).sum()), **report}, status=status.HTTP_201_CREATED)
 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            release()
+
+    def post_async(self, request, file_obj):
+        # Hashed while spooling, so duplicates are still answered right away
+        with span('spool'):
+            path, digest = jobs.spool(file_obj)
+        existing = Dataset.objects.filter(owner=request.user, content_hash=digest).first()
+        if existing:
+            os.remove(path)
+            return Response({'message': 'Duplicate upload', 'id': existing.id, 'duplicate': True}, status=status.HTTP_200_OK)
 
-def get_dataset_summary(dataset):
+        try:
+            with transaction.atomic():
+                job = IngestJob.objects.create(owner=request.user, filename=file_obj.name, path=path, content_hash=digest,
+                                               upload_id=request.data.get('upload_id') or '')
+                jobs.enqueue(job)
+        except Exception:
+            # No job will ever pick the file up
+            os.remove(path)
+            raise
+        return Response({'message': 'Upload accepted', 'job_id': job.id, 'status_url': f'/api/ingest/jobs/{job.id}/'},
+                        status=status.HTTP_202_ACCEPTED)
+
+class IngestJobView(APIView):
+    def get(self, request, pk):
+        try:
+            job = IngestJob.objects.get(pk=pk)
+        except IngestJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        if job.owner_id != request.user.id and not request.user.is_staff:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(jobs.serialize_job(job))
+
+def publish_dataset_ready(dataset, rows):
+    # Clients update from the event instead of re-fetching; big row lists are left for them to request.
+    # The working set is left to the first read, so the upload does not wait for its rows to be read back
+    include_data = rows <= settings.EVENTS_SUMMARY_MAX_ROWS
+    summary = get_dataset_summary(dataset, include_data=include_data, build_working_set=False)
+    events.publish('dataset.ready', {'summary': summary, 'data_included': include_data})
+
+def get_dataset_summary(dataset, include_data=True, build_working_set=True):
     equipment = dataset.equipment.all()
-    
-    # Calculate stats
-    avg_flowrate = equipment.aggregate(Avg('flowrate'))['flowrate__avg'] or 0
-    avg_pressure = equipment.aggregate(Avg('pressure'))['pressure__avg'] or 0
-    avg_temperature = equipment.aggregate(Avg('temperature'))['temperature__avg'] or 0
-    
-    # Type distribution
-    type_counts = equipment.values('type').annotate(count=Count('type'))
-    type_distribution = {item['type']: item['count'] for item in type_counts}
-
-    data = EquipmentSerializer(equipment, many=True).data
-
-    return {
+    with span('working_set'):
+        columns = working_set.get(dataset, build=build_working_set)
+
+    with span('summary_aggregates'):
+        if columns is not None:
+            # Vectorised over the shared, memory-mapped columns
+            rows = len(columns)
+            avg_flowrate = float(columns.flowrate.mean()) if rows else 0
+            avg_pressure = float(columns.pressure.mean()) if rows else 0
+            avg_temperature = float(columns.temperature.mean()) if rows else 0
+            type_distribution = columns.type_counts()
+            anomaly_count = int(np.count_nonzero(columns.anomaly_flags))
+        else:
+            # Calculate stats
+            avg_flowrate = equipment.aggregate(Avg('flowrate'))['flowrate__avg'] or 0
+            avg_pressure = equipment.aggregate(Avg('pressure'))['pressure__avg'] or 0
+            avg_temperature = equipment.aggregate(Avg('temperature'))['temperature__avg'] or 0
+
+            # Type distribution, grouped on the small-integer type id
+            type_counts = list(equipment.values('type_id').annotate(count=Count('id')).order_by())
+            type_names = equipment_types.names(item['type_id'] for item in type_counts)
+            type_distribution = {type_names[item['type_id']]: item['count'] for item in type_counts}
+            type_distribution = dict(sorted(type_distribution.items()))
+
+            # Served from the partial anomaly index
+            anomaly_count = equipment.filter(anomaly_flags__gt=0).count()
+        percentiles = dataset_percentiles(dataset)
+
+    summary = {
         'id': dataset.id,
         'filename': dataset.filename,
         'upload_date': dataset.upload_date,
@@ -73,8 +181,16 @@ def get_dataset_summary(dataset):
         'avg_pressure': avg_pressure,
         'avg_temperature': avg_temperature,
         'type_distribution': type_distribution,
-        'data': data
+        'anomaly_count': anomaly_count,
+        'percentiles': percentiles,
     }
+    if include_data:
+        with span('serialize'):
+            if columns is not None:
+                summary['data'] = equipment_records(columns)
+            else:
+                summary['data'] = EquipmentSerializer(equipment, many=True).data
+    return summary
 
 class SummaryView(APIView):
     def get(self, request):
@@ -109,6 +225,26 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = (AllowAny,)
     serializer_class = RegisterSerializer
 
+from rest_framework.authtoken.models import Token
+
+class LogoutView(APIView):
+    def post(self, request):
+        # Deleting the token also evicts it from the auth cache
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class TokenRotateView(APIView):
+    def post(self, request):
+        Token.objects.filter(user=request.user).delete()
+        token = Token.objects.create(user=request.user)
+        return Response({'token': token.key})
+
+class EventTicketView(APIView):
+    """Single-use ticket for ``/api/events/?ticket=``, since EventSource cannot send the token header."""
+    def post(self, request):
+        ticket = events.issue_ticket(request.user, request.auth)
+        return Response({'ticket': ticket, 'expires_in': settings.EVENTS_TICKET_TTL})
+
 class HistoryView(APIView):
     def get(self, request):
         datasets = Dataset.objects.order_by('-upload_date')[:5]
@@ -125,241 +261,278 @@ class HistoryView(APIView):
         
         return Response(response_data)
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from django.http import HttpResponse
-import matplotlib.pyplot as plt
-import io
+def serialize_anomalies(equipment):
+    results = []
+    for item in equipment:
+        row = EquipmentSerializer(item).data
+        row['Dataset'] = item.dataset_id
+        row['Anomalies'] = describe_flags(item.anomaly_flags)
+        results.append(row)
+    return results
+
+class DatasetDetailView(APIView):
+    def delete(self, request, pk):
+        try:
+            dataset = Dataset.objects.get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+        # Datasets uploaded before ownership (owner is NULL) are staff-only
+        if dataset.owner_id != request.user.id and not request.user.is_staff:
+            return Response({'error': 'Only the uploader or staff can delete this dataset'}, status=status.HTTP_403_FORBIDDEN)
 
-# Set Matplotlib backend to Agg for non-interactive server use
-plt.switch_backend('Agg')
+        # Hidden immediately; `manage.py purge_datasets` removes the rows in batches
+        retention.tombstone(Dataset.objects.filter(pk=pk))
+        events.publish('dataset.deleted', {'id': pk})
+        return Response({'message': 'Dataset deleted', 'id': pk}, status=status.HTTP_202_ACCEPTED)
 
-def create_pie_chart(data):
+class EquipmentSearchView(APIView):
     """
-    Creates a pie chart for equipment type distribution.
-    Returns a BytesIO object containing the chart image.
+    ``?q=<name>&mode=prefix|exact|contains&limit=&offset=&rows=``: matching
+    equipment grouped by dataset, newest first; see api/search.py.
     """
-    labels = list(data.keys())
-    sizes = list(data.values())
-    
-    # Lyna palette
-    colors = ['#076653', '#E3EF26', '#0C342C', '#E2FBCE', '#2E8B57', '#9ACD32']
-    
-    fig, ax = plt.subplots(figsize=(6, 4))
-    # Set cream background
-    fig.patch.set_facecolor('#FFFDEE')
-    ax.set_facecolor('#FFFDEE')
-    
-    wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%',
-                                      startangle=90, colors=colors[:len(labels)],
-                                      textprops={'color': "#06231D", 'fontsize': 10})
-    
-    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    plt.title("Equipment Type Distribution", color="#076653", fontsize=12, fontweight='bold', pad=12)
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='#FFFDEE')
-    plt.close(fig)
-    buf.seek(0)
-    return buf
-
-def create_bar_chart(avg_flow, avg_press, avg_temp):
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        mode = request.query_params.get('mode', 'prefix')
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if mode not in search.MODES:
+            return Response({'error': f'Invalid mode. Choose one of: {search.MODES}'}, status=status.HTTP_400_BAD_REQUEST)
+        if mode == 'contains' and len(query) < search.MIN_CONTAINS_LENGTH:
+            return Response({'error': f'contains needs at least {search.MIN_CONTAINS_LENGTH} characters'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+            offset = int(request.query_params.get('offset', 0))
+            rows = min(int(request.query_params.get('rows', 100)), 1000)
+        except ValueError:
+            return Response({'error': 'limit, offset and rows must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or rows < 1 or offset < 0:
+            return Response({'error': 'limit and rows must be positive and offset must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with span('search'):
+            result = search.search(query, mode, limit, offset, rows)
+        return Response({'query': query, 'mode': mode, 'limit': limit, 'offset': offset, **result})
+
+class DatasetCompareView(APIView):
     """
-    Creates a bar chart for average parameters.
-    Returns a BytesIO object containing the chart image.
+    ``/api/datasets/<a>/compare/<b>/?status=added,removed,changed&order=name|<param>&limit=&offset=``:
+    per-item and per-type deltas (b - a) joined on equipment name; see api/compare.py.
     """
-    # Create figure with custom layout and cream background
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(8, 4), gridspec_kw={'width_ratios': [2, 1]})
-    plt.subplots_adjust(wspace=0.4)
-    fig.patch.set_facecolor('#FFFDEE')
-    ax1.set_facecolor('#FFFDEE')
-    ax2.set_facecolor('#FFFDEE')
-
-    # Subplot 1: Flowrate & Temperature
-    params1 = ['Flowrate\n(L/min)', 'Temperature\n(°C)']
-    values1 = [avg_flow, avg_temp]
-    bars1 = ax1.bar(params1, values1, color='#076653', alpha=0.9, width=0.6)
-    
-    ax1.set_title('Flow & Temp Averages', color="#076653", fontsize=10, fontweight='bold', pad=12)
-    ax1.grid(axis='y', linestyle='--', alpha=0.3)
-    ax1.tick_params(axis='x', rotation=0, colors='#0C342C', labelsize=8)
-    ax1.tick_params(axis='y', colors='#0C342C', labelsize=8)
-    
-    # Add values on top
-    for bar in bars1:
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height,
-                f'{height:.1f}',
-                ha='center', va='bottom', fontsize=8, color='#06231D', fontweight='bold')
-
-    # Subplot 2: Pressure (separate scale)
-    params2 = ['Pressure\n(Bar)']
-    values2 = [avg_press]
-    bars2 = ax2.bar(params2, values2, color='#E3EF26', alpha=0.9, width=0.6)
-    
-    ax2.set_title('Avg Pressure', color="#076653", fontsize=10, fontweight='bold', pad=12)
-    ax2.grid(axis='y', linestyle='--', alpha=0.3)
-    ax2.tick_params(axis='x', colors='#0C342C', labelsize=8)
-    ax2.tick_params(axis='y', colors='#0C342C', labelsize=8)
-
-    for bar in bars2:
-        height = bar.get_height()
-        ax2.text(bar.get_x() + bar.get_width()/2., height,
-                f'{height:.1f}',
-                ha='center', va='bottom', fontsize=8, color='#06231D', fontweight='bold')
-
-    # Global styling
-    for ax in [ax1, ax2]:
-        for spine in ax.spines.values():
-            spine.set_edgecolor('#E2FBCE')
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='#FFFDEE')
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+    def get(self, request, pk, other_pk):
+        statuses = [name for name in request.query_params.get('status', '').split(',') if name]
+        if any(name not in compare.STATUSES for name in statuses):
+            return Response({'error': f'Invalid status. Choose from: {compare.STATUSES}'}, status=status.HTTP_400_BAD_REQUEST)
+        order = request.query_params.get('order', 'name')
+        if order not in compare.ORDERS:
+            return Response({'error': f'Invalid order. Choose one of: {compare.ORDERS}'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), 1000)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or offset < 0:
+            return Response({'error': 'limit must be positive and offset must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        datasets = Dataset.objects.in_bulk([pk, other_pk])
+        if pk not in datasets or other_pk not in datasets:
+            return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+        dataset_a, dataset_b = datasets[pk], datasets[other_pk]
+
+        with span('compare'):
+            result = compare.compare(dataset_a, dataset_b, statuses, order, limit, offset)
+        return Response({
+            'a': DatasetSerializer(dataset_a).data,
+            'b': DatasetSerializer(dataset_b).data,
+            'status': statuses or compare.STATUSES,
+            'order': order,
+            'limit': limit,
+            'offset': offset,
+            **result,
+        })
+
+class AnomalyListView(APIView):
+    """
+    Flagged equipment rows, newest first. Scoped to one dataset when
+    ``pk`` is given; paged with ``?limit=&offset=``.
+    """
+    def get(self, request, pk=None):
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), 1000)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or offset < 0:
+            return Response({'error': 'limit must be positive and offset must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        equipment = Equipment.objects.filter(anomaly_flags__gt=0, dataset__deleted_at__isnull=True)
+        if pk is not None:
+            if not Dataset.objects.filter(pk=pk).exists():
+                return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+            equipment = equipment.filter(dataset_id=pk)
+
+        page = equipment.order_by('-dataset_id', 'id')[offset:offset + limit]
+        return Response({
+            'count': equipment.count(),
+            'limit': limit,
+            'offset': offset,
+            'results': serialize_anomalies(page),
+        })
+
+class DatasetDistributionView(APIView):
+    def get(self, request, pk):
+        if not Dataset.objects.filter(pk=pk).exists():
+            return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(merge_distribution(ParameterSketch.objects.filter(dataset_id=pk)))
+
+class DistributionView(APIView):
+    """
+    Distribution merged across datasets, selected either by ``?ids=1,2,3``
+    or by an upload date range (``?start=&end=``, same as trends). Datasets
+    whose sketches predate a ``HISTOGRAM_BINS`` change are listed in
+    ``stale_datasets`` instead of being merged.
+    """
+    def get(self, request):
+        ids = request.query_params.get('ids')
+        try:
+            if ids:
+                try:
+                    ids = sorted({int(pk) for pk in ids.split(',') if pk})
+                except ValueError:
+                    raise ValueError('ids must be a comma-separated list of dataset ids')
+                key = ('ids', ','.join(map(str, ids)))
+                sketches = ParameterSketch.objects.filter(dataset_id__in=ids, dataset__deleted_at__isnull=True)
+            else:
+                start = request.query_params.get('start')
+                start = analytics.parse_bound(start) if start else analytics.default_start()
+                end = request.query_params.get('end')
+                end = analytics.parse_bound(end, upper=True) if end else None
+                key = ('range', start.isoformat(), end.isoformat() if end else '')
+                sketches = ParameterSketch.objects.filter(dataset__upload_date__gte=start, dataset__deleted_at__isnull=True)
+                if end is not None:
+                    sketches = sketches.filter(dataset__upload_date__lt=end)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(analytics.cached('distribution', key, lambda: merge_distribution(sketches, across_datasets=True)))
+
+class DatasetDownsampleView(APIView):
+    """
+    ``?kind=series|scatter&x=<param or index>&y=<param>&budget=<points>``;
+    see api/downsample.py for the algorithms.
+    """
+    def get(self, request, pk):
+        params = request.query_params
+        kind = params.get('kind', 'scatter')
+        x_field = params.get('x', 'index' if kind == 'series' else 'pressure')
+        y_field = params.get('y', 'temperature')
+
+        if kind not in downsample.KINDS:
+            return Response({'error': f'Invalid kind. Choose one of: {downsample.KINDS}'}, status=status.HTTP_400_BAD_REQUEST)
+        x_choices = downsample.PARAMETERS + (['index'] if kind == 'series' else [])
+        if x_field not in x_choices or y_field not in downsample.PARAMETERS:
+            return Response({'error': f'x must be one of {x_choices}, y one of {downsample.PARAMETERS}'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            budget = int(params.get('budget', 1000))
+        except ValueError:
+            return Response({'error': 'budget must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 3 <= budget <= settings.DOWNSAMPLE_MAX_POINTS:
+            return Response({'error': f'budget must be between 3 and {settings.DOWNSAMPLE_MAX_POINTS}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dataset = Dataset.objects.filter(pk=pk).first()
+        if dataset is None:
+            return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        with span('downsample'):
+            result = downsample.downsample(dataset, kind, x_field, y_field, budget)
+        return Response({'x': x_field, 'y': y_field, 'budget': budget, **result})
+
+class MetricsView(APIView):
+    # Prometheus scrapes without a user token
+    authentication_classes = []
+    permission_classes = [MetricsPermission]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class TrendsView(APIView):
+    def get(self, request):
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in analytics.BUCKETS:
+            return Response({'error': f'Invalid bucket. Choose one of: {analytics.BUCKETS}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start = request.query_params.get('start')
+            start = analytics.parse_bound(start) if start else analytics.default_start()
+            end = request.query_params.get('end')
+            end = analytics.parse_bound(end, upper=True) if end else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(analytics.get_trends(start, end, bucket))
+
+from . import export
+
+class DatasetExportView(APIView):
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'exports'
+
+    def get(self, request, pk, fmt):
+        if fmt not in export.CONTENT_TYPES:
+            return Response({'error': f'Unsupported export format. Choose one of: {list(export.CONTENT_TYPES)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            dataset = Dataset.objects.get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        stem = dataset.filename.rsplit('.', 1)[0]
+        disposition = f'attachment; filename="{stem}.{fmt}"'
+
+        if fmt == 'csv':
+            chunks = export.stream_csv(dataset)
+            gzip_ok = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+            if gzip_ok:
+                chunks = export.gzip_stream(chunks)
+            response = StreamingHttpResponse(chunks, content_type=export.CONTENT_TYPES[fmt])
+            if gzip_ok:
+                response['Content-Encoding'] = 'gzip'
+            response['Vary'] = 'Accept-Encoding'
+            response['Content-Disposition'] = disposition
+            return response
+
+        writer = export.write_parquet if fmt == 'parquet' else export.write_xlsx
+        try:
+            with admission.slot('export'):
+                sink = writer(dataset)
+        except export.ExportUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        except export.ExportTooLarge as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        response = FileResponse(sink, content_type=export.CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = disposition
+        return response
 
 class PDFReportView(APIView):
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'reports'
+
     def get(self, request, pk):
+        release = admission.acquire('report')
         try:
             dataset = Dataset.objects.get(pk=pk)
-            summary = get_dataset_summary(dataset)
+            summary = bulk_reports.report_inputs(dataset)
 
             response = HttpResponse(content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="report_{dataset.filename}.pdf"'
 
-            doc = SimpleDocTemplate(response, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-            styles = getSampleStyleSheet()
-            
-            # Custom Styles - Lyna Palette
-            primary_green = colors.HexColor('#076653') # Deep Green
-            secondary_green = colors.HexColor('#0C342C') # Forest Green
-            accent_lime = colors.HexColor('#E3EF26') # Lime
-            bg_cream = colors.HexColor('#FFFDEE') # Cream
-            bg_pale = colors.HexColor('#E2FBCE') # Pale Green
-            
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor=primary_green,
-                spaceAfter=12,
-                fontName='Helvetica-Bold'
-            )
-            
-            subtitle_style = ParagraphStyle(
-                'CustomSubtitle',
-                parent=styles['Normal'],
-                fontSize=12,
-                textColor=secondary_green,
-                spaceAfter=24
-            )
-
-            section_header_style = ParagraphStyle(
-                'SectionHeader',
-                parent=styles['Heading2'],
-                fontSize=16,
-                textColor=secondary_green,
-                spaceBefore=12,
-                spaceAfter=12,
-                borderPadding=5,
-                borderColor=primary_green,
-                borderWidth=0,
-                borderBottomWidth=1
-            )
-
-            elements = []
-
-            # 1. Header
-            elements.append(Paragraph("Chemical Equipment Visualizer", subtitle_style))
-            elements.append(Paragraph(f"Analysis Report: {dataset.filename}", title_style))
-            elements.append(Paragraph(f"Generated on: {dataset.upload_date.strftime('%Y-%m-%d %H:%M')}", subtitle_style))
-            elements.append(Spacer(1, 12))
-
-            # 2. Charts Section
-            elements.append(Paragraph("Visual Analysis", section_header_style))
-            
-            # Generate Charts
-            pie_buf = create_pie_chart(summary['type_distribution'])
-            bar_buf = create_bar_chart(summary['avg_flowrate'], summary['avg_pressure'], summary['avg_temperature'])
-            
-            # Add Charts to PDF (Side by Side if possible, or stacked)
-            # Stacked is safer for layout
-            img_pie = RLImage(pie_buf, width=4*inch, height=2.6*inch)
-            img_bar = RLImage(bar_buf, width=5.5*inch, height=2.75*inch)
-            
-            # Table for visual layout of charts
-            chart_table = Table([[img_pie], [img_bar]], colWidths=[6*inch])
-            chart_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 12),
-            ]))
-            elements.append(chart_table)
-            elements.append(Spacer(1, 12))
-
-            # 3. Summary Statistics Table
-            elements.append(Paragraph("Key Metrics", section_header_style))
-            stats_data = [
-                ['Metric', 'Value'],
-                ['Total Equipment Count', f"{len(summary['data'])}"],
-                ['Avg Flowrate', f"{summary['avg_flowrate']:.2f}"],
-                ['Avg Pressure', f"{summary['avg_pressure']:.2f}"],
-                ['Avg Temperature', f"{summary['avg_temperature']:.2f}"]
-            ]
-            
-            t_stats = Table(stats_data, colWidths=[3*inch, 2*inch])
-            t_stats.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), primary_green),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('TOPPADDING', (0, 0), (-1, 0), 10),
-                ('BACKGROUND', (0, 1), (-1, -1), bg_cream),
-                ('GRID', (0, 0), (-1, -1), 1, colors.white),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [bg_cream, bg_pale])
-            ]))
-            elements.append(t_stats)
-            elements.append(Spacer(1, 24))
-
-            # 4. Detailed Data Table (Top 50)
-            elements.append(Paragraph("Detailed Equipment Data (Top 50)", section_header_style))
-            
-            table_header = ['Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-            table_data = [table_header]
-            
-            for item in summary['data'][:50]:
-                 table_data.append([
-                     item['Equipment Name'][:25] + '...' if len(item['Equipment Name']) > 25 else item['Equipment Name'], 
-                     item['Type'], 
-                     f"{item['Flowrate']:.1f}", 
-                     f"{item['Pressure']:.1f}", 
-                     f"{item['Temperature']:.1f}"
-                 ])
-            
-            t_data = Table(table_data, colWidths=[2.5*inch, 1.2*inch, 0.9*inch, 0.9*inch, 1*inch], repeatRows=1)
-            t_data.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), primary_green),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 0), (-1, 0), 8),
-                ('GRID', (0, 0), (-1, -1), 0.5, bg_pale),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [bg_cream, bg_pale]),
-                ('ALIGN', (2, 1), (-1, -1), 'RIGHT'), # Align numbers to right
-            ]))
-            elements.append(t_data)
-
-            # Build PDF
-            doc.build(elements)
+            with span('report_engine'):
+                from .reports import build_pdf_report
+            charts = bulk_reports.cached_charts(dataset.pk)
+            if charts is None:
+                charts = build_pdf_report(dataset, summary, response)
+                bulk_reports.store_charts(dataset.pk, charts)
+            else:
+                build_pdf_report(dataset, summary, response, charts)
             return response
             
         except Dataset.DoesNotExist:
@@ -370,3 +543,58 @@ class PDFReportView(APIView):
             import traceback
             traceback.print_exc()
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            release()
+
+class BulkReportView(APIView):
+    """
+    ZIP of PDF reports for ``?ids=1,2,3`` or an upload date range
+    (``?start=&end=``), built in parallel and streamed as each one finishes.
+    """
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'bulk_reports'
+
+    def get(self, request):
+        ids = request.query_params.get('ids')
+        try:
+            if ids:
+                try:
+                    ids = {int(pk) for pk in ids.split(',') if pk}
+                except ValueError:
+                    raise ValueError('ids must be a comma-separated list of dataset ids')
+                datasets = Dataset.objects.filter(pk__in=ids)
+            else:
+                start = request.query_params.get('start')
+                if not start:
+                    raise ValueError('Pass ids or a start date')
+                datasets = Dataset.objects.filter(upload_date__gte=analytics.parse_bound(start))
+                end = request.query_params.get('end')
+                if end:
+                    datasets = datasets.filter(upload_date__lt=analytics.parse_bound(end, upper=True))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        datasets = list(datasets.order_by('upload_date')[:settings.REPORT_BULK_MAX + 1])
+        if not datasets:
+            return Response({'error': 'No matching datasets'}, status=status.HTTP_404_NOT_FOUND)
+        if len(datasets) > settings.REPORT_BULK_MAX:
+            return Response({'error': f'At most {settings.REPORT_BULK_MAX} reports per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The slot is held until the whole ZIP has been sent
+        release = admission.acquire('bulk_report')
+        try:
+            # Waits for the first finished report, so failing fast still gets an error status
+            chunks = bulk_reports.Started(bulk_reports.stream_zip(datasets))
+        except bulk_reports.BrokenProcessPool:
+            release()
+            return Response({'error': 'Report workers crashed, please retry'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except bulk_reports.ReportsFailed as e:
+            release()
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except BaseException:
+            release()
+            raise
+        body = admission.HeldWhileStreaming(chunks, release)
+        response = StreamingHttpResponse(body, content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="reports.zip"'
+        return response
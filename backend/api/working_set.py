@@ -0,0 +1,303 @@
+"""
+Shared, memory-mapped working set of hot datasets.
+
+Each web worker used to load a popular dataset's rows from the database and
+build its own Python objects on every summary, chart, downsample or export.
+Instead, the first worker to need a dataset writes its columns once, in row
+(id) order, as ``.npy`` files under ``WORKING_SET_DIR``:
+
+* ``flowrate`` / ``pressure`` / ``temperature`` (float64), ``anomaly_flags``
+* ``name_codes`` / ``type_codes`` into the ``names`` / ``types`` vocabularies
+  (dictionary encoding; the vocabularies are sorted)
+
+Every worker then opens them with ``mmap_mode='r'``: the arrays are
+read-only, zero-copy views of the same page-cache pages, so N workers hold
+one copy. ``WORKING_SET_DIR`` defaults to tmpfs (``/dev/shm``) where available.
+
+Recency is the entry directory's mtime, so eviction is LRU across all
+workers: whoever adds an entry removes the least recently used ones until
+the total fits ``WORKING_SET_BUDGET`` bytes (shared by all databases). Removing files under a worker
+that still maps them is safe; the mapping stays valid until it is dropped.
+Datasets that would not fit the budget on their own are not cached, and
+``get()`` returns None so callers fall back to querying the database.
+
+Entries are keyed by dataset id and upload time, under a directory per
+database, so a recreated database never sees stale files. Tests and
+benchmarks point ``WORKING_SET_DIR`` at a scratch directory of their own
+(backend/test_runner.py), so they neither use up nor evict the live budget. Datasets are immutable after upload apart from their anomaly flags,
+so ``detect_anomalies`` calls ``evict()``, and so does
+``retention.tombstone()`` for deleted datasets.
+
+Entries are built on the first read that wants them, never during an
+upload: the upload's own ``dataset.ready`` summary passes ``build=False``
+and falls back to SQL aggregates, so the uploader does not wait for its
+rows to be read back.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from . import equipment_types
+from .models import Equipment
+
+NUMERIC_COLUMNS = ['flowrate', 'pressure', 'temperature', 'anomaly_flags']
+COLUMNS = NUMERIC_COLUMNS + ['name_codes', 'names', 'type_codes', 'types']
+BUILD_BATCH_SIZE = 20000
+# Bytes per row of the numeric columns and codes, used to skip oversized datasets before loading them
+ROW_BYTES = 8 * 3 + 4 + 4 + 2
+# Recency is written at most this often per entry and process
+TOUCH_INTERVAL = 1.0
+# Entries remembered as too big for the budget, so their rows are not counted again
+OVERSIZED_MAX = 1024
+
+# Per process, keyed by entry path: mappings and when recency was last written
+# (same lifetime: dropped once the entry is gone), and known oversized entries
+_open = {}
+_touched = {}
+_oversized = OrderedDict()
+_lock = threading.Lock()
+
+
+class WorkingSet:
+    """Read-only columns of one dataset; all arrays are views of the mapped files."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.flowrate = columns['flowrate']
+        self.pressure = columns['pressure']
+        self.temperature = columns['temperature']
+        self.anomaly_flags = columns['anomaly_flags']
+        self.name_codes = columns['name_codes']
+        self.type_codes = columns['type_codes']
+
+    def __len__(self):
+        return len(self.flowrate)
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def names(self, start=0, stop=None):
+        return self.columns['names'][self.name_codes[start:stop]]
+
+    def types(self, start=0, stop=None):
+        return self.columns['types'][self.type_codes[start:stop]]
+
+    def type_counts(self):
+        counts = np.bincount(self.type_codes, minlength=len(self.columns['types']))
+        return {kind: int(count) for kind, count in zip(self.columns['types'].tolist(), counts.tolist()) if count}
+
+    def rows(self, start=0, stop=None):
+        """``(name, type, flowrate, pressure, temperature)`` tuples for rows ``start:stop``."""
+        return zip(
+            self.names(start, stop).tolist(), self.types(start, stop).tolist(),
+            self.flowrate[start:stop].tolist(), self.pressure[start:stop].tolist(),
+            self.temperature[start:stop].tolist(),
+        )
+
+
+def _root():
+    # One directory per database
+    name = str(connection.settings_dict['NAME'])
+    return os.path.join(str(settings.WORKING_SET_DIR), hashlib.sha1(name.encode()).hexdigest()[:12])
+
+
+def _entry_name(dataset):
+    return f'{dataset.pk}-{int(dataset.upload_date.timestamp() * 1e6)}'
+
+
+def _entry_size(path):
+    try:
+        return sum(entry.stat().st_size for entry in os.scandir(path))
+    except FileNotFoundError:
+        return 0
+
+
+def _touch(path):
+    now = time.monotonic()
+    if now - _touched.get(path, 0) >= TOUCH_INTERVAL:
+        _touched[path] = now
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+
+def _load(path):
+    columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+    return WorkingSet(columns)
+
+
+def _encode(values):
+    vocabulary, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+    return vocabulary, codes
+
+
+def _build(dataset, budget=None):
+    """Loads the dataset's columns from the database; None when they exceed ``budget``."""
+    if budget is not None and dataset.equipment.count() * ROW_BYTES > budget:
+        return None
+
+    names, types = [], []
+    numeric = {name: [] for name in NUMERIC_COLUMNS}
+    rows = (
+        Equipment.objects.filter(dataset_id=dataset.pk).order_by('id')
+        .values_list('name', 'type_id', *NUMERIC_COLUMNS)
+        .iterator(chunk_size=BUILD_BATCH_SIZE)
+    )
+    for name, type_id, *values in rows:
+        names.append(name)
+        types.append(type_id)
+        for column, value in zip(NUMERIC_COLUMNS, values):
+            numeric[column].append(value)
+
+    name_vocabulary, name_codes = _encode(names)
+    type_names = equipment_types.names(set(types))
+    type_vocabulary, type_codes = _encode([type_names[type_id] for type_id in types])
+    columns = {
+        'flowrate': np.array(numeric['flowrate'], dtype=np.float64),
+        'pressure': np.array(numeric['pressure'], dtype=np.float64),
+        'temperature': np.array(numeric['temperature'], dtype=np.float64),
+        'anomaly_flags': np.array(numeric['anomaly_flags'], dtype=np.uint32),
+        'name_codes': name_codes.astype(np.int32),
+        'names': name_vocabulary,
+        'type_codes': type_codes.astype(np.int16),
+        'types': type_vocabulary,
+    }
+    working_set = WorkingSet(columns)
+    return working_set if budget is None or working_set.nbytes <= budget else None
+
+
+def _store(root, name, working_set):
+    """Publishes an entry atomically; returns its path."""
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, name)
+    staging = tempfile.mkdtemp(prefix='.build-', dir=root)
+    try:
+        for column, values in working_set.columns.items():
+            np.save(os.path.join(staging, f'{column}.npy'), values)
+        os.rename(staging, path)
+    except OSError:
+        # Another worker published the same entry first
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+    _evict_to_budget(keep=path)
+    return path
+
+
+def _evict_to_budget(keep):
+    # The budget covers every database's entries
+    entries = []
+    for root in os.scandir(str(settings.WORKING_SET_DIR)):
+        if not root.is_dir():
+            continue
+        for entry in os.scandir(root.path):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path, _entry_size(entry.path)))
+                except FileNotFoundError:
+                    continue
+    total = sum(size for _, _, size in entries)
+    for _, path, size in sorted(entries):
+        if total <= settings.WORKING_SET_BUDGET:
+            break
+        if path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def _forget(path):
+    # Caller holds _lock
+    _open.pop(path, None)
+    _touched.pop(path, None)
+    _oversized.pop(path, None)
+
+
+def get(dataset, build=True):
+    """
+    Mapped columns of ``dataset``, loading them on first use; None if the
+    dataset is not cacheable, or with ``build=False`` not loaded yet.
+    """
+    if not settings.WORKING_SET_BUDGET:
+        return None
+    root = _root()
+    path = os.path.join(root, _entry_name(dataset))
+
+    with _lock:
+        if path in _oversized:
+            return None
+        cached = _open.get(path)
+    try:
+        inode = os.stat(path).st_ino
+    except FileNotFoundError:
+        inode = None
+    if cached is not None and cached[0] == inode:
+        _touch(path)
+        return cached[1]
+
+    working_set = None
+    if inode is not None:
+        try:
+            working_set = _load(path)
+        except (OSError, ValueError):
+            # Evicted or replaced between the stat and the load
+            working_set = None
+    if working_set is None:
+        if not build:
+            return None
+        built = _build(dataset, settings.WORKING_SET_BUDGET)
+        if built is None:
+            with _lock:
+                _oversized[path] = True
+                if len(_oversized) > OVERSIZED_MAX:
+                    _oversized.popitem(last=False)
+            return None
+        _store(root, _entry_name(dataset), built)
+        try:
+            working_set = _load(path)
+            inode = os.stat(path).st_ino
+        except (OSError, ValueError):
+            # Evicted straight away by a concurrent writer; serve this request from memory
+            return built
+
+    _touch(path)
+    with _lock:
+        # Mappings of entries other workers evicted would keep their memory alive
+        for stale in [key for key in _open if not os.path.isdir(key)]:
+            _forget(stale)
+        _open[path] = (inode, working_set)
+    return working_set
+
+
+def load(dataset):
+    """Like ``get()``, but datasets it will not cache are loaded into this process's memory instead."""
+    working_set = get(dataset)
+    return working_set if working_set is not None else _build(dataset)
+
+
+def evict(dataset_ids):
+    """Drops the entries of ``dataset_ids`` for every worker."""
+    root = _root()
+    prefixes = tuple(os.path.join(root, f'{pk}-') for pk in dataset_ids)
+    if not prefixes:
+        return
+    with _lock:
+        for path in [path for path in {*_open, *_touched, *_oversized} if path.startswith(prefixes)]:
+            _forget(path)
+    if not os.path.isdir(root):
+        return
+    for entry in os.scandir(root):
+        if entry.path.startswith(prefixes):
+            shutil.rmtree(entry.path, ignore_errors=True)
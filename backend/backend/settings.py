@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,14 +40,155 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Per-user rates for the views that set a throttle_scope (see api/admission.py).
+    # Counted in the shared cache below, so they apply across all workers.
+    'DEFAULT_THROTTLE_RATES': {
+        'uploads': '60/hour',
+        'reports': '120/hour',
+        'bulk_reports': '10/hour',
+        'exports': '120/hour',
+    },
+}
+
+# Shared by every worker process: token revocations, throttle counters, the
+# analytics generation and cached reports, comparisons and downsampled data.
+# The file cache is shared by the workers of one host; set REDIS_URL (needs the
+# `redis` package) to share it across hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Validated auth tokens: shared-cache TTL, per-process TTL and per-process size.
+# Revoked tokens stop working in every worker within TOKEN_CACHE_LOCAL_TTL.
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_LOCAL_TTL = 30
+TOKEN_CACHE_MAX_SIZE = 10000
+
+# Cross-dataset analytics results are cached until the next upload (in any worker) or this timeout
+ANALYTICS_CACHE_TIMEOUT = 300
+
+# Rows failing validation are skipped; at most this many are itemised in the response
+UPLOAD_MAX_REPORTED_ERRORS = 100
+
+# Anomaly detection at upload time (see api/anomalies.py).
+# Per-type (min, max) limits; types not listed fall back to 'default'.
+EQUIPMENT_LIMITS = {
+    'default': {'flowrate': (0, 5000), 'pressure': (0, 100), 'temperature': (-50, 500)},
+    'Pump': {'flowrate': (0, 1000), 'pressure': (0, 20), 'temperature': (-20, 120)},
+    'Reactor': {'flowrate': (0, 3000), 'pressure': (0, 50), 'temperature': (0, 400)},
+    'Valve': {'flowrate': (0, 2000), 'pressure': (0, 40), 'temperature': (-20, 200)},
+    'Storage Tank': {'flowrate': (0, 1000), 'pressure': (0, 10), 'temperature': (-20, 100)},
+}
+ANOMALY_ZSCORE_THRESHOLD = 3.0
+ANOMALY_IQR_FACTOR = 1.5
+ANOMALY_MIN_GROUP_SIZE = 4
+
+# Histogram layout per parameter: (low, high, bins). Values outside the range
+# land in underflow/overflow bins. Changing this requires `manage.py build_sketches`.
+HISTOGRAM_BINS = {
+    'flowrate': (0, 5000, 250),
+    'pressure': (0, 100, 200),
+    'temperature': (-50, 500, 275),
 }
 
+# Retention: datasets older than this many days, or beyond the newest N per
+# uploader, are tombstoned by `manage.py purge_datasets`. None disables a rule.
+DATASET_RETENTION_DAYS = None
+DATASET_RETENTION_MAX_PER_USER = None
+# Equipment rows deleted per transaction when purging tombstoned datasets
+RETENTION_PURGE_BATCH_SIZE = 5000
+
+# Upload rows inserted per bulk_create call; progress events are sent per batch
+INGEST_BATCH_SIZE = 20000
+
+# Uploads posted with ?async=1 are spooled here and answered with 202 (see api/jobs.py).
+# 'thread' runs them on INGEST_WORKERS threads in the web process; 'worker' leaves
+# them to `manage.py ingest_worker`. Running jobs older than INGEST_JOB_TIMEOUT
+# seconds are assumed dead and requeued by the worker. With 'thread', jobs left
+# queued or running by a restart are only picked up by `manage.py ingest_worker`.
+INGEST_SPOOL_DIR = BASE_DIR / 'spool'
+INGEST_ASYNC_BACKEND = 'thread'
+INGEST_WORKERS = 2
+INGEST_JOB_TIMEOUT = 3600
+
+# Reports: compact summaries and chart images are cached per dataset for
+# REPORT_CACHE_TIMEOUT seconds; bulk exports render on REPORT_WORKERS processes.
+REPORT_CACHE_TIMEOUT = 24 * 3600
+REPORT_WORKERS = 4
+REPORT_BULK_MAX = 100
+
+# Hot datasets' columns are memory-mapped from WORKING_SET_DIR and shared by all
+# worker processes (see api/working_set.py); least recently used entries are
+# removed beyond WORKING_SET_BUDGET bytes. 0 disables it.
+WORKING_SET_DIR = Path('/dev/shm/equipment-working-set') if Path('/dev/shm').is_dir() else BASE_DIR / 'working_set'
+WORKING_SET_BUDGET = 512 * 1024 * 1024
+
+# Tests and benchmarks use scratch working set, spool and cache directories (backend/test_runner.py)
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+
+# Admission control: concurrent heavy requests per process and pool. A request
+# waits up to ADMISSION_QUEUE_TIMEOUT seconds for a slot, then gets a 503 with
+# Retry-After: ADMISSION_RETRY_AFTER. Keep the wait short so shedding is fast.
+ADMISSION_LIMITS = {
+    'upload': 2,
+    'report': 2,
+    'bulk_report': 1,
+    'export': 4,
+}
+ADMISSION_QUEUE_TIMEOUT = 0.05
+ADMISSION_RETRY_AFTER = 5
+
+# Server-sent events (see api/events.py). The in-process broadcaster only
+# reaches clients of the same worker process.
+EVENTS_BROADCASTER = 'api.events.InProcessBroadcaster'
+EVENTS_REPLAY_SIZE = 100
+EVENTS_QUEUE_SIZE = 100
+EVENTS_KEEPALIVE = 15
+EVENTS_RETRY_MS = 3000
+# Browser clients open the stream with a single-use ticket that expires after
+# EVENTS_TICKET_TTL seconds; open streams end within EVENTS_AUTH_RECHECK seconds
+# (plus one keepalive) of their token being revoked.
+EVENTS_TICKET_TTL = 30
+EVENTS_AUTH_RECHECK = 60
+# dataset.ready events inline the summary's rows only up to this many
+EVENTS_SUMMARY_MAX_ROWS = 5000
+
+# Per-phase timings on every response (see api/instrumentation.py)
+SERVER_TIMING_ENABLED = True
+# /api/metrics/ is open to `Authorization: Bearer <METRICS_TOKEN>` and to these
+# addresses. Keep loopback out of it when a reverse proxy runs on the same host:
+# every proxied request would come from 127.0.0.1.
+METRICS_ALLOWED_IPS = []
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Downsampled chart data: largest accepted point budget and cache lifetime (seconds)
+DOWNSAMPLE_MAX_POINTS = 20000
+DOWNSAMPLE_CACHE_TIMEOUT = 3600
+
+# Parquet and XLSX exports are built in a temporary file inside the request, so
+# datasets above this many rows are refused (413); CSV export streams and has no cap.
+# XLSX is further capped at the sheet limit of 1,048,575 data rows.
+EXPORT_MAX_ROWS = 1000000
+
+# Dataset comparisons (api/compare.py) are cached per pair of datasets
+COMPARE_CACHE_TIMEOUT = 24 * 3600
+
 MIDDLEWARE = [
+    'api.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
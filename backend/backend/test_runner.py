@@ -0,0 +1,42 @@
+"""
+Keeps test and benchmark runs out of the live instance's files.
+
+The working set under ``WORKING_SET_DIR`` is shared by every process on the
+host and its LRU budget counts all entries in it, so throwaway runs use a
+scratch directory next to it (same filesystem, usually tmpfs) that is
+removed when they finish. The upload spool and the file cache, which
+the live workers share, move there as well.
+"""
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def scratch_storage():
+    parent = Path(settings.WORKING_SET_DIR).parent
+    parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='equipment-scratch-', dir=parent) as scratch:
+        scratch = Path(scratch)
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': scratch / 'cache',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }}
+        with override_settings(WORKING_SET_DIR=scratch / 'working_set', INGEST_SPOOL_DIR=scratch / 'spool', CACHES=caches):
+            yield scratch
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = scratch_storage()
+        self._scratch.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._scratch.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,86 @@
+"""
+Admission control under a report storm: latency of a cheap read
+(``/api/summary/``) while ``--storm`` threads keep requesting PDF reports
+with the report cache disabled, first with unlimited report slots, then
+with the configured ``ADMISSION_LIMITS``:
+
+    python -m benchmarks.admission --rows 20000 --storm 8 --duration 10
+
+Throttle rates are lifted for the run so only admission control sheds load.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+# Sets up Django, so it must come before any model imports
+from .common import api_client, seed_dataset, throwaway_database, unthrottled
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+
+from api import admission
+
+UNLIMITED = {pool: 10 ** 6 for pool in settings.ADMISSION_LIMITS}
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def storm(client, url, stop, statuses):
+    while not stop.is_set():
+        response = client.get(url)
+        statuses.append(response.status_code)
+    connection.close()
+
+
+def run(client, dataset_id, limits, threads, duration):
+    admission._semaphores.clear()
+    stop = threading.Event()
+    statuses = []
+    latencies = []
+    with override_settings(ADMISSION_LIMITS=limits, REPORT_CACHE_TIMEOUT=0):
+        workers = [threading.Thread(target=storm, args=(client, f'/api/report/{dataset_id}/', stop, statuses))
+                   for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        time.sleep(0.5)
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.get('/api/summary/')
+            assert response.status_code == 200, response.status_code
+            latencies.append(time.perf_counter() - start)
+        stop.set()
+        for worker in workers:
+            worker.join()
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--storm', type=int, default=8, help='concurrent report requests')
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    with throwaway_database(), unthrottled():
+        client = api_client()
+        dataset = seed_dataset(args.rows)
+        client.get('/api/summary/')
+        client.get(f'/api/report/{dataset.pk}/')  # import Matplotlib/ReportLab up front
+
+        print(f"{'admission':<12}{'summary p50':>13}{'p95':>10}{'requests':>10}{'reports':>9}{'503s':>7}")
+        for name, limits, threads in [('idle', UNLIMITED, 0), ('off', UNLIMITED, args.storm),
+                                      ('on', settings.ADMISSION_LIMITS, args.storm)]:
+            latencies, statuses = run(client, dataset.pk, limits, threads, args.duration)
+            print(f'{name:<12}{statistics.median(latencies) * 1000:>11.1f}ms'
+                  f'{percentile(latencies, 0.95) * 1000:>8.1f}ms{len(latencies):>10}'
+                  f'{statuses.count(200):>9}{statuses.count(503):>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Authenticated read throughput: DRF TokenAuthentication vs. the cached backend.
+
+Drives a trivial authenticated view through the full request/auth stack so
+the difference is the per-request authentication cost:
+
+    python -m benchmarks.auth_throughput --requests 5000
+"""
+import argparse
+import time
+
+# Sets up Django, so it must come before any model imports
+from .common import api_client, throwaway_database
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.authentication import CachedTokenAuthentication
+
+
+class Ping(APIView):
+    def get(self, request):
+        return Response({'user': request.user.pk})
+
+
+def run(auth_class, token, requests):
+    view = Ping.as_view(authentication_classes=[auth_class])
+    factory = RequestFactory()
+    request = factory.get('/ping/', HTTP_AUTHORIZATION=f'Token {token}')
+    view(request)  # warm caches
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = view(factory.get('/ping/', HTTP_AUTHORIZATION=f'Token {token}'))
+            assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, len(queries) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with throwaway_database():
+        api_client()
+        token = Token.objects.get().key
+        for name, auth_class in [('TokenAuthentication', TokenAuthentication),
+                                 ('CachedTokenAuthentication', CachedTokenAuthentication)]:
+            rate, per_request = run(auth_class, token, args.requests)
+            print(f"{name:<26} {rate:10,.0f} req/s   {per_request:.2f} queries/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Shared helpers for the backend benchmarks.
+
+Benchmarks run against a throwaway test database, never db.sqlite3, with
+scratch working set and spool directories, and are started from the backend folder, e.g. ``python -m benchmarks.export_throughput``.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+from rest_framework.throttling import ScopedRateThrottle
+
+from api import equipment_types
+from backend.test_runner import scratch_storage
+from api.models import Dataset, Equipment
+
+from .synthetic import iter_rows
+
+
+@contextmanager
+def throwaway_database():
+    setup_test_environment()
+    # Entered first: creating the test database already opens the configured caches
+    with scratch_storage():
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+
+
+@contextmanager
+def unthrottled():
+    """Lifts the per-user rates, so repeated benchmark requests are never answered 429."""
+    rates = {scope: '1000000/hour' for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']}
+    with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', rates):
+        yield
+
+
+def api_client(username='bench'):
+    user = User.objects.create_user(username, f'{username}@example.com', 'bench-password')
+    token = Token.objects.create(user=user)
+    return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+def seed_dataset(rows, filename='bench.csv', seed=0, batch_size=10000):
+    # Inserts rows directly, skipping the upload pipeline
+    dataset = Dataset.objects.create(filename=filename)
+    type_ids = {}
+    batch = []
+    for name, kind, flowrate, pressure, temperature in iter_rows(rows, seed):
+        if kind not in type_ids:
+            type_ids.update(equipment_types.ids_for([kind]))
+        batch.append(Equipment(
+            dataset=dataset, name=name, type_id=type_ids[kind],
+            flowrate=flowrate, pressure=pressure, temperature=temperature,
+        ))
+        if len(batch) >= batch_size:
+            Equipment.objects.bulk_create(batch)
+            batch = []
+    Equipment.objects.bulk_create(batch)
+    return dataset
+
+
+@contextmanager
+def timer(results, key):
+    start = time.perf_counter()
+    yield
+    results.setdefault(key, []).append(time.perf_counter() - start)
+
+
+def describe(samples):
+    return {
+        'runs': len(samples),
+        'median_s': statistics.median(samples),
+        'min_s': min(samples),
+        'max_s': max(samples),
+    }
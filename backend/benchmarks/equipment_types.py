@@ -0,0 +1,115 @@
+"""
+Equipment type encoding: ``api_equipment`` with the small-integer
+``type_id`` against a copy in the previous layout (type name on every row,
+same indexes). Reports table and index size from SQLite's ``dbstat`` and
+the latency of the type group-bys behind the summary and trends:
+
+    python -m benchmarks.equipment_types --rows 5000000 --datasets 50
+"""
+import argparse
+import statistics
+import time
+
+from . import common
+
+from django.db import connection
+from django.db.models import Count
+
+from api import equipment_types
+from api.models import Equipment
+
+LEGACY_TABLE = 'bench_equipment_text'
+LEGACY_SCHEMA = [
+    f'CREATE TABLE {LEGACY_TABLE} ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "name" varchar(255) NOT NULL, '
+    '"type" varchar(100) NOT NULL, "flowrate" real NOT NULL, "pressure" real NOT NULL, "temperature" real NOT NULL, '
+    '"dataset_id" bigint NOT NULL, "anomaly_flags" integer unsigned NOT NULL)',
+    f'INSERT INTO {LEGACY_TABLE} (id, name, type, flowrate, pressure, temperature, dataset_id, anomaly_flags) '
+    'SELECT e.id, e.name, t.name, e.flowrate, e.pressure, e.temperature, e.dataset_id, e.anomaly_flags '
+    'FROM api_equipment e JOIN api_equipmenttype t ON t.id = e.type_id',
+    f'CREATE INDEX bench_text_dataset_idx ON {LEGACY_TABLE} (dataset_id)',
+    f'CREATE INDEX bench_text_anomaly_idx ON {LEGACY_TABLE} (dataset_id, anomaly_flags) WHERE anomaly_flags > 0',
+    f'CREATE INDEX bench_text_name_idx ON {LEGACY_TABLE} (name, dataset_id)',
+    # The copy's indexes are built in one pass; rebuild the originals so sizes compare
+    'REINDEX api_equipment',
+]
+
+
+def size(cursor, table):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s", [table])
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute('SELECT name, SUM(pgsize) FROM dbstat WHERE name IN (%s) GROUP BY name'
+                   % ', '.join(['%s'] * (len(indexes) + 1)), [table, *indexes])
+    sizes = dict(cursor.fetchall())
+    return sizes.pop(table), sum(sizes.values())
+
+
+def bench(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def query(sql, params=()):
+    def run():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    return run
+
+
+def orm_distribution(dataset_id):
+    # What get_dataset_summary does without the working set
+    counts = list(Equipment.objects.filter(dataset_id=dataset_id).values('type_id').annotate(count=Count('id')).order_by())
+    names = equipment_types.names(row['type_id'] for row in counts)
+    return {names[row['type_id']]: row['count'] for row in counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--datasets', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with common.throwaway_database():
+        start = time.perf_counter()
+        per_dataset = args.rows // args.datasets
+        datasets = [common.seed_dataset(per_dataset, f'types_{idx}.csv', seed=idx, batch_size=50000)
+                    for idx in range(args.datasets)]
+        with connection.cursor() as cursor:
+            for statement in LEGACY_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute('ANALYZE')
+        print(f'Seeded {per_dataset * args.datasets} rows in {time.perf_counter() - start:.1f}s')
+
+        with connection.cursor() as cursor:
+            print(f"{'layout':<12}{'table MiB':>11}{'indexes MiB':>13}")
+            for name, table in [('type text', LEGACY_TABLE), ('type_id', 'api_equipment')]:
+                table_bytes, index_bytes = size(cursor, table)
+                print(f'{name:<12}{table_bytes / 2 ** 20:>11.1f}{index_bytes / 2 ** 20:>13.1f}')
+
+        dataset_id = datasets[len(datasets) // 2].pk
+        cases = [
+            ('one dataset',
+             query(f'SELECT type, COUNT(*) FROM {LEGACY_TABLE} WHERE dataset_id = %s GROUP BY type', [dataset_id]),
+             query('SELECT type_id, COUNT(*) FROM api_equipment WHERE dataset_id = %s GROUP BY type_id', [dataset_id])),
+            ('all rows',
+             query(f'SELECT type, COUNT(*), AVG(flowrate) FROM {LEGACY_TABLE} GROUP BY type'),
+             query('SELECT type_id, COUNT(*), AVG(flowrate) FROM api_equipment GROUP BY type_id')),
+            ('per dataset',
+             query(f'SELECT dataset_id, type, COUNT(*), AVG(flowrate) FROM {LEGACY_TABLE} GROUP BY dataset_id, type'),
+             query('SELECT dataset_id, type_id, COUNT(*), AVG(flowrate) FROM api_equipment GROUP BY dataset_id, type_id')),
+        ]
+        print(f"{'group-by':<14}{'type text':>12}{'type_id':>12}{'speedup':>9}")
+        for name, legacy, encoded in cases:
+            legacy_s, encoded_s = bench(legacy, args.repeat), bench(encoded, args.repeat)
+            print(f'{name:<14}{legacy_s * 1000:>10.1f}ms{encoded_s * 1000:>10.1f}ms{legacy_s / encoded_s:>8.1f}x')
+        orm_s = bench(lambda: orm_distribution(dataset_id), args.repeat)
+        print(f"{'summary ORM':<14}{'':>12}{orm_s * 1000:>10.1f}ms  (type_id group-by + cached names)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Export throughput benchmark.
+
+Seeds a dataset of ``--rows`` rows and streams it through every export
+format, reporting rows/s, output size and peak Python heap during the export:
+
+    python -m benchmarks.export_throughput --rows 200000
+"""
+import argparse
+import tracemalloc
+
+from .common import api_client, describe, seed_dataset, throwaway_database, timer
+
+
+def consume(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--formats', default='csv,csv.gz,parquet,xlsx')
+    args = parser.parse_args()
+
+    with throwaway_database():
+        client = api_client()
+        dataset = seed_dataset(args.rows)
+
+        for fmt in args.formats.split(','):
+            ext, _, encoding = fmt.partition('.')
+            url = f'/api/datasets/{dataset.pk}/export.{ext}'
+            headers = {'HTTP_ACCEPT_ENCODING': 'gzip'} if encoding == 'gz' else {}
+
+            results = {}
+            size = 0
+            for _ in range(args.repeat):
+                with timer(results, fmt):
+                    response = client.get(url, **headers)
+                    size = consume(response)
+            if response.status_code != 200:
+                print(f"{fmt:<8} skipped ({response.status_code}: {response.content.decode()})")
+                continue
+
+            tracemalloc.start()
+            consume(client.get(url, **headers))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            stats = describe(results[fmt])
+            print(f"{fmt:<8} {args.rows / stats['median_s']:>12,.0f} rows/s   "
+                  f"{size / 1e6:8.2f} MB   peak heap {peak / 1e6:6.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Equipment name search benchmark: api.search (B-tree range for exact/prefix,
+FTS5 trigram for substrings) against the unindexed scans it replaces.
+
+Seeds ``--rows`` equipment rows split over ``--datasets`` datasets, then
+times each query mode and prints the SQLite query plan of the match:
+
+    python -m benchmarks.name_search --rows 10000000 --datasets 100
+"""
+import argparse
+import statistics
+import time
+
+from . import common
+
+from django.db import connection
+
+from api import search
+from api.models import Equipment
+
+QUERIES = [
+    ('exact', 'Pump-101'),
+    ('prefix', 'Pump-10'),
+    ('contains', 'mp-1234'),
+]
+
+
+def scan(query, mode):
+    # What a search cost before: LIKE never uses an index here
+    equipment = Equipment.objects.all()
+    if mode == 'exact':
+        return equipment.filter(name__iexact=query)
+    if mode == 'prefix':
+        return equipment.filter(name__startswith=query)
+    return equipment.filter(name__icontains=query)
+
+
+def bench(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--datasets', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with common.throwaway_database():
+        start = time.perf_counter()
+        per_dataset = args.rows // args.datasets
+        for idx in range(args.datasets):
+            common.seed_dataset(per_dataset, f'search_{idx}.csv', seed=idx, batch_size=50000)
+        print(f'Seeded {per_dataset * args.datasets} rows in {time.perf_counter() - start:.1f}s '
+              f'(substring index: {"FTS5 trigram" if search.has_fts() else "none"})')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        print(f"{'mode':<10}{'query':<12}{'matches':>9}{'datasets':>10}{'scan':>12}{'indexed':>12}{'page':>12}")
+        for mode, query in QUERIES:
+            matches = search.matching(query, mode)
+            count = matches.count()
+            groups = matches.values('dataset_id').distinct().count()
+            scan_s = bench(lambda: list(scan(query, mode).values_list('id', flat=True)), args.repeat)
+            indexed_s = bench(lambda: list(matches.values_list('id', flat=True)), args.repeat)
+            page_s = bench(lambda: search.search(query, mode), args.repeat)
+            print(f'{mode:<10}{query:<12}{count:>9}{groups:>10}{scan_s * 1000:>10.1f}ms{indexed_s * 1000:>10.1f}ms{page_s * 1000:>10.1f}ms')
+
+            sql, params = matches.values_list('id', flat=True).query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                for row in cursor.fetchall():
+                    print(f'    {row[-1]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Worker startup benchmark: import time and resident memory.
+
+Each scenario runs in a fresh interpreter that loads the WSGI application
+(what a gunicorn worker does) and then optionally preloads engines:
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = '''
+import json, os, resource, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+import backend.urls  # URLconf (and api.views) load on the first request otherwise
+app_seconds = time.perf_counter() - start
+engines = sys.argv[1]
+if engines:
+    from api.preload import preload
+    preload(engines.split(','))
+total_seconds = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = sorted(m for m in ('pandas', 'matplotlib', 'reportlab', 'pyarrow', 'openpyxl') if m in sys.modules)
+print(json.dumps({'app_s': app_seconds, 'total_s': total_seconds, 'rss_mb': rss_kb / 1024, 'heavy': heavy}))
+'''
+
+SCENARIOS = {
+    'lazy (default)': '',
+    'preload ingest': 'ingest',
+    'preload reports': 'reports',
+    'preload all (old eager)': 'ingest,reports,export',
+}
+
+
+def measure(engines):
+    output = subprocess.run([sys.executable, '-c', CHILD, engines], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    for name, engines in SCENARIOS.items():
+        samples = [measure(engines) for _ in range(args.runs)]
+        total = statistics.median(s['total_s'] for s in samples)
+        rss = statistics.median(s['rss_mb'] for s in samples)
+        heavy = ', '.join(samples[0]['heavy']) or '-'
+        print(f"{name:<26} startup {total * 1000:7.0f} ms   peak RSS {rss:6.1f} MB   heavy modules: {heavy}")
+
+
+if __name__ == '__main__':
+    main()
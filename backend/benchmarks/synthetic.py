@@ -0,0 +1,74 @@
+"""
+Synthetic equipment data modelled on ``sample_equipment_data.csv``.
+
+The sample fixes the schema, the mix of equipment types and each type's
+typical operating point. Generated rows keep those type frequencies and
+scatter each parameter around its type's sample mean, with a small share
+of readings pushed well outside the normal range so anomaly checks have
+something to find. Output is written row by row, so any size fits in
+constant memory.
+"""
+import csv
+import random
+from collections import Counter, defaultdict
+from pathlib import Path
+
+SAMPLE_CSV = Path(__file__).resolve().parent.parent.parent / 'sample_equipment_data.csv'
+HEADERS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+PARAMETERS = ['Flowrate', 'Pressure', 'Temperature']
+# Relative spread of readings around the type mean, and share of outliers
+SPREAD = 0.15
+OUTLIER_RATE = 0.005
+
+
+def load_profile(path=SAMPLE_CSV):
+    """Returns ``{type: {'weight', 'prefix', 'Flowrate', 'Pressure', 'Temperature'}}``."""
+    counts = Counter()
+    sums = defaultdict(lambda: dict.fromkeys(PARAMETERS, 0.0))
+    prefixes = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            kind = row['Type']
+            counts[kind] += 1
+            prefixes.setdefault(kind, row['Equipment Name'].split('-')[0])
+            for param in PARAMETERS:
+                sums[kind][param] += float(row[param])
+
+    total = sum(counts.values())
+    profile = {}
+    for kind, count in counts.items():
+        profile[kind] = {'weight': count / total, 'prefix': prefixes[kind]}
+        for param in PARAMETERS:
+            profile[kind][param] = sums[kind][param] / count
+    return profile
+
+
+def iter_rows(rows, seed=0, profile=None):
+    """Yields ``(name, type, flowrate, pressure, temperature)`` tuples."""
+    profile = profile or load_profile()
+    rng = random.Random(seed)
+    kinds = list(profile)
+    weights = [profile[kind]['weight'] for kind in kinds]
+
+    for idx in range(rows):
+        kind = rng.choices(kinds, weights)[0]
+        spec = profile[kind]
+        values = []
+        for param in PARAMETERS:
+            mean = spec[param]
+            # Zero-mean parameters (idle valves/tanks) still get a little noise
+            value = rng.gauss(mean, abs(mean) * SPREAD or 0.5)
+            if rng.random() < OUTLIER_RATE:
+                value *= rng.uniform(3, 6)
+            if param != 'Temperature':
+                value = max(value, 0.0)
+            values.append(round(value, 2))
+        yield (f"{spec['prefix']}-{idx + 1}", kind, *values)
+
+
+def write_csv(path, rows, seed=0, profile=None):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        writer.writerows(iter_rows(rows, seed, profile))
+    return path
@@ -0,0 +1,68 @@
+"""
+Hot-dataset working set: summary, downsample and CSV export read from the
+database (``WORKING_SET_BUDGET = 0``) versus the shared memory-mapped
+columns, plus the one-off cost of building an entry:
+
+    python -m benchmarks.working_set --rows 1000000
+"""
+import argparse
+import os
+import statistics
+import time
+
+# Sets up Django, so it must come before any model imports
+from .common import seed_dataset, throwaway_database
+
+from django.test import override_settings
+
+from api import downsample, export, working_set
+from api.views import get_dataset_summary
+
+CASES = [
+    ('summary', lambda dataset: get_dataset_summary(dataset, include_data=False)),
+    ('summary+rows', lambda dataset: get_dataset_summary(dataset)),
+    ('scatter', lambda dataset: downsample.scatter(dataset, 'pressure', 'temperature', 5000)),
+    ('series', lambda dataset: downsample.series(dataset, 'index', 'temperature', 1000)),
+    ('export csv', lambda dataset: sum(len(chunk) for chunk in export.stream_csv(dataset))),
+]
+
+
+def bench(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with throwaway_database():
+        dataset = seed_dataset(args.rows)
+        working_set.evict([dataset.pk])
+
+        start = time.perf_counter()
+        columns = working_set.get(dataset)
+        build_s = time.perf_counter() - start
+        if columns is None:
+            raise SystemExit('Dataset does not fit WORKING_SET_BUDGET')
+        path = os.path.join(working_set._root(), working_set._entry_name(dataset))
+        print(f'{args.rows} rows: entry built in {build_s:.2f}s, {working_set._entry_size(path) / 2 ** 20:.1f} MiB '
+              f'mapped from {path}')
+
+        print(f"{'case':<14}{'database':>12}{'working set':>14}{'speedup':>9}")
+        for name, fn in CASES:
+            with override_settings(WORKING_SET_BUDGET=0):
+                db_s = bench(lambda: fn(dataset), args.repeat)
+            mapped_s = bench(lambda: fn(dataset), args.repeat)
+            print(f'{name:<14}{db_s * 1000:>10.1f}ms{mapped_s * 1000:>12.1f}ms{db_s / mapped_s:>8.1f}x')
+        working_set.evict([dataset.pk])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import os
+
+# Heavy engines (pandas, Matplotlib, ReportLab) are imported on first use.
+# PRELOAD_ENGINES=all (or e.g. "ingest,reports") imports them in each worker
+# as soon as it has loaded the app, so the first upload/report is not slowed
+# down by imports. Leave unset to keep read-only workers small.
+wsgi_app = 'backend.wsgi:application'
+
+
+def post_worker_init(worker):
+    engines = os.environ.get('PRELOAD_ENGINES')
+    if not engines:
+        return
+    from api.preload import preload
+    names = None if engines == 'all' else [name.strip() for name in engines.split(',')]
+    timings = preload(names)
+    worker.log.info('Preloaded engines: %s', ', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items()))
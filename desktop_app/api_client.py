@@ -1,3 +1,4 @@
+import json
 import requests
 import os
 
@@ -26,6 +27,15 @@ class APIClient:
         except requests.exceptions.RequestException as e:
             return False, str(e)
 
+    def logout(self):
+        # Revoke the token server-side; forget it locally either way
+        if self.token:
+            try:
+                requests.post(f"{self.base_url}/logout/", headers=self._get_headers(), timeout=5)
+            except requests.exceptions.RequestException:
+                pass
+        self.token = None
+
     def register(self, username, email, password):
         try:
             response = requests.post(f"{self.base_url}/register/", json={'username': username, 'email': email, 'password': password})
@@ -65,6 +75,57 @@ class APIClient:
         except:
             return []
 
+    def get_downsampled(self, dataset_id, kind='scatter', x=None, y='temperature', budget=1000):
+        if not self.token:
+            return None
+        params = {'kind': kind, 'y': y, 'budget': budget}
+        if x:
+            params['x'] = x
+        try:
+            response = requests.get(f"{self.base_url}/datasets/{dataset_id}/downsample/", params=params, headers=self._get_headers())
+            return response.json() if response.status_code == 200 else None
+        except:
+            return None
+
+    def stream_events(self, on_event, stop, last_event_id=None):
+        """
+        Blocks reading the server-sent event stream, calling ``on_event(type, data)``
+        for each event (and ``on_event('connected', None)`` once), until
+        ``stop`` (a threading.Event) is set or the connection drops.
+        Returns the last event id seen, to resume from.
+        """
+        if not self.token:
+            return last_event_id
+        headers = self._get_headers()
+        if last_event_id:
+            headers['Last-Event-ID'] = last_event_id
+        last_id = last_event_id
+        try:
+            with requests.get(f"{self.base_url}/events/", headers=headers, stream=True, timeout=(5, 60)) as response:
+                if response.status_code != 200:
+                    return last_id
+                on_event('connected', None)
+                event_type, data = 'message', []
+                for line in response.iter_lines(decode_unicode=True):
+                    if stop.is_set():
+                        break
+                    if line:
+                        field, _, value = line.partition(':')
+                        value = value[1:] if value.startswith(' ') else value
+                        if field == 'event':
+                            event_type = value
+                        elif field == 'data':
+                            data.append(value)
+                        elif field == 'id':
+                            last_id = value
+                    elif data:
+                        # Blank line ends the event
+                        on_event(event_type, json.loads('\n'.join(data)))
+                        event_type, data = 'message', []
+        except requests.exceptions.RequestException:
+            pass
+        return last_id
+
     def download_report(self, dataset_id, save_path):
         if not self.token:
             return False, "Not authenticated"
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox
 from api_client import client
+import threading
+import warmup
 
 class AuthScreen(tk.Frame):
     def __init__(self, master, on_login_success):
@@ -32,7 +34,8 @@ class AuthScreen(tk.Frame):
         btn_frame = tk.Frame(container)
         btn_frame.pack(pady=20)
         
-        tk.Button(btn_frame, text="Login", command=self.login, width=12, bg="#1890ff", fg="white").pack(side="left", padx=5)
+        self.login_btn = tk.Button(btn_frame, text="Login", command=self.login, width=12, bg="#1890ff", fg="white")
+        self.login_btn.pack(side="left", padx=5)
         tk.Button(btn_frame, text="Register", command=self.show_register_window, width=12).pack(side="left", padx=5)
 
     def login(self):
@@ -43,10 +46,22 @@ class AuthScreen(tk.Frame):
             messagebox.showerror("Error", "Please fill all fields")
             return
 
+        # Log in off the Tk thread so the window stays responsive
+        self.login_btn.config(state="disabled")
+        threading.Thread(target=self._login_thread, args=(username, password), daemon=True).start()
+
+    def _login_thread(self, username, password):
         success, msg = client.login(username, password)
+        if success:
+            # Summary and history load while the dashboard is being built
+            warmup.prefetch_dashboard()
+        self.master.after(0, self._handle_login, success, msg)
+
+    def _handle_login(self, success, msg):
         if success:
             self.on_login_success()
         else:
+            self.login_btn.config(state="normal")
             messagebox.showerror("Login Failed", msg)
 
     def show_register_window(self):
@@ -0,0 +1,127 @@
+"""
+Redraw latency benchmark for the dashboard charts.
+
+Simulates a user flicking through history items and compares the old
+clear-and-replot path with ChartManager's in-place updates. Runs headless
+on the Agg backend, so no display is needed:
+
+    python desktop_app/bench_charts.py --switches 200
+"""
+import argparse
+import random
+import statistics
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from charts import ChartManager
+
+TYPES = ['Pump', 'Reactor', 'Heat Exchanger', 'Valve', 'Compressor', 'Mixer', 'Filter', 'Storage Tank']
+
+
+class IdleCanvas(FigureCanvasAgg):
+    """Agg canvas whose draw_idle defers painting the way Tk's idle loop does."""
+
+    pending = False
+
+    def draw_idle(self, *args, **kwargs):
+        self.pending = True
+
+    def flush(self):
+        if self.pending:
+            self.pending = False
+            self.draw()
+
+
+class HeadlessChartManager(ChartManager):
+    def __init__(self):
+        super().__init__()
+        self.attach(None)
+
+    def _attach_canvas(self):
+        self.canvas = IdleCanvas(self.figure)
+
+
+def make_summaries(count, seed=0):
+    rng = random.Random(seed)
+    summaries = []
+    for _ in range(count):
+        types = rng.sample(TYPES, rng.randint(3, len(TYPES)))
+        summaries.append({
+            'type_distribution': {t: rng.randint(1, 500) for t in types},
+            'avg_flowrate': rng.uniform(50, 1500),
+            'avg_pressure': rng.uniform(1, 20),
+            'avg_temperature': rng.uniform(20, 250),
+        })
+    return summaries
+
+
+def legacy_render(manager, summary_data):
+    # The previous implementation: wipe both axes and replot from scratch
+    manager.ax1.clear()
+    manager.ax2.clear()
+    type_dist = summary_data.get('type_distribution', {})
+    manager.ax1.pie(list(type_dist.values()), labels=list(type_dist.keys()), autopct='%1.1f%%', startangle=90)
+    manager.ax1.axis('equal')
+    manager.ax1.set_title('Equipment Type Distribution')
+    avgs = [summary_data['avg_flowrate'], summary_data['avg_pressure'], summary_data['avg_temperature']]
+    manager.ax2.bar(['Flowrate', 'Pressure', 'Temperature'], avgs, color=['#36a2eb', '#ff6384', '#ffcd56'])
+    manager.ax2.set_title('Average Parameters')
+    manager.ax2.set_ylabel('Value')
+    manager.canvas.draw()
+
+
+def incremental_render(manager, summary_data):
+    manager.render_charts(summary_data)
+    # Agg has no event loop, so run the pending idle draw to measure it
+    manager.canvas.flush()
+
+
+def run(render, summaries):
+    manager = HeadlessChartManager()
+    manager.canvas.draw()
+    timings = []
+    for summary in summaries:
+        start = time.perf_counter()
+        render(manager, summary)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run_burst(summaries, burst):
+    # With draw_idle, Tk paints once after a burst of clicks instead of per click
+    manager = HeadlessChartManager()
+    manager.canvas.draw()
+    timings = []
+    for offset in range(0, len(summaries), burst):
+        start = time.perf_counter()
+        for summary in summaries[offset:offset + burst]:
+            manager.render_charts(summary)
+        manager.canvas.flush()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<14} median {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms   max {timings[-1]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--switches', type=int, default=100, help='number of dataset switches to time')
+    parser.add_argument('--burst', type=int, default=5, help='clicks per burst before the idle redraw')
+    args = parser.parse_args()
+
+    summaries = make_summaries(args.switches)
+    report('legacy', run(legacy_render, summaries))
+    report('incremental', run(incremental_render, summaries))
+    report('update-only', run(lambda manager, summary: manager.render_charts(summary), summaries))
+    report(f'burst x{args.burst}', run_burst(summaries, args.burst))
+
+
+if __name__ == '__main__':
+    main()
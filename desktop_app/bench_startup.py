@@ -0,0 +1,82 @@
+"""
+Desktop startup benchmark: time to first window and to a populated dashboard.
+
+Each run starts ``main.py`` in a fresh interpreter with the startup marks
+enabled (see startup.py); it logs in with the given account and quits once
+the first summary is shown. Needs a display (e.g. ``xvfb-run``) and a
+running backend with at least one dataset:
+
+    python desktop_app/bench_startup.py --runs 5 --username demo --password demo
+
+Without credentials only the import cost is measured: what the login window
+imports now against what ``main.py`` used to import before showing it.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+
+IMPORTS = [
+    ('login window', 'import auth, startup, warmup'),
+    ('dashboard (old)', 'import auth, dashboard'),
+]
+
+
+def time_import(statement):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], cwd=APP_DIR, check=True)
+    return time.perf_counter() - start
+
+
+def time_app(username, password, timeout):
+    env = dict(os.environ, DESKTOP_STARTUP_BENCH='1', DESKTOP_BENCH_USERNAME=username, DESKTOP_BENCH_PASSWORD=password)
+    marks = {}
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'main.py'], cwd=APP_DIR, env=env, stdout=subprocess.PIPE, text=True)
+    try:
+        for line in process.stdout:
+            parts = line.split()
+            if len(parts) == 2 and parts[0] == 'startup':
+                marks[parts[1]] = time.perf_counter() - start
+            if 'dashboard' in marks or time.perf_counter() - start > timeout:
+                break
+    finally:
+        process.kill()
+        process.wait()
+    return marks
+
+
+def report(name, samples):
+    print(f"{name:<18} median {statistics.median(samples) * 1000:7.0f} ms   min {min(samples) * 1000:7.0f} ms   "
+          f"max {max(samples) * 1000:7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--username')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    for name, statement in IMPORTS:
+        report(name, [time_import(statement) for _ in range(args.runs)])
+
+    if not args.username:
+        return
+    runs = [time_app(args.username, args.password, args.timeout) for _ in range(args.runs)]
+    for mark in ('window', 'dashboard'):
+        samples = [marks[mark] for marks in runs if mark in marks]
+        if samples:
+            report(f'first {mark}', samples)
+        else:
+            print(f'first {mark:<12} not reached (display, backend and credentials OK?)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,60 +1,181 @@
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import math
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge
 import tkinter as tk
 
+PIE_START_ANGLE = 90
+PIE_LABEL_DISTANCE = 1.1
+PIE_PCT_DISTANCE = 0.6
+BAR_PARAMS = ['Flowrate', 'Pressure', 'Temperature']
+BAR_COLORS = ['#36a2eb', '#ff6384', '#ffcd56']
+
+
 class ChartManager:
-    def __init__(self, master):
-        self.master = master
+    """
+    Owns the dashboard figure and keeps its artists alive between renders.
+
+    Switching between datasets only updates wedge angles, bar heights and
+    label text in place, then schedules a redraw with ``draw_idle`` so a burst
+    of history clicks collapses into a single repaint.
+
+    The figure is a plain ``Figure`` (no pyplot, no Tk), so it can be built on
+    a background thread; ``attach`` embeds it in a Tk widget and must run on
+    the Tk thread.
+    """
+
+    def __init__(self, master=None):
+        self.master = None
         self.figure = None
         self.canvas = None
+        self._wedges = []
+        self._labels = []
+        self._autotexts = []
         self._init_figure()
+        if master is not None:
+            self.attach(master)
 
     def _init_figure(self):
-        # Create a figure with 2 subplots once
-        self.figure, (self.ax1, self.ax2) = plt.subplots(1, 2, figsize=(10, 4), dpi=100)
+        # Create a figure with 3 subplots once
+        self.figure = Figure(figsize=(13, 4), dpi=100)
+        self.ax1, self.ax2, self.ax3 = self.figure.subplots(1, 3, gridspec_kw={'width_ratios': [1, 1, 1.2]})
         self.figure.patch.set_facecolor('#f0f2f5')
+
+        # Pie axes: fixed limits so the layout never depends on the data
+        self.ax1.set_aspect('equal')
+        self.ax1.set_xlim(-1.25, 1.25)
+        self.ax1.set_ylim(-1.25, 1.25)
+        self.ax1.set_axis_off()
+        self.ax1.set_title('Equipment Type Distribution')
+        self._no_data_text = self.ax1.text(0.5, 0.5, 'No Data', ha='center',
+                                           transform=self.ax1.transAxes, visible=False)
+        self._palette = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+
+        # Bar axes: three bars created once, only their heights change
+        self._bars = self.ax2.bar(BAR_PARAMS, [0, 0, 0], color=BAR_COLORS)
+        self.ax2.set_title('Average Parameters')
+        self.ax2.set_ylabel('Value')
+
+        # Scatter axes: one collection whose offsets are swapped per dataset
+        self._scatter = self.ax3.scatter([], [], s=9, alpha=0.5, color='#36a2eb')
+        self.ax3.set_title('Pressure vs Temperature')
+        self.ax3.set_xlabel('Pressure')
+        self.ax3.set_ylabel('Temperature')
+
         self.figure.tight_layout()
 
+    def attach(self, master):
+        self.master = master
+        self._attach_canvas()
+
+    def _attach_canvas(self):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         # Embed in Tkinter once
         self.canvas = FigureCanvasTkAgg(self.figure, master=self.master)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+    def _ensure_pie_artists(self, count):
+        # Grow the artist pools on demand; surplus artists are hidden, not removed
+        while len(self._wedges) < count:
+            idx = len(self._wedges)
+            wedge = Wedge((0, 0), 1, 0, 0, facecolor=self._palette[idx % len(self._palette)])
+            self.ax1.add_patch(wedge)
+            self._wedges.append(wedge)
+            self._labels.append(self.ax1.text(0, 0, '', va='center'))
+            self._autotexts.append(self.ax1.text(0, 0, '', ha='center', va='center'))
+
+    def _update_pie(self, type_dist):
+        labels = list(type_dist.keys())
+        sizes = [float(v) for v in type_dist.values()]
+        total = sum(sizes)
+
+        has_data = bool(sizes) and total > 0
+        self._no_data_text.set_visible(not has_data)
+        count = len(sizes) if has_data else 0
+        self._ensure_pie_artists(count)
+
+        theta1 = PIE_START_ANGLE
+        for idx, wedge in enumerate(self._wedges):
+            label, autotext = self._labels[idx], self._autotexts[idx]
+            visible = idx < count
+            wedge.set_visible(visible)
+            label.set_visible(visible)
+            autotext.set_visible(visible)
+            if not visible:
+                continue
+
+            frac = sizes[idx] / total
+            theta2 = theta1 + 360 * frac
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+
+            mid = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            label.set_position((PIE_LABEL_DISTANCE * x, PIE_LABEL_DISTANCE * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            label.set_text(labels[idx])
+            autotext.set_position((PIE_PCT_DISTANCE * x, PIE_PCT_DISTANCE * y))
+            autotext.set_text('%1.1f%%' % (frac * 100))
+            theta1 = theta2
+
+    def _update_bars(self, avgs):
+        for bar, value in zip(self._bars, avgs):
+            bar.set_height(value)
+
+        low, high = min(avgs + [0]), max(avgs + [0])
+        if low == high:
+            high = 1
+        self.ax2.set_ylim(low * 1.05, high * 1.05)
+
     def render_charts(self, summary_data):
         if not summary_data:
             return
 
-        # Clear axes instead of destroying figure
-        self.ax1.clear()
-        self.ax2.clear()
-
         # 1. Pie Chart - Distribution
-        type_dist = summary_data.get('type_distribution', {})
-        labels = list(type_dist.keys())
-        sizes = list(type_dist.values())
-        
-        if sizes:
-            self.ax1.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
-            self.ax1.axis('equal')
-            self.ax1.set_title('Equipment Type Distribution')
-        else:
-            self.ax1.text(0.5, 0.5, 'No Data', ha='center')
+        self._update_pie(summary_data.get('type_distribution') or {})
 
         # 2. Bar Chart - Averages
-        params = ['Flowrate', 'Pressure', 'Temperature']
-        avgs = [
-            summary_data.get('avg_flowrate', 0),
-            summary_data.get('avg_pressure', 0),
-            summary_data.get('avg_temperature', 0)
-        ]
-
-        self.ax2.bar(params, avgs, color=['#36a2eb', '#ff6384', '#ffcd56'])
-        self.ax2.set_title('Average Parameters')
-        self.ax2.set_ylabel('Value')
+        self._update_bars([
+            summary_data.get('avg_flowrate') or 0,
+            summary_data.get('avg_pressure') or 0,
+            summary_data.get('avg_temperature') or 0
+        ])
+
+        # Coalesce redraws; Tk repaints once the event loop is idle
+        self.canvas.draw_idle()
+
+    def render_scatter(self, result):
+        """
+        Draws a downsample API response: raw points, or density cells sized
+        by how many readings they hold.
+        """
+        if not result:
+            return
+
+        if result.get('kind') == 'density':
+            x_edges, y_edges = result['x_edges'], result['y_edges']
+            cells = result['cells']
+            max_count = max((count for _, _, count in cells), default=1)
+            offsets = [((x_edges[i] + x_edges[i + 1]) / 2, (y_edges[j] + y_edges[j + 1]) / 2) for i, j, _ in cells]
+            sizes = [4 + 40 * math.sqrt(count / max_count) for _, _, count in cells]
+        else:
+            offsets = [tuple(point) for point in result.get('points', [])]
+            sizes = [9] * len(offsets)
+
+        self._scatter.set_offsets(offsets or [(0, 0)])
+        self._scatter.set_sizes(sizes or [0])
+        if offsets:
+            xs = [x for x, _ in offsets]
+            ys = [y for _, y in offsets]
+            pad_x = (max(xs) - min(xs)) * 0.05 or 1
+            pad_y = (max(ys) - min(ys)) * 0.05 or 1
+            self.ax3.set_xlim(min(xs) - pad_x, max(xs) + pad_x)
+            self.ax3.set_ylim(min(ys) - pad_y, max(ys) + pad_y)
 
-        # Redraw
-        self.canvas.draw()
+        self.canvas.draw_idle()
 
     def clear(self):
         if self.canvas:
             self.canvas.get_tk_widget().destroy()
-            plt.close(self.figure)
+            self.canvas = None
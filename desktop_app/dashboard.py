@@ -3,6 +3,8 @@ from tkinter import ttk, filedialog, messagebox
 from api_client import client
 from charts import ChartManager
 import threading
+import startup
+import warmup
 
 class Dashboard(tk.Frame):
     def __init__(self, master, on_logout):
@@ -12,8 +14,11 @@ class Dashboard(tk.Frame):
         self.pack(fill="both", expand=True)
         
         self.current_summary = None
+        self.events_live = False
+        self._stop_events = threading.Event()
         self.create_widgets()
         self.load_initial_data()
+        threading.Thread(target=self._listen_events, daemon=True).start()
 
     def create_widgets(self):
         # Header
@@ -69,7 +74,10 @@ class Dashboard(tk.Frame):
         # Prevent frame from collapsing
         self.charts_frame.pack_propagate(False) 
         
-        self.chart_manager = ChartManager(self.charts_frame)
+        # Built on the warm-up thread while the login screen was up, when possible;
+        # attached once ready, without blocking the Tk loop while warm-up finishes
+        self.chart_manager = None
+        warmup.when_charts_ready(self, self._attach_charts)
 
         # Data Table Area
         table_frame = tk.Frame(main_area, bg="white")
@@ -96,7 +104,16 @@ class Dashboard(tk.Frame):
         self.download_btn = tk.Button(header, text="Download Report", command=self.download_report, bg="#52c41a", fg="white", bd=0, padx=10)
         # Packed later when data available
 
+    def _attach_charts(self, charts):
+        self.chart_manager = charts or ChartManager()
+        self.chart_manager.attach(self.charts_frame)
+        # The first summary may have arrived before the charts
+        if self.current_summary:
+            self._render_charts(self.current_summary)
+
     def logout(self):
+        self._stop_events.set()
+        client.logout()
         self.on_logout()
 
     def upload_file(self):
@@ -114,7 +131,10 @@ class Dashboard(tk.Frame):
     def _handle_upload_result(self, success, result):
         if success:
             messagebox.showinfo("Success", "File uploaded successfully!")
-            self.load_initial_data()
+            # With a live event stream the dataset.ready event refreshes the view;
+            # a duplicate upload publishes none, so it is fetched either way
+            if not self.events_live or (isinstance(result, dict) and result.get('duplicate')):
+                self.load_initial_data()
         else:
             messagebox.showerror("Error", f"Upload failed: {result}")
 
@@ -123,11 +143,37 @@ class Dashboard(tk.Frame):
         threading.Thread(target=self._fetch_data, daemon=True).start()
 
     def _fetch_data(self):
-        summary = client.get_summary()
-        history = client.get_history()
-        
+        # The first load picks up the requests started at login
+        prefetched = warmup.take_prefetched()
+        if prefetched:
+            summary, history = (future.result() for future in prefetched)
+        else:
+            summary = client.get_summary()
+            history = client.get_history()
+
         self.master.after(0, self._update_ui, summary, history)
 
+    def _listen_events(self):
+        # Reconnect until logout; the server stream needs the ASGI deployment
+        last_event_id = None
+        while not self._stop_events.is_set():
+            last_event_id = client.stream_events(lambda kind, data: self.master.after(0, self._on_event, kind, data),
+                                                 self._stop_events, last_event_id)
+            self.events_live = False
+            self._stop_events.wait(30)
+
+    def _on_event(self, kind, data):
+        if kind == 'connected':
+            self.events_live = True
+        elif kind == 'dataset.ready':
+            if data['data_included']:
+                history = [data['summary']] + [item for item in getattr(self, 'history_items', []) if item['id'] != data['summary']['id']]
+                self._update_ui(data['summary'], history[:5])
+            else:
+                self.load_initial_data()
+        elif kind == 'dataset.deleted':
+            self.load_initial_data()
+
     def _update_ui(self, summary, history):
         # Update History List
         self.history_items = history  # Store full objects
@@ -138,6 +184,8 @@ class Dashboard(tk.Frame):
         # Update Dashboard
         if summary:
             self.update_dashboard_view(summary)
+        if startup.mark('dashboard'):
+            self.master.after_idle(self.master.quit)
 
     def update_dashboard_view(self, summary):
         self.current_summary = summary
@@ -147,8 +195,9 @@ class Dashboard(tk.Frame):
         self.stat_labels["Avg Pressure"].config(text=f"{summary.get('avg_pressure', 0):.2f}")
         self.stat_labels["Avg Temperature"].config(text=f"{summary.get('avg_temperature', 0):.2f}")
 
-        # Update Charts
-        self.chart_manager.render_charts(summary)
+        # Update Charts (if not attached yet, _attach_charts renders them)
+        if self.chart_manager is not None:
+            self._render_charts(summary)
 
         # Update Table
         # Clear existing items
@@ -174,6 +223,19 @@ class Dashboard(tk.Frame):
         # Show Download Button
         self.download_btn.pack(side="right", padx=10, pady=10)
 
+    def _render_charts(self, summary):
+        self.chart_manager.render_charts(summary)
+        threading.Thread(target=self._fetch_scatter, args=(summary.get('id'),), daemon=True).start()
+
+    def _fetch_scatter(self, dataset_id):
+        result = client.get_downsampled(dataset_id, kind='scatter', x='pressure', y='temperature', budget=2000)
+        self.master.after(0, self._update_scatter, dataset_id, result)
+
+    def _update_scatter(self, dataset_id, result):
+        # Ignore late responses for a dataset the user has already left
+        if self.current_summary and self.current_summary.get('id') == dataset_id:
+            self.chart_manager.render_scatter(result)
+
     def on_history_select(self, event):
         selection = self.history_listbox.curselection()
         if selection:
@@ -1,6 +1,7 @@
 import tkinter as tk
 from auth import AuthScreen
-from dashboard import Dashboard
+import startup
+import warmup
 
 class DesktopApp(tk.Tk):
     def __init__(self):
@@ -11,6 +12,15 @@ class DesktopApp(tk.Tk):
 
         self.current_frame = None
         self.show_login()
+        self.bind('<Map>', self._on_first_map)
+        # Dashboard, Matplotlib and the chart figure load while the user logs in
+        warmup.start()
+
+    def _on_first_map(self, event):
+        if startup.mark('window') and startup.USERNAME:
+            self.current_frame.username_entry.insert(0, startup.USERNAME)
+            self.current_frame.password_entry.insert(0, startup.PASSWORD)
+            self.after(0, self.current_frame.login)
 
     def show_login(self):
         if self.current_frame:
@@ -18,6 +28,9 @@ class DesktopApp(tk.Tk):
         self.current_frame = AuthScreen(self, on_login_success=self.show_dashboard)
 
     def show_dashboard(self):
+        # Imported here so the login window does not wait for Matplotlib
+        from dashboard import Dashboard
+
         if self.current_frame:
             self.current_frame.destroy()
         self.current_frame = Dashboard(self, on_logout=self.show_login)
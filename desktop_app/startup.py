@@ -0,0 +1,25 @@
+"""
+Startup marks for bench_startup.py.
+
+With ``DESKTOP_STARTUP_BENCH`` set, the app prints ``startup <mark>`` once
+per mark (``window`` when the login window is mapped, ``dashboard`` when
+the dashboard shows its first summary), logs in with
+``DESKTOP_BENCH_USERNAME`` / ``DESKTOP_BENCH_PASSWORD`` and quits after the
+dashboard mark. Without it, ``mark`` does nothing.
+"""
+import os
+
+BENCH = bool(os.environ.get('DESKTOP_STARTUP_BENCH'))
+USERNAME = os.environ.get('DESKTOP_BENCH_USERNAME', '')
+PASSWORD = os.environ.get('DESKTOP_BENCH_PASSWORD', '')
+
+_seen = set()
+
+
+def mark(name):
+    """Prints the mark the first time it is reached; returns whether it was new."""
+    if not BENCH or name in _seen:
+        return False
+    _seen.add(name)
+    print(f'startup {name}', flush=True)
+    return True
@@ -0,0 +1,75 @@
+"""
+ChartManager tests; headless on Agg, so no display is needed:
+
+    python -m unittest discover desktop_app
+"""
+import unittest
+from unittest import mock
+
+from bench_charts import HeadlessChartManager
+
+SUMMARY = {
+    'type_distribution': {'Pump': 2, 'Reactor': 1, 'Valve': 1},
+    'avg_flowrate': 500.0,
+    'avg_pressure': 5.0,
+    'avg_temperature': 80.0,
+}
+
+
+class ChartManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = HeadlessChartManager()
+
+    def visible_wedges(self):
+        return [wedge for wedge in self.manager._wedges if wedge.get_visible()]
+
+    def test_pie_and_bars_follow_summary(self):
+        self.manager.render_charts(SUMMARY)
+
+        wedges = self.visible_wedges()
+        self.assertEqual(len(wedges), 3)
+        self.assertAlmostEqual(wedges[0].theta2 - wedges[0].theta1, 180)
+        self.assertAlmostEqual(wedges[-1].theta2 - wedges[0].theta1, 360)
+        self.assertEqual([label.get_text() for label in self.manager._labels], ['Pump', 'Reactor', 'Valve'])
+        self.assertEqual([bar.get_height() for bar in self.manager._bars], [500.0, 5.0, 80.0])
+
+    def test_artists_are_reused_between_datasets(self):
+        self.manager.render_charts(SUMMARY)
+        wedges = list(self.manager._wedges)
+        patches = len(self.manager.ax1.patches)
+
+        self.manager.render_charts({**SUMMARY, 'type_distribution': {'Pump': 1, 'Mixer': 1}})
+
+        self.assertEqual(self.manager._wedges, wedges)
+        self.assertEqual(len(self.manager.ax1.patches), patches)
+        self.assertEqual(len(self.visible_wedges()), 2)
+
+    def test_empty_distribution_shows_no_data(self):
+        self.manager.render_charts(SUMMARY)
+        self.manager.render_charts({**SUMMARY, 'type_distribution': {}})
+        self.assertEqual(self.visible_wedges(), [])
+        self.assertTrue(self.manager._no_data_text.get_visible())
+
+    def test_redraws_are_coalesced(self):
+        with mock.patch.object(self.manager.canvas, 'draw') as draw:
+            for _ in range(5):
+                self.manager.render_charts(SUMMARY)
+            draw.assert_not_called()
+            self.manager.canvas.flush()
+        draw.assert_called_once()
+
+    def test_scatter_density_cells(self):
+        self.manager.render_scatter({
+            'kind': 'density',
+            'x_edges': [0, 1, 2],
+            'y_edges': [0, 10, 20],
+            'cells': [[0, 0, 1], [1, 1, 4]],
+        })
+        offsets = self.manager._scatter.get_offsets().tolist()
+        self.assertEqual(offsets, [[0.5, 5.0], [1.5, 15.0]])
+        sizes = self.manager._scatter.get_sizes()
+        self.assertLess(sizes[0], sizes[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Warm-up hand-over tests; the Tk widget is replaced by a recorder of its
+``after`` calls, so no display is needed:
+
+    python -m unittest discover desktop_app
+"""
+import unittest
+from importlib.util import find_spec
+from unittest import mock
+
+
+class FakeWidget:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append((ms, callback))
+
+    def run_next(self):
+        _, callback = self.scheduled.pop(0)
+        callback()
+
+
+@unittest.skipUnless(find_spec('requests'), 'desktop requirements (requests) are not installed')
+class WhenChartsReadyTests(unittest.TestCase):
+    def setUp(self):
+        import warmup
+
+        self.warmup = warmup
+        patcher = mock.patch.multiple(warmup, _charts=None, _charts_ready=mock.Mock(), _started=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        warmup._charts_ready.is_set.return_value = False
+        self.widget = FakeWidget()
+        self.received = []
+
+    def test_polls_without_blocking_until_ready(self):
+        self.warmup.when_charts_ready(self.widget, self.received.append, poll_ms=20)
+        self.assertEqual(self.received, [])
+        self.assertEqual(self.widget.scheduled[0][0], 20)
+
+        self.widget.run_next()
+        self.assertEqual(self.received, [])
+
+        charts = object()
+        self.warmup._charts = charts
+        self.warmup._charts_ready.is_set.return_value = True
+        self.widget.run_next()
+        self.assertEqual(self.received, [charts])
+        self.assertEqual(self.widget.scheduled, [])
+        # Handed over at most once
+        self.assertIsNone(self.warmup.take_charts())
+
+    def test_gives_up_after_timeout(self):
+        self.warmup.when_charts_ready(self.widget, self.received.append, timeout=0)
+        self.assertEqual(self.received, [None])
+        self.assertEqual(self.widget.scheduled, [])
+
+    def test_no_warm_up_means_no_wait(self):
+        self.warmup._started = False
+        self.warmup.when_charts_ready(self.widget, self.received.append)
+        self.assertEqual(self.received, [None])
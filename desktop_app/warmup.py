@@ -0,0 +1,78 @@
+"""
+Work done in the background so the login window appears immediately.
+
+* ``start()`` runs while the login screen is up: it imports the dashboard
+  (and with it Matplotlib and the TkAgg backend) and builds the chart
+  figure. Nothing here touches Tk; the dashboard collects the figure with
+  ``when_charts_ready``, which polls from the Tk loop instead of blocking
+  it, and embeds it on the Tk thread with ``ChartManager.attach``.
+* ``prefetch_dashboard()`` runs as soon as login succeeds, so the first
+  summary and history requests are in flight while the dashboard widgets
+  are being built.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import client
+
+_charts = None
+_charts_ready = threading.Event()
+_started = False
+_prefetch = None
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='prefetch')
+
+
+def start():
+    global _started
+    _started = True
+    threading.Thread(target=_warm_up, daemon=True).start()
+
+
+def _warm_up():
+    global _charts
+    try:
+        from matplotlib.backends import backend_tkagg  # noqa: F401
+        from charts import ChartManager
+        import dashboard  # noqa: F401
+        _charts = ChartManager()
+    finally:
+        _charts_ready.set()
+
+
+def take_charts():
+    """The pre-built ChartManager, at most once; None if warm-up has not produced one (yet). Never blocks."""
+    global _charts
+    if not _charts_ready.is_set():
+        return None
+    charts, _charts = _charts, None
+    return charts
+
+
+def when_charts_ready(widget, callback, timeout=10, poll_ms=50):
+    """
+    Calls ``callback(take_charts())`` on the Tk thread once warm-up is done,
+    checking every ``poll_ms`` with ``widget.after`` so the window stays
+    responsive. Calls back with None right away if warm-up never started,
+    or after ``timeout`` seconds if it has not finished.
+    """
+    deadline = time.monotonic() + timeout
+
+    def poll():
+        if _charts_ready.is_set() or not _started or time.monotonic() >= deadline:
+            callback(take_charts())
+        else:
+            widget.after(poll_ms, poll)
+    poll()
+
+
+def prefetch_dashboard():
+    global _prefetch
+    _prefetch = (_executor.submit(client.get_summary), _executor.submit(client.get_history))
+
+
+def take_prefetched():
+    """``(summary_future, history_future)`` from the last prefetch, at most once, or None."""
+    global _prefetch
+    prefetched, _prefetch = _prefetch, None
+    return prefetched
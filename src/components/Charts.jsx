@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { Card, Row, Col } from 'antd';
 import {
     Chart as ChartJS,
@@ -12,7 +12,8 @@ import {
     PointElement,
     LineElement,
 } from 'chart.js';
-import { Bar, Pie } from 'react-chartjs-2';
+import { Bar, Pie, Line, Scatter } from 'react-chartjs-2';
+import { getDownsampled } from '../services/api';
 
 // Register ChartJS components
 ChartJS.register(
@@ -27,6 +28,100 @@ ChartJS.register(
     LineElement
 );
 
+// Point budgets for the server-side downsampled views
+const SCATTER_BUDGET = 2500;
+const SERIES_BUDGET = 500;
+
+/**
+ * Turns a downsample response into Chart.js points. Density grids become
+ * one point per non-empty cell, sized by how many readings it holds.
+ */
+const toPoints = (result) => {
+    if (result.kind !== 'density') {
+        return result.points.map(([x, y]) => ({ x, y }));
+    }
+    const maxCount = Math.max(...result.cells.map((cell) => cell[2]));
+    return result.cells.map(([i, j, count]) => ({
+        x: (result.x_edges[i] + result.x_edges[i + 1]) / 2,
+        y: (result.y_edges[j] + result.y_edges[j + 1]) / 2,
+        r: 2 + 6 * Math.sqrt(count / maxCount),
+        count,
+    }));
+};
+
+const DownsampledCharts = ({ datasetId }) => {
+    const [scatter, setScatter] = useState(null);
+    const [series, setSeries] = useState(null);
+
+    useEffect(() => {
+        if (!datasetId) return;
+        let cancelled = false;
+        Promise.all([
+            getDownsampled(datasetId, { kind: 'scatter', x: 'pressure', y: 'temperature', budget: SCATTER_BUDGET }),
+            getDownsampled(datasetId, { kind: 'series', y: 'flowrate', budget: SERIES_BUDGET }),
+        ]).then(([scatterData, seriesData]) => {
+            if (!cancelled) {
+                setScatter(scatterData);
+                setSeries(seriesData);
+            }
+        }).catch((error) => console.error('Failed to load downsampled charts', error));
+        return () => { cancelled = true; };
+    }, [datasetId]);
+
+    if (!scatter || !series) return null;
+
+    const scatterPoints = toPoints(scatter);
+    const scatterData = {
+        datasets: [{
+            label: scatter.kind === 'density' ? `Readings (density of ${scatter.total_points})` : 'Readings',
+            data: scatterPoints,
+            backgroundColor: 'rgba(7, 102, 83, 0.5)',
+            pointRadius: scatterPoints.map((point) => point.r || 3),
+        }],
+    };
+    const scatterOptions = {
+        responsive: true,
+        scales: {
+            x: { title: { display: true, text: 'Pressure (Bar)' } },
+            y: { title: { display: true, text: 'Temperature (°C)' } },
+        },
+    };
+
+    const seriesData = {
+        datasets: [{
+            label: `Flowrate (${series.points.length} of ${series.total_points} points)`,
+            data: toPoints(series),
+            borderColor: '#076653',
+            backgroundColor: '#076653',
+            pointRadius: 0,
+            borderWidth: 1,
+        }],
+    };
+    const seriesOptions = {
+        responsive: true,
+        parsing: false,
+        scales: {
+            x: { type: 'linear', title: { display: true, text: 'Row' } },
+            y: { title: { display: true, text: 'Flowrate (L/min)' } },
+        },
+    };
+
+    return (
+        <Row gutter={[24, 24]} style={{ marginTop: 24 }}>
+            <Col xs={24} md={12}>
+                <Card title="Pressure vs Temperature" bordered={false}>
+                    <Scatter data={scatterData} options={scatterOptions} />
+                </Card>
+            </Col>
+            <Col xs={24} md={12}>
+                <Card title="Flowrate by Row" bordered={false}>
+                    <Line data={seriesData} options={seriesOptions} />
+                </Card>
+            </Col>
+        </Row>
+    );
+};
+
 const Charts = ({ summary }) => {
     if (!summary) return null;
 
@@ -205,6 +300,7 @@ const Charts = ({ summary }) => {
                     </Card>
                 </Col>
             </Row>
+            <DownsampledCharts datasetId={summary.id} />
         </div>
     );
 };
@@ -9,10 +9,10 @@ const UploadCSV = ({ onUploadSuccess }) => {
     const handleUpload = async (file) => {
         setUploading(true);
         try {
-            await uploadFile(file);
+            const result = await uploadFile(file);
             message.success('File uploaded successfully');
             if (onUploadSuccess) {
-                onUploadSuccess(); // Trigger parent refresh
+                onUploadSuccess(result); // Trigger parent refresh
             }
         } catch (error) {
             console.error('Upload error:', error);
@@ -1,11 +1,11 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Layout, Row, Col, Typography, message, Spin, Button } from 'antd';
 import { FilePdfOutlined, LogoutOutlined } from '@ant-design/icons';
 import UploadCSV from '../components/UploadCSV';
 import EquipmentTable from '../components/EquipmentTable';
 import Charts from '../components/Charts';
 import History from '../components/History';
-import { getSummary, getHistory, downloadReport } from '../services/api';
+import { getSummary, getHistory, downloadReport, subscribeEvents } from '../services/api';
 import './Dashboard.css';
 
 const { Header, Content, Footer } = Layout;
@@ -15,6 +15,12 @@ const Dashboard = ({ onLogout }) => {
     const [summary, setSummary] = useState(null);
     const [history, setHistory] = useState([]);
     const [loading, setLoading] = useState(true);
+    const liveRef = useRef(false);
+    const summaryRef = useRef(null);
+
+    useEffect(() => {
+        summaryRef.current = summary;
+    }, [summary]);
 
     const fetchData = async () => {
         setLoading(true);
@@ -40,8 +46,32 @@ const Dashboard = ({ onLogout }) => {
         fetchData();
     }, []);
 
-    const handleUploadSuccess = () => {
-        fetchData();
+    // New datasets (from anyone) arrive with their summary; no re-fetch needed
+    useEffect(() => {
+        return subscribeEvents({
+            'dataset.ready': async ({ summary: ready, data_included }) => {
+                const full = data_included ? ready : await getSummary().catch(() => null);
+                if (!full) return;
+                setSummary(full);
+                setHistory((items) => [full, ...items.filter((item) => item.id !== full.id)].slice(0, 5));
+            },
+            'dataset.deleted': ({ id }) => {
+                setHistory((items) => items.filter((item) => item.id !== id));
+                // The dataset on screen is gone: show the newest remaining one, if any
+                if (summaryRef.current && summaryRef.current.id === id) {
+                    setSummary(null);
+                    getSummary().then(setSummary).catch(() => {});
+                }
+            },
+        }, (connected) => { liveRef.current = connected; });
+    }, []);
+
+    const handleUploadSuccess = (result) => {
+        // Without a live event stream, fall back to polling once. A duplicate
+        // upload publishes no dataset.ready, so it always re-fetches
+        if (!liveRef.current || (result && result.duplicate)) {
+            fetchData();
+        }
     };
 
     const handleHistoryClick = (item) => {
@@ -59,6 +59,11 @@ export const register = async (username, email, password) => {
  * Logout
  */
 export const logout = () => {
+    // Revoke the token server-side (best effort) so cached copies are dropped too
+    const token = localStorage.getItem('token');
+    if (token) {
+        api.post('/logout/', null, { headers: { Authorization: `Token ${token}` } }).catch(() => {});
+    }
     localStorage.removeItem('token');
 };
 
@@ -125,4 +130,72 @@ export const downloadReport = async (id) => {
     }
 };
 
+/**
+ * Fetch chart data downsampled to a point budget
+ * @param {number} id - Dataset ID
+ * @param {Object} params - { kind: 'series'|'scatter', x, y, budget }
+ * @returns {Promise<Object>} - points, or a sparse density grid for large scatters
+ */
+export const getDownsampled = async (id, params) => {
+    try {
+        const response = await api.get(`/datasets/${id}/downsample/`, { params });
+        return response.data;
+    } catch (error) {
+        throw error;
+    }
+};
+
+/**
+ * Subscribe to server-sent dataset events (needs the ASGI deployment)
+ * @param {Object} handlers - map of event type (e.g. 'dataset.ready') to callback(data)
+ * @param {Function} onStatus - called with true/false as the stream connects/drops
+ * @returns {Function} - call to close the stream
+ */
+export const subscribeEvents = (handlers, onStatus = () => {}) => {
+    if (!localStorage.getItem('token') || typeof EventSource === 'undefined') {
+        return () => {};
+    }
+    let source = null;
+    let retry = null;
+    let closed = false;
+    let lastEventId = null;
+
+    // EventSource cannot send an Authorization header, so each connection
+    // uses a fresh single-use ticket instead of putting the token in the URL
+    const connect = async () => {
+        let ticket;
+        try {
+            ticket = (await api.post('/events/ticket/')).data.ticket;
+        } catch (error) {
+            // Logged out (401) or server down: try again later unless revoked
+            if (!closed && error.response?.status !== 401) retry = setTimeout(connect, 30000);
+            return;
+        }
+        if (closed) return;
+        const params = new URLSearchParams({ ticket });
+        if (lastEventId) params.set('last_event_id', lastEventId);
+        source = new EventSource(`${API_BASE_URL}/events/?${params}`);
+        source.onopen = () => onStatus(true);
+        source.onerror = () => {
+            onStatus(false);
+            // The ticket is spent, so reconnect with a new one rather than letting EventSource retry
+            source.close();
+            if (!closed) retry = setTimeout(connect, 3000);
+        };
+        Object.entries(handlers).forEach(([type, handler]) => {
+            source.addEventListener(type, (event) => {
+                lastEventId = event.lastEventId || lastEventId;
+                handler(JSON.parse(event.data));
+            });
+        });
+    };
+    connect();
+
+    return () => {
+        closed = true;
+        clearTimeout(retry);
+        if (source) source.close();
+    };
+};
+
 export default api;